@@ -0,0 +1,161 @@
+"""JSON编解码性能测试\n
+用法：python benchmarks/bench_codec.py [--rounds 200]\n
+以data/Weapon.json为素材构造体积递增的用户数据/背包数据，
+分别比较标准库json（原read_json_sync/write_json_sync的写法）与utils/codec当前选用实现的
+序列化、反序列化耗时，以及写入/读取临时文件的往返耗时。
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "utils"))
+
+import codec  # noqa: E402
+
+# (名称, 武器详细信息重复倍数, 道具种类数)
+SIZES = [
+    ("新用户", 0, 5),
+    ("普通", 1, 20),
+    ("老用户", 5, 60),
+    ("重复详情", 20, 120),
+    ("极端", 80, 300),
+]
+
+
+def build_fixture(detail_repeat: int, item_kinds: int) -> tuple[dict, dict]:
+    """构造一份用户数据和背包数据"""
+    with open(ROOT / "data" / "Weapon.json", "r", encoding="utf-8") as f:
+        weapons = json.load(f)
+    rng = random.Random(detail_repeat * 1000 + item_kinds)
+    user_data = {
+        "user": {
+            "id": "123456789",
+            "nickname": "旅行者",
+            "level": 12,
+            "experience": 3456,
+            "created_at": 1700000000.123,
+        },
+        "battle": {"experience": 120, "level": 3, "levelname": "筑基", "privilege": 0},
+        "home": {
+            "spouse_id": "987654321",
+            "spouse_name": "派蒙",
+            "love": 520,
+            "wait": 0,
+            "place": "home",
+            "placetime": 0,
+            "money": 88888,
+            "house_name": "尘歌壶",
+            "house_space": 12,
+            "house_price": 5000,
+            "house_level": 3,
+        },
+        "task": {
+            "daily": {
+                f"daily_{i}": {"progress": i, "completed": i % 2 == 0} for i in range(8)
+            },
+            "weekly": {
+                f"weekly_{i}": {"progress": i * 3, "completed": False} for i in range(4)
+            },
+            "special": {},
+            "task_points": 42,
+            "last_daily_refresh": "2025-01-01",
+            "last_weekly_refresh": "2024-52",
+        },
+    }
+    details = {
+        "三星武器": {"数量": 0, "详细信息": []},
+        "四星武器": {"数量": 0, "详细信息": []},
+        "五星武器": {"数量": 0, "详细信息": []},
+    }
+    counts = {}
+    for weapon_id, info in weapons.items():
+        counts[weapon_id] = rng.randint(1, 30)
+        # 旧版本写入的详细信息存在大量重复
+        for _ in range(detail_repeat):
+            details[info["class"]]["详细信息"].append(dict(info))
+    for star in details.values():
+        star["数量"] = len(star["详细信息"])
+    backpack = {
+        "weapon": {
+            "纠缠之缘": 160,
+            "总抽卡次数": sum(counts.values()),
+            "未出五星计数": 37,
+            "未出四星计数": 4,
+            "武器计数": counts if detail_repeat else {},
+            "武器详细": details,
+        },
+        "sign_info": {"last_sign": "2025-01-01", "streak_days": 7},
+    }
+    for i in range(item_kinds):
+        backpack[f"道具{i}"] = rng.randint(0, 99)
+    return user_data, backpack
+
+
+def stdlib_dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def measure(func, rounds: int) -> float:
+    """返回单次调用的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def file_roundtrip(path: Path, dumps, loads, obj):
+    def run():
+        path.write_bytes(dumps(obj))
+        loads(path.read_bytes())
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON编解码性能测试")
+    parser.add_argument("--rounds", type=int, default=200, help="每项测试的重复次数")
+    args = parser.parse_args()
+
+    print(f"当前编解码实现：{codec.CODEC_NAME}")
+    print(
+        f"{'数据规模':<8}{'体积KB':>9}"
+        f"{'json序列化':>12}{'codec序列化':>13}"
+        f"{'json反序列化':>13}{'codec反序列化':>14}"
+        f"{'json文件往返':>13}{'codec文件往返':>14}{'加速比':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir) / "fixture.json"
+        for name, repeat, items in SIZES:
+            for label, obj in zip(("用户", "背包"), build_fixture(repeat, items)):
+                std_bytes = stdlib_dumps(obj)
+                fast_bytes = codec.dumps(obj)
+                results = [
+                    measure(lambda: stdlib_dumps(obj), args.rounds),
+                    measure(lambda: codec.dumps(obj), args.rounds),
+                    measure(lambda: json.loads(std_bytes), args.rounds),
+                    measure(lambda: codec.loads(fast_bytes), args.rounds),
+                    measure(
+                        file_roundtrip(tmp_path, stdlib_dumps, json.loads, obj),
+                        args.rounds,
+                    ),
+                    measure(
+                        file_roundtrip(tmp_path, codec.dumps, codec.loads, obj),
+                        args.rounds,
+                    ),
+                ]
+                speedup = results[4] / results[5] if results[5] else 0.0
+                print(
+                    f"{name + label:<8}{len(std_bytes) / 1024:>9.1f}"
+                    + "".join(f"{value:>12.1f}μs" for value in results)
+                    + f"{speedup:>7.2f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""武器抽卡性能测试\n
+用法：python benchmarks/bench_gacha.py [--rounds 20] [--seed 2025]\n
+比较两种十连写法：
+- 逐次单抽（原handle_single_draw的写法）：每抽重新解析Weapon.json，并各写一次用户数据和背包文件；
+- 批量引擎（core/gacha.GachaEngine）：全部抽卡在内存中完成，结束后只写一次。\n
+同时校验相同随机种子下两种写法的抽卡结果与背包数据完全一致。
+"""
+
+import argparse
+import copy
+import importlib
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT.parent))
+
+# 以插件包的方式导入，保证core/gacha.py中的相对导入可用
+gacha = importlib.import_module(f"{ROOT.name}.core.gacha")
+weapon_bag = importlib.import_module(f"{ROOT.name}.utils.weapon_bag")
+
+WEAPON_FILE = ROOT / "data" / "Weapon.json"
+FIVE_STAR_PROB = 1
+FOUR_STAR_PROB = 5
+
+
+class DictCatalog:
+    """以Weapon.json字典实现抽卡引擎所需的武器数据接口"""
+
+    def __init__(self, weapons: dict):
+        self.weapons = weapons
+        self.by_star = {}
+        for weapon_id in sorted(weapons, key=int):
+            self.by_star.setdefault(weapon_bag.star_of(weapon_id), []).append(weapon_id)
+
+    def ids_of_star(self, star: str) -> tuple[str, ...]:
+        return tuple(self.by_star.get(star, ()))
+
+    def get(self, weapon_id: str):
+        return self.weapons.get(str(weapon_id))
+
+
+def load_weapons() -> dict:
+    with open(WEAPON_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_fixture() -> tuple[dict, dict]:
+    """构造一份用户数据和背包数据"""
+    user_data = {
+        "user": {"id": "123456789", "nickname": "旅行者"},
+        "home": {"spouse_id": "987654321", "spouse_name": "派蒙", "love": 520},
+    }
+    weapon_data = weapon_bag.default_weapon_data()
+    weapon_data["纠缠之缘"] = 100000
+    weapon_data["未出五星计数"] = 60
+    return user_data, {"weapon": weapon_data, "sign_info": {}}
+
+
+def write_file(path: Path, data: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def sequential_draw(rng, user_data, backpack, count, user_path, backpack_path):
+    """逐次单抽：复刻原handle_single_draw/update_data的计算与I/O"""
+    weapon_data = backpack["weapon"]
+    results = []
+    for _ in range(count):
+        weapons = load_weapons()
+        catalog = DictCatalog(weapons)
+        five_star_miss = weapon_data["未出五星计数"]
+        four_star_miss = weapon_data["未出四星计数"]
+        current_five_star_prob = FIVE_STAR_PROB
+        if five_star_miss >= 64:
+            current_five_star_prob += (five_star_miss - 63) * 6.5
+            current_five_star_prob = min(current_five_star_prob, 100)
+        is_four_star_guarantee = four_star_miss >= 9
+        rand_val = rng.uniform(0, 100)
+        if rand_val <= current_five_star_prob:
+            weapon_star = "五星武器"
+        elif is_four_star_guarantee or rand_val <= (
+            current_five_star_prob + FOUR_STAR_PROB
+        ):
+            weapon_star = "四星武器"
+        else:
+            weapon_star = "三星武器"
+        weapon_id = rng.choice(catalog.ids_of_star(weapon_star))
+        if weapon_star == "五星武器":
+            five_star_miss, four_star_miss = 0, 0
+        elif weapon_star == "四星武器":
+            five_star_miss, four_star_miss = five_star_miss + 1, 0
+        else:
+            five_star_miss, four_star_miss = five_star_miss + 1, four_star_miss + 1
+        weapon_data["未出五星计数"] = five_star_miss
+        weapon_data["未出四星计数"] = four_star_miss
+        weapon_data["总抽卡次数"] += 1
+        weapon_data["武器计数"][weapon_id] = (
+            weapon_data["武器计数"].get(weapon_id, 0) + 1
+        )
+        weapon_bag.add_weapon(weapon_data, weapon_id)
+        write_file(user_path, user_data)
+        write_file(backpack_path, backpack)
+        results.append((weapon_star, weapon_id))
+    return results
+
+
+def batched_draw(rng, user_data, backpack, count, user_path, backpack_path, engine):
+    """批量引擎：内存中完成全部抽卡后统一写入一次"""
+    results = engine.draw(backpack["weapon"], count, rng)
+    write_file(user_path, user_data)
+    write_file(backpack_path, backpack)
+    return [(r.star, r.weapon_id) for r in results]
+
+
+def check_equivalence(engine, seed: int, tmp_dir: Path, draws: int = 2000):
+    """相同种子下逐次单抽与批量引擎的结果必须完全一致"""
+    user_data, backpack = build_fixture()
+    seq_backpack, batch_backpack = copy.deepcopy(backpack), copy.deepcopy(backpack)
+    user_path, backpack_path = tmp_dir / "user.json", tmp_dir / "backpack.json"
+    seq_rng, batch_rng = random.Random(seed), random.Random(seed)
+    for count in (1, 10) * (draws // 22) + (10,):
+        expected = sequential_draw(
+            seq_rng, user_data, seq_backpack, count, user_path, backpack_path
+        )
+        actual = batched_draw(
+            batch_rng,
+            user_data,
+            batch_backpack,
+            count,
+            user_path,
+            backpack_path,
+            engine,
+        )
+        assert expected == actual, f"抽卡结果不一致：{expected} != {actual}"
+    assert seq_backpack == batch_backpack, "背包数据不一致"
+    assert seq_rng.getstate() == batch_rng.getstate(), "随机数消耗不一致"
+
+
+def measure(func, rounds: int) -> float:
+    """返回单次调用的平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="武器抽卡性能测试")
+    parser.add_argument("--rounds", type=int, default=20, help="每项测试的重复次数")
+    parser.add_argument("--seed", type=int, default=2025, help="随机种子")
+    args = parser.parse_args()
+
+    engine = gacha.GachaEngine(
+        DictCatalog(load_weapons()), FIVE_STAR_PROB, FOUR_STAR_PROB
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        check_equivalence(engine, args.seed, tmp_dir)
+        print(f"一致性校验通过（种子{args.seed}）")
+
+        user_path, backpack_path = tmp_dir / "user.json", tmp_dir / "backpack.json"
+        print(f"{'抽数':>6}{'逐次单抽':>12}{'批量引擎':>12}{'加速比':>8}")
+        for count in (1, 10, 100):
+            user_data, backpack = build_fixture()
+            rng = random.Random(args.seed)
+            before = measure(
+                lambda: sequential_draw(
+                    rng,
+                    user_data,
+                    copy.deepcopy(backpack),
+                    count,
+                    user_path,
+                    backpack_path,
+                ),
+                args.rounds,
+            )
+            after = measure(
+                lambda: batched_draw(
+                    rng,
+                    user_data,
+                    copy.deepcopy(backpack),
+                    count,
+                    user_path,
+                    backpack_path,
+                    engine,
+                ),
+                args.rounds,
+            )
+            print(
+                f"{count:>6}{before:>10.2f}ms{after:>10.2f}ms"
+                f"{before / after if after else 0.0:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
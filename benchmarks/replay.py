@@ -0,0 +1,280 @@
+"""命令流确定性回放\n
+用法：
+  python benchmarks/replay.py 命令流.jsonl --fixture 数据目录 [--seed 2025] [--output 报告.json]
+  python benchmarks/replay.py --compare 报告A.json 报告B.json\n
+把fixture（一个AstrBot的data目录，含plugin_data/astrbot_plugin_akasha_terminal，可选config/插件配置）
+复制到临时目录，以插件真实的命令处理函数依次执行命令流，每条命令在独立的随机数作用域中执行
+（种子由--seed和命令序号派生），最后输出每条命令的回复及数据文件摘要。
+同一命令流、同一fixture、同一种子的两次运行（例如重构前后）结果应完全一致，用--compare比对。\n
+命令流每行一个JSON对象：
+  {"user": "10001", "group": "20001", "command": "十连", "args": ["神铸赋形"], "at": []}
+command可以是命令名或别名。需要安装AstrBot运行环境。为避免结果依赖执行耗时，所有*_cooldown配置置为0；
+抽卡记录、冷却快照、用户索引及JSON中的created_at、成就解锁时间（均含当前时间）不计入数据摘要。
+"""
+
+import argparse
+import ast
+import asyncio
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PLUGIN_NAME = "astrbot_plugin_akasha_terminal"
+# 不计入数据摘要的文件及JSON字段（内容为当前时间）
+EXCLUDED = ("pull_log", "cooldowns.json", "user_index.json")
+VOLATILE_KEYS = {"created_at"}
+# 值为{ID: 当前时间}的JSON字段，只比较ID
+VOLATILE_MAPS = {"achievements"}
+
+
+def load_commands() -> dict[str, str]:
+    """从main.py的@filter.command装饰器解析命令名/别名 -> 处理函数名"""
+    tree = ast.parse((ROOT / "main.py").read_text(encoding="utf-8"))
+    commands = {}
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.AsyncFunctionDef):
+            continue
+        for decorator in node.decorator_list:
+            if not (
+                isinstance(decorator, ast.Call)
+                and isinstance(decorator.func, ast.Attribute)
+                and decorator.func.attr == "command"
+            ):
+                continue
+            names = [ast.literal_eval(decorator.args[0])]
+            for keyword in decorator.keywords:
+                if keyword.arg == "alias":
+                    alias = ast.literal_eval(keyword.value)
+                    names += [alias] if isinstance(alias, str) else list(alias)
+            for name in names:
+                commands[name] = node.name
+    return commands
+
+
+def default_config() -> dict:
+    """由_conf_schema.json生成默认配置"""
+    schema = json.loads((ROOT / "_conf_schema.json").read_text(encoding="utf-8"))
+    return {
+        section: {key: item.get("default") for key, item in value["items"].items()}
+        for section, value in schema.items()
+        if value.get("type") == "object"
+    }
+
+
+def prepare_data(fixture: Path, root: Path) -> dict:
+    """复制fixture到临时AstrBot根目录，返回回放使用的插件配置"""
+    data_dir = root / "data"
+    shutil.copytree(fixture, data_dir)
+    (data_dir / "plugin_data" / PLUGIN_NAME).mkdir(parents=True, exist_ok=True)
+    config = default_config()
+    config_file = data_dir / "config" / f"{PLUGIN_NAME}_config.json"
+    if config_file.exists():
+        saved = json.loads(config_file.read_text(encoding="utf-8-sig"))
+        for section, items in saved.items():
+            if isinstance(items, dict):
+                config.setdefault(section, {}).update(items)
+    for items in config.values():
+        for key in items:
+            if key.endswith("_cooldown"):
+                items[key] = 0
+    config_file.parent.mkdir(parents=True, exist_ok=True)
+    config_file.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+    (data_dir / "plugin_data" / PLUGIN_NAME / "cooldowns.json").unlink(missing_ok=True)
+    return config
+
+
+def render(components) -> str:
+    """将消息链转换为文本（图片用占位符表示）"""
+    if isinstance(components, str):
+        return components
+    parts = []
+    for component in getattr(components, "chain", components):
+        if hasattr(component, "text"):
+            parts.append(component.text)
+        elif hasattr(component, "qq"):
+            parts.append(f"@{component.qq}")
+        else:
+            parts.append(f"[{type(component).__name__}]")
+    return "".join(parts)
+
+
+class ReplayBot:
+    """记录群管理调用，群成员信息返回固定昵称"""
+
+    def __init__(self, calls: list):
+        self.calls = calls
+
+    async def get_group_member_info(self, group_id, user_id, **kwargs):
+        return {"card": "", "nickname": f"用户{user_id}"}
+
+    async def set_group_ban(self, **kwargs):
+        self.calls.append(["set_group_ban", kwargs])
+
+
+class ReplayEvent:
+    """回放用的消息事件：提供插件用到的事件接口并记录全部回复"""
+
+    SELF_ID = "10000"
+
+    def __init__(self, entry: dict, at_cls):
+        self.sender = str(entry["user"])
+        self.group = str(entry.get("group", ""))
+        self.message_str = " ".join(
+            [entry["command"], *map(str, entry.get("args", []))]
+        )
+        self.messages = [at_cls(qq=str(qq)) for qq in entry.get("at", [])]
+        self.replies: list = []
+        self.bot = ReplayBot(self.replies)
+
+    def get_sender_id(self):
+        return self.sender
+
+    def get_group_id(self):
+        return self.group
+
+    def get_self_id(self):
+        return self.SELF_ID
+
+    def get_messages(self):
+        return self.messages
+
+    def plain_result(self, text):
+        return text
+
+    def chain_result(self, components):
+        return components
+
+    async def send(self, result):
+        self.replies.append(render(result))
+
+    def stop_event(self):
+        pass
+
+
+def strip_volatile(value):
+    if isinstance(value, dict):
+        return {
+            k: sorted(v) if k in VOLATILE_MAPS else strip_volatile(v)
+            for k, v in value.items()
+            if k not in VOLATILE_KEYS
+        }
+    if isinstance(value, list):
+        return [strip_volatile(v) for v in value]
+    return value
+
+
+def digest_tree(plugin_dir: Path) -> dict[str, str]:
+    """数据文件摘要（JSON文件去掉时间字段后按规范形式计算）"""
+    digests = {}
+    for path in sorted(plugin_dir.rglob("*")):
+        relative = path.relative_to(plugin_dir).as_posix()
+        if not path.is_file() or relative.startswith(EXCLUDED):
+            continue
+        content = path.read_bytes()
+        if path.suffix == ".json":
+            data = strip_volatile(json.loads(content.decode("utf-8-sig")))
+            content = json.dumps(data, ensure_ascii=False, sort_keys=True).encode()
+        digests[relative] = hashlib.sha256(content).hexdigest()
+    return digests
+
+
+async def replay(stream: Path, fixture: Path, seed: int) -> dict:
+    commands = load_commands()
+    entries = [
+        json.loads(line)
+        for line in stream.read_text(encoding="utf-8").splitlines()
+        if line.strip()
+    ]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        config = prepare_data(fixture, root)
+        # AstrBot按ASTRBOT_ROOT（旧版本按工作目录）确定data目录，须在导入插件前设置
+        os.environ["ASTRBOT_ROOT"] = str(root)
+        os.chdir(root)
+        sys.path.insert(0, str(ROOT.parent))
+        plugin_main = importlib.import_module(f"{ROOT.name}.main")
+        utils = importlib.import_module(f"{ROOT.name}.utils.utils")
+        derive_seed = importlib.import_module(f"{ROOT.name}.utils.rng").derive_seed
+        at_cls = importlib.import_module("astrbot.api.message_components").At
+
+        class ReplayContext:
+            def get_config(self):
+                return {"admins_id": []}
+
+        plugin = plugin_main.AkashaTerminal(ReplayContext(), config)
+        results = []
+        for index, entry in enumerate(entries):
+            handler_name = commands.get(entry["command"])
+            if handler_name is None:
+                raise SystemExit(f"第{index + 1}行：未知命令 {entry['command']}")
+            event = ReplayEvent(entry, at_cls)
+            with utils.rng.scope(derive_seed(seed, index)):
+                handler = getattr(plugin, handler_name)(event)
+                if inspect.isasyncgen(handler):
+                    async for result in handler:
+                        event.replies.append(render(result))
+                else:
+                    await handler
+            results.append(
+                {
+                    "index": index + 1,
+                    "command": entry["command"],
+                    "replies": event.replies,
+                }
+            )
+        await plugin.terminate()
+        files = digest_tree(root / "data" / "plugin_data" / PLUGIN_NAME)
+        os.chdir(cwd)
+    return {"seed": seed, "commands": results, "files": files}
+
+
+def compare(path_a: Path, path_b: Path) -> int:
+    a = json.loads(path_a.read_text(encoding="utf-8"))
+    b = json.loads(path_b.read_text(encoding="utf-8"))
+    differences = 0
+    for left, right in zip(a["commands"], b["commands"]):
+        if left != right:
+            differences += 1
+            print(f"命令#{left['index']}（{left['command']}）回复不同：")
+            print(f"  A: {left['replies']}\n  B: {right['replies']}")
+    if len(a["commands"]) != len(b["commands"]):
+        differences += 1
+        print(f"命令数不同：{len(a['commands'])} / {len(b['commands'])}")
+    for name in sorted(set(a["files"]) | set(b["files"])):
+        if a["files"].get(name) != b["files"].get(name):
+            differences += 1
+            print(f"数据文件不同：{name}")
+    print("结果完全一致" if not differences else f"共{differences}处不同")
+    return 1 if differences else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("stream", nargs="?", type=Path, help="命令流JSONL文件")
+    parser.add_argument("--fixture", type=Path, help="AstrBot data目录")
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--output", type=Path, help="报告输出路径（默认打印）")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("A", "B"))
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(compare(*args.compare))
+    if not args.stream or not args.fixture:
+        parser.error("回放需要命令流文件和--fixture")
+    report = asyncio.run(replay(args.stream, args.fixture.resolve(), args.seed))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
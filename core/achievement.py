@@ -0,0 +1,110 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from astrbot.api import logger
+from astrbot.api.star import StarTools
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+from ..utils.achievements import (
+    UNLOCKED_KEY,
+    AchievementDef,
+    task_counters,
+    weapon_counters,
+)
+from ..utils.utils import (
+    achievements,
+    epoch_clock,
+    get_user_data_and_backpack,
+    is_user_registered,
+    read_json,
+    user_store,
+    write_json,
+)
+
+# 成就分组的展示名称
+GROUP_NAMES = {"task": "📋 任务成就", "weapon": "⚔️ 武器成就"}
+
+
+class Achievement:
+    """成就系统（解锁判断见utils.achievements.AchievementEngine）"""
+
+    def __init__(self):
+        PLUGIN_DATA_DIR = Path(StarTools.get_data_dir("astrbot_plugin_akasha_terminal"))
+        self.user_data_path = PLUGIN_DATA_DIR / "user_data"
+
+    async def check(
+        self,
+        user_id: str,
+        user_data: Dict[str, Any],
+        counters: Dict[str, int],
+        backpack: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """计数器变化后检查成就（须在该用户的事务内调用，调用方负责保存用户数据），返回新解锁成就的播报文本\n
+        从未检查过成就的旧数据先用全部计数器补查一次"""
+        new: list[AchievementDef] = []
+        if achievements.needs_backfill(user_data):
+            if backpack is None:
+                backpack = await get_user_data_and_backpack(user_id, "user_backpack")
+            new += achievements.backfill(user_data, backpack["weapon"])
+        new += achievements.evaluate(user_data, counters)
+        return achievements.announce(new)
+
+    async def ensure(self, user_id: str, user_data: Dict[str, Any]):
+        """查看成就前确保旧数据已补查过成就（补查结果写入用户数据并同步到user_data）"""
+        if not achievements.needs_backfill(user_data):
+            return
+        try:
+            async with user_store.transaction(user_id):
+                file_path = self.user_data_path / f"{user_id}.json"
+                current = await read_json(file_path)
+                if achievements.needs_backfill(current):
+                    await self.check(user_id, current, {})
+                    await write_json(file_path, current)
+                user_data[UNLOCKED_KEY] = current[UNLOCKED_KEY]
+        except Exception as e:
+            logger.error(f"补查用户{user_id}的成就失败: {str(e)}")
+
+    async def handle_my_achievements(self, event: AiocqhttpMessageEvent) -> str:
+        """查看全部成就的解锁情况、进度及全服解锁人数"""
+        user_id = str(event.get_sender_id())
+        if not await is_user_registered(user_id):
+            return "你的信息不存在，请先进行一次签到来注册信息~"
+        try:
+            user_data, backpack = await get_user_data_and_backpack(user_id)
+            await self.ensure(user_id, user_data)
+            unlocked = user_data.get(UNLOCKED_KEY, {})
+            counters = task_counters(user_data.get("task", {}))
+            counters.update(weapon_counters(backpack["weapon"]))
+
+            message = (
+                f"\n🏅 我的成就（{len(unlocked)}/{len(achievements.definitions)}）\n"
+            )
+            for group, group_name in GROUP_NAMES.items():
+                message += f"\n{group_name}\n"
+                for definition in achievements.definitions.values():
+                    if definition.group != group:
+                        continue
+                    if definition.id in unlocked:
+                        date = datetime.fromtimestamp(
+                            unlocked[definition.id], epoch_clock.tz
+                        )
+                        status = f"✅ {date.strftime('%Y-%m-%d')}解锁"
+                    else:
+                        progress = min(
+                            counters.get(definition.counter, 0), definition.threshold
+                        )
+                        status = f"🔒 {progress}/{definition.threshold}"
+                    message += (
+                        f"{definition.badge} {definition.name}：{definition.description}\n"
+                        f"   {status}"
+                    )
+                    if achievements.ready:
+                        message += f" · 全服{achievements.holders(definition.id)}人解锁"
+                    message += "\n"
+            return message
+        except Exception as e:
+            logger.error(f"查看成就失败: {str(e)}")
+            return "查看成就失败，请稍后再试~"
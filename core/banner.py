@@ -0,0 +1,254 @@
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+from zoneinfo import ZoneInfo
+
+from astrbot.api import logger
+
+from ..utils.catalog import ReloadableCatalog
+from ..utils.weapon_bag import STAR_ID_RANGES, star_of
+from ..utils.weapon_catalog import WeaponCatalog
+from .gacha import (
+    FIVE_STAR_PITY_START,
+    FIVE_STAR_PITY_STEP,
+    FOUR_STAR_PITY,
+    AliasTable,
+    GachaEngine,
+)
+
+# 常驻卡池ID（保底计数保存在背包武器数据顶层，与旧数据兼容）
+STANDARD_BANNER_ID = "standard"
+# 卡池开放时间格式（北京时间）
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+CN_TIMEZONE = ZoneInfo("Asia/Shanghai")
+
+
+class Banner:
+    """卡池：概率参数、UP武器、开放时间及预计算好的抽卡引擎"""
+
+    __slots__ = ("id", "name", "description", "start", "end", "rate_up", "engine")
+
+    def __init__(
+        self,
+        banner_id: str,
+        name: str,
+        engine: GachaEngine,
+        description: str = "",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        rate_up: Optional[Mapping[str, tuple[str, ...]]] = None,
+    ):
+        self.id = banner_id
+        self.name = name
+        self.description = description
+        self.start = start
+        self.end = end
+        self.rate_up = MappingProxyType(dict(rate_up or {}))  # 星级 -> UP武器ID
+        self.engine = engine
+
+    @property
+    def pity_key(self) -> Optional[str]:
+        """背包中保存该卡池保底计数的键，常驻卡池为None（使用顶层计数）"""
+        return None if self.id == STANDARD_BANNER_ID else self.id
+
+    def is_active(self, now: Optional[datetime] = None) -> bool:
+        """卡池当前是否开放"""
+        now = now or datetime.now(CN_TIMEZONE)
+        if self.start and now < self.start:
+            return False
+        if self.end and now >= self.end:
+            return False
+        return True
+
+    def is_ended(self, now: Optional[datetime] = None) -> bool:
+        """卡池是否已结束"""
+        now = now or datetime.now(CN_TIMEZONE)
+        return bool(self.end and now >= self.end)
+
+
+def _parse_time(value: Any, field: str, errors: list[str]) -> Optional[datetime]:
+    if value in (None, ""):
+        return None
+    try:
+        return datetime.strptime(str(value), TIME_FORMAT).replace(tzinfo=CN_TIMEZONE)
+    except ValueError:
+        errors.append(f"{field}格式应为{TIME_FORMAT}：{value}")
+        return None
+
+
+def _number(raw: dict, field: str, default: float, errors: list[str]) -> float:
+    value = raw.get(field, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        errors.append(f"{field}必须是数字：{value}")
+        return default
+    return value
+
+
+def build_banner(banner_id: str, raw: Any, weapons: WeaponCatalog) -> Banner:
+    """校验卡池定义并构建卡池（概率表与UP武器别名表），定义有误时抛出ValueError"""
+    if not isinstance(raw, dict):
+        raise ValueError("卡池定义必须是对象")
+    errors: list[str] = []
+    name = raw.get("name")
+    if not isinstance(name, str) or not name.strip():
+        errors.append("缺少卡池名称name")
+    five_star_prob = _number(raw, "five_star_prob", 1, errors)
+    four_star_prob = _number(raw, "four_star_prob", 5, errors)
+    pity_start = _number(raw, "pity_start", FIVE_STAR_PITY_START, errors)
+    pity_step = _number(raw, "pity_step", FIVE_STAR_PITY_STEP, errors)
+    four_star_pity = _number(raw, "four_star_pity", FOUR_STAR_PITY, errors)
+    if not 0 < five_star_prob <= 100 or not 0 <= four_star_prob <= 100:
+        errors.append("五星/四星基础概率必须在0-100之间")
+    elif five_star_prob + four_star_prob > 100:
+        errors.append("五星与四星基础概率之和不能超过100")
+    if int(pity_start) != pity_start or pity_start < 0:
+        errors.append("pity_start必须是非负整数")
+    if pity_step <= 0:
+        errors.append("pity_step必须大于0，否则没有五星硬保底")
+    if int(four_star_pity) != four_star_pity or four_star_pity < 1:
+        errors.append("four_star_pity必须是正整数")
+    start = _parse_time(raw.get("start"), "start", errors)
+    end = _parse_time(raw.get("end"), "end", errors)
+    if start and end and end <= start:
+        errors.append("结束时间必须晚于开始时间")
+
+    rate_up, pools = {}, {}
+    rate_up_raw = raw.get("rate_up", {})
+    if not isinstance(rate_up_raw, dict):
+        errors.append("rate_up必须是对象")
+        rate_up_raw = {}
+    for star, up in rate_up_raw.items():
+        if star not in STAR_ID_RANGES:
+            errors.append(f"未知星级：{star}")
+            continue
+        up_ids = [str(weapon_id) for weapon_id in (up or {}).get("ids", [])]
+        share = (up or {}).get("share", 50)
+        if not up_ids:
+            errors.append(f"{star}的UP武器列表为空")
+            continue
+        if isinstance(share, bool) or not isinstance(share, (int, float)):
+            errors.append(f"{star}的UP占比必须是数字")
+            continue
+        if not 0 < share <= 100:
+            errors.append(f"{star}的UP占比必须在0-100之间")
+            continue
+        invalid = [
+            weapon_id
+            for weapon_id in up_ids
+            if weapons.get(weapon_id) is None or star_of(weapon_id) != star
+        ]
+        if invalid:
+            errors.append(f"{star}的UP武器不存在或星级不符：{', '.join(invalid)}")
+            continue
+        others = [i for i in weapons.ids_of_star(star) if i not in up_ids]
+        # UP武器平分share%，其余武器平分剩余概率
+        items = up_ids + others
+        weights = [share / len(up_ids)] * len(up_ids)
+        weights += [(100 - share) / len(others)] * len(others) if others else []
+        pools[star] = AliasTable(items, weights)
+        rate_up[star] = tuple(up_ids)
+    if errors:
+        raise ValueError("；".join(errors))
+
+    engine = GachaEngine(
+        weapons,
+        five_star_prob,
+        four_star_prob,
+        pity_start=int(pity_start),
+        pity_step=pity_step,
+        four_star_pity=int(four_star_pity),
+        pools=pools,
+    )
+    return Banner(
+        banner_id,
+        name.strip(),
+        engine,
+        description=str(raw.get("description", "")),
+        start=start,
+        end=end,
+        rate_up=rate_up,
+    )
+
+
+class _BannerSnapshot:
+    """某一版本卡池数据"""
+
+    __slots__ = ("by_id", "by_name")
+
+    def __init__(self, raw: dict, weapons: WeaponCatalog):
+        by_id, by_name = {}, {}
+        if not isinstance(raw, dict):
+            logger.error("卡池数据必须是以卡池ID为键的对象")
+            raw = {}
+        for banner_id, banner_raw in raw.items():
+            try:
+                banner = build_banner(str(banner_id), banner_raw, weapons)
+            except ValueError as e:
+                logger.error(f"卡池 {banner_id} 定义有误，已忽略: {str(e)}")
+                continue
+            if banner.name in by_name:
+                logger.error(f"卡池 {banner_id} 与其他卡池重名，已忽略: {banner.name}")
+                continue
+            by_id[banner.id] = banner
+            by_name[banner.name] = banner
+        if STANDARD_BANNER_ID not in by_id:
+            logger.warning("卡池数据中没有有效的常驻卡池，使用默认常驻卡池")
+            banner = Banner(STANDARD_BANNER_ID, "常驻祈愿", GachaEngine(weapons))
+            by_id = {STANDARD_BANNER_ID: banner, **by_id}
+            by_name.setdefault(banner.name, banner)
+        self.by_id = MappingProxyType(by_id)
+        self.by_name = MappingProxyType(by_name)
+
+
+class BannerCatalog(ReloadableCatalog[_BannerSnapshot]):
+    """卡池目录\n
+    banners.json在首次使用和文件修改后加载，逐个校验卡池定义（有误的卡池记录日志并忽略），
+    并为每个卡池预计算五星概率表和UP武器的别名表。武器数据重新加载后也会重建。
+    """
+
+    label = "卡池数据"
+
+    def __init__(
+        self, file_path: Path, weapons: WeaponCatalog, check_interval: float = 2.0
+    ):
+        super().__init__(file_path, check_interval)
+        self.weapons = weapons
+        self._weapon_version: Optional[int] = None
+
+    def _build(self, raw: dict) -> _BannerSnapshot:
+        # 先触发武器数据的加载/更新检查，再记录构建时使用的版本
+        self.weapons.all()
+        self._weapon_version = self.weapons.version
+        return _BannerSnapshot(raw, self.weapons)
+
+    def _describe(self, snapshot: _BannerSnapshot) -> str:
+        return f"（{len(snapshot.by_id)}个卡池）"
+
+    def _current(self) -> _BannerSnapshot:
+        snapshot = super()._current()
+        self.weapons.all()
+        if self.weapons.version != self._weapon_version:
+            # UP武器的别名表依赖武器数据，武器数据变化后重建（失败时沿用旧卡池，不再重试）
+            self._weapon_version = self.weapons.version
+            self._load(self._mtime)
+            snapshot = self._snapshot
+        return snapshot
+
+    @property
+    def standard(self) -> Banner:
+        """常驻卡池"""
+        return self._current().by_id[STANDARD_BANNER_ID]
+
+    def get(self, banner_id: str) -> Optional[Banner]:
+        """根据卡池ID获取卡池"""
+        return self._current().by_id.get(banner_id)
+
+    def find(self, key: str) -> Optional[Banner]:
+        """根据卡池名称或ID查找卡池"""
+        snapshot = self._current()
+        return snapshot.by_name.get(key) or snapshot.by_id.get(key)
+
+    def all(self) -> tuple[Banner, ...]:
+        """全部卡池（按定义顺序）"""
+        return tuple(self._current().by_id.values())
@@ -1,8 +1,6 @@
 import asyncio
-import random
-import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Optional
 
 import astrbot.api.message_components as Comp
 from astrbot.api import logger
@@ -14,13 +12,19 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
 
 # 导入工具函数
 from ..utils.utils import (
+    cooldowns,
     get_at_ids,
     get_nickname,
     get_user_data_and_backpack,
+    group_members,
+    is_user_registered,
     read_json,
     read_json_sync,
+    rng,
+    user_store,
     write_json,
 )
+from ..utils.weapon_bag import star_counts
 from .task import Task
 
 # 挑战bot时的反馈语录列表
@@ -74,9 +78,6 @@ challenge_self_text_list = [
 
 class Battle:
     def __init__(self):
-        # 冷却时间存储
-        self.duel_cd: Dict[str, float] = {}
-
         # 数据路径
         PLUGIN_DATA_DIR = Path(StarTools.get_data_dir("astrbot_plugin_akasha_terminal"))
         self.user_data_path = PLUGIN_DATA_DIR / "user_data"
@@ -92,7 +93,6 @@ class Battle:
 
         # 配置
         config_data = read_json_sync(self.config_file, "utf-8-sig")
-        self.duel_cooldown: int = config_data["battle_system"].get("duel_cooldown", 10)
         self.magnification: float = config_data["battle_system"].get(
             "combat_effectiveness_coefficient", 2
         )
@@ -102,30 +102,48 @@ class Battle:
 
     async def is_cooling(self, user_id: str) -> tuple[bool, float]:
         """检查用户是否在冷却中"""
-        if user_id in self.duel_cd:
-            remaining = self.duel_cd[user_id] - time.time()
-            if remaining > 0:
-                return True, remaining
-            del self.duel_cd[user_id]
-        return False, 0
+        remaining = cooldowns.remaining("duel", user_id)
+        return remaining > 0, remaining
 
     async def set_cooling(self, user_id: str):
-        """设置冷却"""
-        self.duel_cd[user_id] = time.time() + self.duel_cooldown
+        """设置冷却（时长为配置中的duel_cooldown）"""
+        cooldowns.set("duel", user_id)
 
     async def load_weapon_count(self, user_id: str) -> tuple[int, int, int]:
         """加载用户武器数量"""
         try:
             backpack = await get_user_data_and_backpack(user_id, "user_backpack")
-            weapon_data = backpack.get("weapon", {})
-            three_star = weapon_data["武器详细"]["三星武器"]["数量"]
-            four_star = weapon_data["武器详细"]["四星武器"]["数量"]
-            five_star = weapon_data["武器详细"]["五星武器"]["数量"]
-            return three_star, four_star, five_star
+            counts = star_counts(backpack.get("weapon", {}))
+            return counts["三星武器"], counts["四星武器"], counts["五星武器"]
         except Exception as e:
             logger.error(f"解析用户武器数据失败 {user_id}: {e}")
             return 0, 0, 0
 
+    async def try_ban(
+        self, event: AiocqhttpMessageEvent, group_id, user_id: str, duration: int
+    ) -> bool:
+        """禁言群成员，机器人没有权限时不调用接口，返回是否禁言成功"""
+        if not group_id or not await group_members.can_ban(
+            event.bot, group_id, event.get_self_id(), user_id
+        ):
+            return False
+        try:
+            await event.bot.set_group_ban(
+                group_id=group_id, user_id=user_id, duration=duration
+            )
+            return True
+        except Exception as e:
+            logger.error(f"禁言用户{user_id}失败: {str(e)}")
+            # 权限可能已变化，下次重新获取群成员信息
+            group_members.invalidate(group_id)
+            return False
+
+    @staticmethod
+    def _punish_text(name: str, banned: bool, duration: int) -> str:
+        if banned:
+            return f"{name}接受惩罚，已被禁言{duration / 60}分钟！"
+        return f"{name}本应被禁言{duration / 60}分钟，可惜我没有禁言权限QAQ"
+
     async def handle_duel_command(
         self, event: AiocqhttpMessageEvent, parts: list[str], admins_id: list[str]
     ) -> Optional[str]:
@@ -173,16 +191,11 @@ class Battle:
             # 检查是否@自己
             if challenger_id == opponent_id:
                 message.append(Comp.At(qq=challenger_id))
-                try:
-                    await event.bot.set_group_ban(
-                        group_id=group_id,
-                        user_id=challenger_id,
-                        duration=60,
-                    )
+                if await self.try_ban(event, group_id, challenger_id, 60):
                     message.append(
-                        Comp.Plain(f"：\n{random.choice(challenge_self_text_list)}")
+                        Comp.Plain(f"：\n{rng.choice(challenge_self_text_list)}")
                     )
-                except Exception:
+                else:
                     message.append(Comp.Plain("：\n我想禁言你一分钟，但权限不足QAQ"))
                 await event.send(event.chain_result(message))
                 event.stop_event()
@@ -192,16 +205,11 @@ class Battle:
             if opponent_id == str(event.get_self_id()):
                 message.append(Comp.At(qq=challenger_id))
                 if challenger_id not in admins_id:
-                    try:
-                        await event.bot.set_group_ban(
-                            group_id=group_id,
-                            user_id=challenger_id,
-                            duration=60,
-                        )
+                    if await self.try_ban(event, group_id, challenger_id, 60):
                         message.append(
-                            Comp.Plain(f"：\n{random.choice(challenge_bot_text_list)}")
+                            Comp.Plain(f"：\n{rng.choice(challenge_bot_text_list)}")
                         )
-                    except Exception:
+                    else:
                         message.append(
                             Comp.Plain("：\n我想禁言你一分钟，但权限不足QAQ")
                         )
@@ -209,14 +217,12 @@ class Battle:
                     event.stop_event()
                     return
             # 判断双方数据文件是否存在
-            cha_file = self.user_data_path / f"{challenger_id}.json"
-            if not cha_file.exists():
+            if not await is_user_registered(challenger_id):
                 await event.send(
                     event.plain_result("你的信息不存在哦，请先进行一次签到来注册信息~")
                 )
                 return
-            opp_file = self.user_data_path / f"{opponent_id}.json"
-            if not opp_file.exists():
+            if not await is_user_registered(opponent_id):
                 await event.send(
                     event.plain_result(
                         "对方的信息不存在，请让他先进行一次签到来注册信息~"
@@ -224,19 +230,52 @@ class Battle:
                 )
                 return
             # 读取用户昵称
-            cha_name = await get_nickname(event, challenger_id)
-            opp_name = await get_nickname(event, opponent_id)
-            # 读取用户数据
-            cha_data = await read_json(self.user_data_path / f"{challenger_id}.json")
-            opp_data = await read_json(self.user_data_path / f"{opponent_id}.json")
-
-            # 判定双方权限
-            is_admin1 = challenger_id in admins_id or (
-                cha_data["battle"].get("privilege") == 1
-            )
-            is_admin2 = opponent_id in admins_id or (
-                opp_data["battle"].get("privilege") == 1
+            cha_name, opp_name = await asyncio.gather(
+                get_nickname(event, challenger_id), get_nickname(event, opponent_id)
             )
+            # 在事务内读取双方数据并判定结果，保证判定基于一致的数据（事务内不进行网络请求）
+            async with user_store.transaction(challenger_id, opponent_id):
+                cha_data = await read_json(
+                    self.user_data_path / f"{challenger_id}.json"
+                )
+                opp_data = await read_json(self.user_data_path / f"{opponent_id}.json")
+
+                # 判定双方权限
+                is_admin1 = challenger_id in admins_id or (
+                    cha_data["battle"].get("privilege") == 1
+                )
+                is_admin2 = opponent_id in admins_id or (
+                    opp_data["battle"].get("privilege") == 1
+                )
+                if not (is_admin1 and is_admin2):
+                    # 读取用户武器数量
+                    numcha_3, numcha_4, numcha_5 = await self.load_weapon_count(
+                        challenger_id
+                    )
+                    numopp_3, numopp_4, numopp_5 = await self.load_weapon_count(
+                        opponent_id
+                    )
+                    # 计算战斗力
+                    cha_level = cha_data["battle"].get("level", 0)
+                    opp_level = opp_data["battle"].get("level", 0)
+                    win_level = cha_level - opp_level
+                    win_prob = (
+                        50
+                        + self.magnification * win_level
+                        + numcha_3
+                        + numcha_4 * 2
+                        + numcha_5 * 3
+                        - (numopp_3 + numopp_4 * 2 + numopp_5 * 3)
+                    )
+                    # 确保概率在合理范围
+                    win_prob = max(0, min(100, win_prob))
+                    # 判断结果
+                    random_value = rng.random() * 100
+                    # 挑战者失败
+                    random_time_cha = (rng.randint(1, 5)) * 60
+                    # 被挑战者失败
+                    random_time_opp = (rng.randint(1, 3)) * 60
+
             if is_admin1 and is_admin2:
                 await event.send(
                     event.plain_result(
@@ -244,23 +283,6 @@ class Battle:
                     )
                 )
                 return
-            # 读取用户武器数量
-            numcha_3, numcha_4, numcha_5 = await self.load_weapon_count(challenger_id)
-            numopp_3, numopp_4, numopp_5 = await self.load_weapon_count(opponent_id)
-            # 计算战斗力
-            cha_level = cha_data["battle"].get("level", 0)
-            opp_level = opp_data["battle"].get("level", 0)
-            win_level = cha_level - opp_level
-            win_prob = (
-                50
-                + self.magnification * win_level
-                + numcha_3
-                + numcha_4 * 2
-                + numcha_5 * 3
-                - (numopp_3 + numopp_4 * 2 + numopp_5 * 3)
-            )
-            # 确保概率在合理范围
-            win_prob = max(0, min(100, win_prob))
 
             message.append(Comp.At(qq=challenger_id))
             message_part = (
@@ -275,27 +297,19 @@ class Battle:
             await event.send(event.chain_result(message))
             # 模拟战斗过程，暂停3秒
             await asyncio.sleep(3)
-            # 判断结果
-            random_value = random.random() * 100
-            # 挑战者失败
-            random_time_cha = (random.randint(1, 5)) * 60
-            # 被挑战者失败
-            random_time_opp = (random.randint(1, 3)) * 60
             try:
                 message2 = []
 
                 # 自己是管理员直接胜利
                 if is_admin1:
                     message2.append(Comp.At(qq=challenger_id))
-                    await event.bot.set_group_ban(
-                        group_id=group_id,
-                        user_id=opponent_id,
-                        duration=random_time_opp,
+                    banned = await self.try_ban(
+                        event, group_id, opponent_id, random_time_opp
                     )
                     message2_part = (
                         f"：\n你使用了管理员之力获得了胜利\n"
                         f"恭喜你与 {opp_name} 决斗成功\n"
-                        f"{opp_name}接受惩罚，已被禁言{random_time_opp / 60}分钟！"
+                        f"{self._punish_text(opp_name, banned, random_time_opp)}"
                     )
                     message2.append(Comp.Plain(message2_part))
                     await self.task.update_task_progress(
@@ -310,32 +324,31 @@ class Battle:
                 # 对方是管理员直接胜利
                 elif is_admin2:
                     message2.append(Comp.At(qq=challenger_id))
-                    await event.bot.set_group_ban(
-                        group_id=group_id,
-                        user_id=challenger_id,
-                        duration=random_time_cha,
+                    banned = await self.try_ban(
+                        event, group_id, challenger_id, random_time_cha
                     )
                     message2_part = (
                         f"：\n对方不讲武德，使用了管理员之力获得了胜利\n"
-                        f"你接受惩罚，已被禁言{random_time_cha / 60}分钟!"
+                        f"{self._punish_text('你', banned, random_time_cha)}"
                     )
                     message2.append(Comp.Plain(message2_part))
                     await self.task.update_task_progress(
-                        event=event, user_id=opponent_id, track_key="duel_wins", value=1
+                        event=event,
+                        user_id=opponent_id,
+                        track_key="duel_wins",
+                        value=1,
                     )
                     await event.send(event.chain_result(message2))
                     event.stop_event()
                 # 挑战者胜利
                 elif win_prob > random_value:
                     message2.append(Comp.At(qq=challenger_id))
-                    await event.bot.set_group_ban(
-                        group_id=group_id,
-                        user_id=opponent_id,
-                        duration=random_time_opp,
+                    banned = await self.try_ban(
+                        event, group_id, opponent_id, random_time_opp
                     )
                     message2_part = (
                         f"：\n恭喜你与 {opp_name} 决斗成功\n"
-                        f"{opp_name}接受惩罚，已被禁言{random_time_opp / 60}分钟！"
+                        f"{self._punish_text(opp_name, banned, random_time_opp)}"
                     )
                     message2.append(Comp.Plain(message2_part))
                     await self.task.update_task_progress(
@@ -349,28 +362,35 @@ class Battle:
                 # 挑战者失败
                 else:
                     message2.append(Comp.At(qq=challenger_id))
-                    await event.bot.set_group_ban(
-                        group_id=group_id,
-                        user_id=challenger_id,
-                        duration=random_time_cha,
+                    banned = await self.try_ban(
+                        event, group_id, challenger_id, random_time_cha
                     )
                     message2_part = (
                         f"：\n你与 {opp_name} 决斗失败\n"
-                        f"你接受惩罚，已被禁言{random_time_cha / 60}分钟！"
+                        f"{self._punish_text('你', banned, random_time_cha)}"
                     )
                     message2.append(Comp.Plain(message2_part))
                     await self.task.update_task_progress(
-                        event=event, user_id=opponent_id, track_key="duel_wins", value=1
+                        event=event,
+                        user_id=opponent_id,
+                        track_key="duel_wins",
+                        value=1,
                     )
                     await event.send(event.chain_result(message2))
                     event.stop_event()
 
                 # 更新任务进度（参与决斗次数+1）
                 await self.task.update_task_progress(
-                    event=event, user_id=challenger_id, track_key="duel_count", value=1
+                    event=event,
+                    user_id=challenger_id,
+                    track_key="duel_count",
+                    value=1,
                 )
                 await self.task.update_task_progress(
-                    event=event, user_id=opponent_id, track_key="duel_count", value=1
+                    event=event,
+                    user_id=opponent_id,
+                    track_key="duel_count",
+                    value=1,
                 )
 
             except Exception:
@@ -0,0 +1,222 @@
+import random
+from typing import Any, Dict, Mapping, Optional, Protocol, Sequence
+
+from ..utils.weapon_bag import add_weapon
+
+# 抽中高星武器时伴侣增加的好感度
+STAR_LOVE_BONUS = {"五星武器": 30, "四星武器": 20}
+# 四星保底：每10抽必出四星及以上
+FOUR_STAR_PITY = 10
+# 五星概率从第几次未出五星开始递增，及每抽递增的概率
+FIVE_STAR_PITY_START = 64
+FIVE_STAR_PITY_STEP = 6.5
+# 五星概率表的最大长度（防止异常配置下概率永远达不到100%）
+_MAX_PITY = 1000
+
+
+class WeaponSource(Protocol):
+    """抽卡引擎所需的武器数据接口（WeaponCatalog满足该接口）"""
+
+    def ids_of_star(self, star: str) -> tuple[str, ...]: ...
+
+    def get(self, weapon_id: str) -> Optional[Mapping[str, Any]]: ...
+
+
+class AliasTable:
+    """Walker别名表：按权重O(1)抽样（每次抽样只消耗一个随机数）"""
+
+    __slots__ = ("items", "prob", "alias")
+
+    def __init__(self, items: Sequence[Any], weights: Sequence[float]):
+        if not items or len(items) != len(weights):
+            raise ValueError("别名表的条目与权重数量不一致或为空")
+        if any(w < 0 for w in weights) or sum(weights) <= 0:
+            raise ValueError("别名表的权重必须非负且总和大于0")
+        n = len(items)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        # 剩余未配对的条目因浮点误差略偏离1，按1处理
+        prob, alias = [1.0] * n, list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less], alias[less] = scaled[less], more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        self.items = tuple(items)
+        self.prob = tuple(prob)
+        self.alias = tuple(alias)
+
+    def sample(self, rng=random) -> Any:
+        """按权重抽取一个条目"""
+        u = rng.random() * len(self.items)
+        i = min(int(u), len(self.items) - 1)
+        return self.items[i] if u - i < self.prob[i] else self.items[self.alias[i]]
+
+    def probability(self, item: Any) -> float:
+        """条目被抽中的概率（用于展示和校验）"""
+        n = len(self.items)
+        total = 0.0
+        for i, current in enumerate(self.items):
+            if current == item:
+                total += self.prob[i] / n
+            if self.items[self.alias[i]] == item:
+                total += (1 - self.prob[i]) / n
+        return total
+
+
+class DrawResult:
+    """单次抽卡结果"""
+
+    __slots__ = (
+        "star",
+        "weapon_id",
+        "info",
+        "first_acquire",
+        "five_star_prob",
+        "five_star_miss",
+        "four_star_miss",
+    )
+
+    def __init__(
+        self,
+        star: str,
+        weapon_id: str,
+        info: Optional[Mapping[str, Any]],
+        first_acquire: bool,
+        five_star_prob: float,
+        five_star_miss: int,
+        four_star_miss: int,
+    ):
+        self.star = star
+        self.weapon_id = weapon_id
+        self.info = info
+        self.first_acquire = first_acquire
+        # 本次抽卡时的五星概率，及抽完后的保底计数
+        self.five_star_prob = five_star_prob
+        self.five_star_miss = five_star_miss
+        self.four_star_miss = four_star_miss
+
+
+class GachaEngine:
+    """武器抽卡引擎（纯内存计算，不做任何I/O）\n
+    一次调用完成任意次数的抽卡：判定星级、选取武器、推进保底计数、记录拥有情况，
+    全部修改只作用于传入的背包武器数据，由调用方统一落盘。\n
+    五星概率在创建时预计算为按未出五星次数索引的概率表。没有权重池的星级
+    随机数消耗顺序与逐次单抽完全一致（每抽先uniform(0, 100)判定星级，再choice选武器），
+    相同种子下批量结果与逐次单抽相同；有权重池（如UP武器）的星级用别名表抽样。
+    """
+
+    def __init__(
+        self,
+        catalog: WeaponSource,
+        five_star_prob: float = 1,
+        four_star_prob: float = 5,
+        pity_start: int = FIVE_STAR_PITY_START,
+        pity_step: float = FIVE_STAR_PITY_STEP,
+        four_star_pity: int = FOUR_STAR_PITY,
+        pools: Optional[Mapping[str, AliasTable]] = None,
+    ):
+        self.catalog = catalog
+        self.five_star_prob = five_star_prob  # 五星武器基础概率1%
+        self.four_star_prob = four_star_prob  # 四星武器基础概率5%
+        self.pity_start = pity_start
+        self.pity_step = pity_step
+        self.four_star_pity = four_star_pity
+        self.pools = dict(pools or {})
+        self._five_table = self._build_five_table()
+
+    def _build_five_table(self) -> tuple[float, ...]:
+        table = []
+        while len(table) < _MAX_PITY:
+            miss = len(table)
+            prob = self.five_star_prob
+            if miss >= self.pity_start:
+                prob = min(prob + (miss - self.pity_start + 1) * self.pity_step, 100)
+            table.append(prob)
+            if prob >= 100:
+                break
+        return tuple(table)
+
+    def five_star_prob_at(self, five_star_miss: int) -> float:
+        """获取当前五星概率（64抽后每抽+6.5%）"""
+        return self._five_table[min(five_star_miss, len(self._five_table) - 1)]
+
+    def five_star_prob_table(self) -> list[float]:
+        """五星概率表：第i项为已连续i抽未出五星时的概率，最后一项为100%（硬保底）"""
+        return list(self._five_table)
+
+    @property
+    def five_star_pity(self) -> int:
+        """五星硬保底抽数（最多第几抽必出五星）"""
+        return len(self._five_table)
+
+    def roll_star(
+        self, five_star_miss: int, four_star_miss: int, rng=random
+    ) -> tuple[str, float]:
+        """判定本次抽卡的星级，返回(星级, 本次五星概率)"""
+        five_star_prob = self.five_star_prob_at(five_star_miss)
+        # 四星保底判定（每10抽必出）
+        is_four_star_guarantee = four_star_miss >= self.four_star_pity - 1
+        rand_val = rng.uniform(0, 100)
+        if rand_val <= five_star_prob:
+            return "五星武器", five_star_prob
+        if is_four_star_guarantee or rand_val <= five_star_prob + self.four_star_prob:
+            return "四星武器", five_star_prob
+        return "三星武器", five_star_prob
+
+    def pick_weapon(self, star: str, rng=random) -> str:
+        """在某星级中选取武器（有权重池时按权重，否则等概率）"""
+        pool = self.pools.get(star)
+        if pool is not None:
+            return pool.sample(rng)
+        return str(rng.choice(self.catalog.ids_of_star(star)))
+
+    @staticmethod
+    def advance_pity(star: str, five_star_miss: int, four_star_miss: int):
+        """根据本次星级推进保底计数"""
+        if star == "五星武器":
+            return 0, 0
+        if star == "四星武器":
+            return five_star_miss + 1, 0
+        return five_star_miss + 1, four_star_miss + 1
+
+    def draw(
+        self,
+        weapon_data: Dict[str, Any],
+        count: int,
+        rng=random,
+        pity_state: Optional[Dict[str, Any]] = None,
+    ) -> list[DrawResult]:
+        """在背包武器数据上连续抽卡count次（不扣除纠缠之缘）\n
+        pity_state为保存保底计数的字典，默认使用武器数据顶层的计数（常驻卡池）
+        """
+        if pity_state is None:
+            pity_state = weapon_data
+        five_star_miss = pity_state["未出五星计数"]
+        four_star_miss = pity_state["未出四星计数"]
+        weapon_counts = weapon_data["武器计数"]
+        results = []
+        for _ in range(count):
+            star, five_star_prob = self.roll_star(five_star_miss, four_star_miss, rng)
+            weapon_id = self.pick_weapon(star, rng)
+            five_star_miss, four_star_miss = self.advance_pity(
+                star, five_star_miss, four_star_miss
+            )
+            weapon_data["总抽卡次数"] += 1
+            weapon_counts[weapon_id] = weapon_counts.get(weapon_id, 0) + 1
+            results.append(
+                DrawResult(
+                    star,
+                    weapon_id,
+                    self.catalog.get(weapon_id),
+                    add_weapon(weapon_data, weapon_id),
+                    five_star_prob,
+                    five_star_miss,
+                    four_star_miss,
+                )
+            )
+        pity_state["未出五星计数"] = five_star_miss
+        pity_state["未出四星计数"] = four_star_miss
+        return results
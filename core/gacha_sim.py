@@ -0,0 +1,149 @@
+"""武器抽卡蒙特卡洛模拟\n
+用NumPy把大量虚拟账号的保底状态机向量化：每一步为所有账号同时判定一抽，
+判定规则与GachaEngine.roll_star完全一致（五星概率表、64抽后递增、四星十抽保底）。
+numpy为可选依赖，未安装时simulate会抛出RuntimeError。
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 可选依赖
+    np = None
+
+from .gacha import GachaEngine
+
+# 报告中展示的分位数
+PERCENTILES = (50, 90, 99)
+
+
+def five_star_distribution(engine: GachaEngine) -> list[float]:
+    """精确计算首个五星出现在第k抽的概率（第i项对应第i+1抽）"""
+    pmf, survive = [], 1.0
+    for prob in engine.five_star_prob_table():
+        hit = min(prob, 100) / 100
+        pmf.append(survive * hit)
+        survive *= 1 - hit
+    return pmf
+
+
+def _percentile(hist, q: float) -> int:
+    """由计数直方图（第i项对应第i+1抽）计算分位数抽数"""
+    cdf = np.cumsum(hist) / hist.sum()
+    return int(np.searchsorted(cdf, q / 100)) + 1
+
+
+def simulate(
+    engine: GachaEngine,
+    accounts: int = 500_000,
+    pulls: int = 200,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """模拟accounts个账号各抽pulls次，返回统计结果\n
+    每个账号先空抽两轮硬保底作为预热，使保底计数接近长期分布，之后才开始统计概率；
+    出货抽数只统计预热后开始、且在统计窗口内必然结束的区间，避免截断造成的偏差。
+    """
+    if np is None:
+        raise RuntimeError("抽卡模拟需要安装numpy")
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    # 概率换算为[0, 1)上的阈值，与uniform(0, 100) <= 概率等价
+    five_table = np.array(engine.five_star_prob_table()) / 100
+    four_prob = engine.four_star_prob / 100
+    pity = len(five_table)
+    four_pity = engine.four_star_pity
+    warmup = pity * 2
+    # 区间起点不晚于此才能保证在窗口内出货
+    last_start = warmup + pulls - pity
+
+    five_miss = np.zeros(accounts, dtype=np.int32)
+    four_miss = np.zeros(accounts, dtype=np.int32)
+    five_hist = np.zeros(pity, dtype=np.int64)
+    four_hist = np.zeros(four_pity, dtype=np.int64)
+    five_total = four_total = 0
+    for step in range(warmup + pulls):
+        rand_val = rng.random(accounts)
+        five_prob = five_table[five_miss]
+        hit_five = rand_val <= five_prob
+        hit_high = hit_five | (four_miss >= four_pity - 1)
+        hit_high |= rand_val <= five_prob + four_prob
+        if step >= warmup:
+            five_hits = five_miss[hit_five]
+            start_step = step - five_hits
+            five_hits = five_hits[(start_step >= warmup) & (start_step <= last_start)]
+            five_hist += np.bincount(five_hits, minlength=pity)
+            four_hist += np.bincount(four_miss[hit_high], minlength=four_pity)
+            hits = int(np.count_nonzero(hit_five))
+            five_total += hits
+            four_total += int(np.count_nonzero(hit_high)) - hits
+        five_miss += 1
+        five_miss[hit_five] = 0
+        four_miss += 1
+        four_miss[hit_high] = 0
+
+    total = accounts * pulls
+    pmf = five_star_distribution(engine)
+    expected_pulls = sum((i + 1) * p for i, p in enumerate(pmf))
+    pull_numbers = np.arange(1, pity + 1)
+    return {
+        "accounts": accounts,
+        "pulls": pulls,
+        "total": total,
+        "elapsed": time.perf_counter() - start,
+        "five_star": five_total,
+        "four_star": four_total,
+        "three_star": total - five_total - four_total,
+        "five_star_pity": pity,
+        "five_star_hist": five_hist.tolist(),
+        "five_star_mean": float((five_hist * pull_numbers).sum() / five_hist.sum())
+        if five_hist.any()
+        else 0.0,
+        "five_star_max": int(np.flatnonzero(five_hist)[-1]) + 1
+        if five_hist.any()
+        else 0,
+        "five_star_percentiles": {
+            q: _percentile(five_hist, q) for q in PERCENTILES if five_hist.any()
+        },
+        "four_star_pity": four_pity,
+        "four_star_max": int(np.flatnonzero(four_hist)[-1]) + 1
+        if four_hist.any()
+        else 0,
+        "expected_pulls": expected_pulls,
+        "expected_rate": 1 / expected_pulls,
+    }
+
+
+def format_report(report: Dict[str, Any], bucket: int = 10) -> str:
+    """将模拟结果格式化为聊天消息"""
+    total = report["total"]
+    five_rate = report["five_star"] / total
+    message = (
+        "🎲 武器抽卡概率模拟报告\n"
+        f"模拟规模：{report['accounts']}个账号×{report['pulls']}抽="
+        f"{total}抽（耗时{report['elapsed']:.2f}秒）\n"
+        f"五星综合概率：{five_rate:.3%}（理论值{report['expected_rate']:.3%}）\n"
+        f"四星综合概率：{report['four_star'] / total:.3%}\n"
+        f"三星综合概率：{report['three_star'] / total:.3%}\n"
+        f"五星平均出货：{report['five_star_mean']:.2f}抽"
+        f"（理论值{report['expected_pulls']:.2f}抽）\n"
+    )
+    percentiles = report["five_star_percentiles"]
+    if percentiles:
+        message += (
+            "五星出货分位："
+            + "，".join(f"P{q}={value}抽" for q, value in percentiles.items())
+            + "\n"
+        )
+    message += (
+        f"五星最多抽数：{report['five_star_max']}（硬保底{report['five_star_pity']}）\n"
+        f"四星最多抽数：{report['four_star_max']}（保底{report['four_star_pity']}）\n"
+        "五星出货抽数分布："
+    )
+    hist = report["five_star_hist"]
+    hits = sum(hist) or 1
+    for low in range(0, len(hist), bucket):
+        share = sum(hist[low : low + bucket]) / hits
+        high = min(low + bucket, len(hist))
+        message += f"\n  {low + 1}-{high}抽：{share:.2%}"
+    return message
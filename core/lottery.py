@@ -1,7 +1,9 @@
-import json
-import random
+import asyncio
+import time
+from collections import Counter
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Any, Mapping
 from zoneinfo import ZoneInfo
 
 from astrbot.api import logger
@@ -11,16 +13,41 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..utils.achievements import weapon_counters
+from ..utils.asset_index import WeaponAssetIndex
+from ..utils.gacha_image import GachaImageRenderer
+from ..utils.pull_log import STAR_CODES, PullRecord
 from ..utils.utils import (
+    achievements,
+    cooldowns,
     get_at_ids,
     get_user_data_and_backpack,
+    pull_log,
     read_json,
+    rng,
     seconds_to_duration,
+    user_store,
+    weapon_catalog,
     write_json,
 )
+from ..utils.weapon_bag import banner_pity, owned_ids, star_counts, star_of
+from ..utils.weapon_bag import combat_power as weapon_combat_power
+from .achievement import Achievement
+from .banner import CN_TIMEZONE, TIME_FORMAT, Banner, BannerCatalog
+from .gacha import STAR_LOVE_BONUS, DrawResult
+from .gacha_sim import format_report, simulate
 from .task import Task
 
 
+# 抽卡模拟默认规模及总抽数上限
+SIMULATE_DEFAULT_ACCOUNTS = 500_000
+SIMULATE_DEFAULT_PULLS = 200
+SIMULATE_MAX_ACCOUNTS = 5_000_000
+SIMULATE_MAX_TOTAL = 500_000_000
+# 抽卡记录命令单次最多展示条数
+HISTORY_MAX_LIMIT = 50
+
+
 class Lottery:
     def __init__(self, config: AstrBotConfig):
         """初始化抽奖系统，设置路径和概率参数"""
@@ -29,336 +56,386 @@ class Lottery:
         PLUGIN_DIR = Path(__file__).resolve().parent.parent
         self.backpack_path = PLUGIN_DATA_DIR / "user_backpack"
         self.user_data_path = PLUGIN_DATA_DIR / "user_data"
-        self.weapon_file = PLUGIN_DIR / "data" / "weapon.json"
         self.image_base_path = PLUGIN_DIR / "resources" / "weapon_image"
+        # 武器图片索引（启动时扫描并报告缺失/多余的图片）
+        self.assets = WeaponAssetIndex(self.image_base_path, weapon_catalog)
+        self.assets.refresh()
         self.shop_data_file = PLUGIN_DIR / "data" / "shop_data.json"
 
         # 导入任务系统更新任务进度
         self.task = Task()
+        # 成就系统（获得新武器时检查武器成就）
+        self.achievement = Achievement()
 
-        # 从配置接收抽卡冷却时间
-        self.draw_card_cooldown = config.get("other_system", {}).get(
-            "draw_card_cooldown", 10
-        )  # 默认10秒
-
-        # 存储群冷却时间
-        self.group_cooldowns = {}  # {group_id: 下次可抽卡时间}
-
-        # 加载武器数据（按星级分类）{weapon_star: [weapon_id1,weapon_id2, ...]}
-        self.weapon_all_data = self.load_weapon_data() or {}
-
-        # 武器池子概率配置
-        self.five_star_prob = 1  # 五星武器基础概率1%
-        self.four_star_prob = 5  # 四星武器基础概率5%
-        self.three_star_prob = (
-            100 - self.five_star_prob - self.four_star_prob
-        )  # 三星武器基础概率94%
+        # 卡池配置（概率、UP武器、开放时间），常驻卡池五星1%、四星5%
+        self.banners = BannerCatalog(
+            PLUGIN_DIR / "data" / "banners.json", weapon_catalog
+        )
+        # 同一时间只允许一个概率模拟任务
+        self.simulating = False
+
+        # 十连结果合成图（需要Pillow）
+        other_config = config.get("other_system", {})
+        self.draw_result_image = other_config.get("draw_result_image", True)
+        self.image_renderer = GachaImageRenderer(
+            cache_size=other_config.get("draw_image_cache_size", 64),
+            font_path=other_config.get("draw_image_font", ""),
+        )
+        # 百连/千连等批量抽卡单次最多抽数
+        self.bulk_draw_max = other_config.get("bulk_draw_max", 1000)
+        if self.draw_result_image and not self.image_renderer.available:
+            logger.warning("未安装Pillow，十连结果将逐张发送武器图片")
 
     def check_group_cooldown(self, group_id: str) -> int:
         """检查群冷却时间，返回剩余冷却秒数，0表示无冷却"""
         if not group_id:
             return 0  # 私聊无冷却
 
-        current_time = datetime.now(ZoneInfo("Asia/Shanghai")).timestamp()
-        next_available_time = self.group_cooldowns.get(group_id, 0)
-        remaining = next_available_time - current_time
-        return max(remaining, 0)
+        return cooldowns.remaining("draw_card", group_id)
 
     def update_group_cooldown(self, group_id: str):
-        """更新群冷却时间"""
-        if not group_id or self.draw_card_cooldown <= 0:
-            return
-
-        current_time = datetime.now(ZoneInfo("Asia/Shanghai")).timestamp()
-        self.group_cooldowns[group_id] = current_time + self.draw_card_cooldown
-
-    def load_weapon_data(self):
-        """
-        加载武器数据并按星级分类（300-399:三星, 400-499:四星, 500-599:五星）
-        """
-        try:
-            with open(self.weapon_file, "r", encoding="utf-8") as f:
-                weapon_data = json.load(f)
-
-            # 按ID范围分类武器（300-399:三星, 400-499:四星, 500-599:五星）
-            three_star, four_star, five_star = [], [], []
-            for weapon_key in weapon_data.keys():
-                try:
-                    # 提取武器id
-                    weapon_id = int(weapon_key)
-                    if 300 <= weapon_id <= 399:
-                        three_star.append(weapon_id)
-                    elif 400 <= weapon_id <= 499:
-                        four_star.append(weapon_id)
-                    elif 500 <= weapon_id <= 599:
-                        five_star.append(weapon_id)
-                except ValueError:
-                    logger.warning(f"忽略非数字ID的武器: {weapon_key}")
-                    continue
-
-            return {
-                "三星武器": three_star,
-                "四星武器": four_star,
-                "五星武器": five_star,
-            }
-        except FileNotFoundError:
-            logger.error(
-                f"错误：未找到武器数据文件 {self.weapon_file}，请检查路径是否正确"
-            )
-            return None
-        except json.JSONDecodeError:
-            logger.error("错误：武器数据文件格式不正确")
-            return None
+        """更新群冷却时间（时长为配置中的draw_card_cooldown）"""
+        if group_id:
+            cooldowns.set("draw_card", group_id)
 
     # 根据武器id获取武器详细信息
-    async def get_weapon_info(self, weapon_id: str) -> dict | None:
+    def get_weapon_info(self, weapon_id: str) -> Mapping[str, Any] | None:
         """
-        根据武器ID获取武器详细信息\n
+        根据武器ID获取武器详细信息（只读，来自共享武器数据目录）\n
         :param weapon_id: 武器ID
         :return: 武器详细信息
         """
-        weapon_data = await read_json(self.weapon_file)
-        return weapon_data.get(weapon_id)
-
-    async def update_data(
-        self, user_id: str, target_weapon_id: str, user_data, user_backpack
-    ) -> bool:
-        """更新用户背包和武器数据"""
+        return weapon_catalog.get(weapon_id)
+
+    def describe_draw(self, result: DrawResult, user_data) -> str:
+        """生成单次抽卡的提示语，并为高星结果增加伴侣好感度"""
+        love_bonus = STAR_LOVE_BONUS.get(result.star)
+        if not love_bonus:
+            return ""
+        if result.star == "五星武器":
+            message_snippets = "🎉 恭喜获得传说武器！\n"
+        else:
+            message_snippets = "🎉 恭喜获得稀有武器！\n"
+        spouse_name = user_data.get("home", {}).get("spouse_name")
+        if spouse_name not in [0, None, ""]:
+            user_data["home"]["love"] += love_bonus
+            message_snippets += (
+                f"💖 {spouse_name}为你的好运感到高兴！好感度+{love_bonus}\n"
+            )
+        else:
+            message_snippets += "💡 你未绑定伴侣，绑定伴侣可提升好感度\n"
+        return message_snippets
+
+    async def draw_images(
+        self, draw_results: list[DrawResult]
+    ) -> list[str | bytes | None]:
+        """获取抽卡结果图片：多抽优先合成为一张图片（PNG数据），否则逐张返回武器图片路径"""
+        if len(draw_results) > 1 and self.draw_result_image:
+            items = [
+                (r.star, r.info["name"], self.assets.path_of(r.weapon_id))
+                for r in draw_results
+            ]
+            # 合成为CPU密集操作，放到线程中执行
+            image = await asyncio.to_thread(self.image_renderer.render, items)
+            if image:
+                return [image]
+        return [self.assets.path_of(r.weapon_id) for r in draw_results]
+
+    async def log_pulls(
+        self, user_id: str, pity_before: int, draw_results: list[DrawResult]
+    ):
+        """记录本次命令的全部抽卡结果（每抽记录抽之前的未出五星计数）"""
+        now = int(time.time())
+        records = []
+        for result in draw_results:
+            records.append(
+                PullRecord(
+                    now, int(result.weapon_id), STAR_CODES[result.star], pity_before
+                )
+            )
+            pity_before = result.five_star_miss
         try:
-            weapon_info = await self.get_weapon_info(target_weapon_id)
-            if not weapon_info:
-                return False
-
-            weapon_star = weapon_info["class"]
-            weapon_detail = user_backpack["weapon"]["武器详细"][weapon_star]
+            await pull_log.append(user_id, records)
+        except Exception as e:
+            logger.error(f"写入抽卡记录失败: {str(e)}")
 
-            # 更新抽卡次数和武器计数
-            user_backpack["weapon"]["总抽卡次数"] += 1
-            user_backpack["weapon"]["武器计数"][target_weapon_id] = (
-                user_backpack["weapon"]["武器计数"].get(target_weapon_id, 0) + 1
+    def resolve_draw(
+        self, event: AiocqhttpMessageEvent, banner_name: str | None
+    ) -> tuple[str | None, str | None, Banner | None]:
+        """抽卡前检查（群聊、冷却、卡池是否开放），返回(错误提示, 群号, 卡池)"""
+        group_id = event.get_group_id() or None
+        if not group_id:
+            return "请在群聊中使用抽武器功能哦~", None, None
+        remaining_time = self.check_group_cooldown(group_id)
+        if remaining_time > 0:
+            return (
+                f"抽卡冷却中，还剩{seconds_to_duration(remaining_time)}",
+                None,
+                None,
             )
+        banner = (
+            self.banners.find(banner_name) if banner_name else self.banners.standard
+        )
+        if banner is None:
+            return (
+                f"未找到卡池：{banner_name}\n💡 发送[卡池]查看当前开放的卡池",
+                None,
+                None,
+            )
+        if not banner.is_active():
+            return f"卡池【{banner.name}】当前未开放", None, None
+        return None, group_id, banner
+
+    async def check_weapon_achievements(
+        self, user_id: str, user_data, user_backpack, draw_results: list[DrawResult]
+    ) -> str:
+        """抽到新武器时检查武器成就，返回新解锁成就的播报文本"""
+        if not any(result.first_acquire for result in draw_results):
+            return ""
+        return await self.achievement.check(
+            user_id,
+            user_data,
+            weapon_counters(user_backpack["weapon"]),
+            user_backpack,
+        )
 
-            # 首次获得该武器时添加详细信息
-            if not any(
-                item["id"] == target_weapon_id for item in weapon_detail["详细信息"]
-            ):
-                weapon_detail["数量"] += 1
-                weapon_detail["详细信息"].append(weapon_info)
-
-            # 保存数据
-            await write_json(self.user_data_path / f"{user_id}.json", user_data)
-            await write_json(self.backpack_path / f"{user_id}.json", user_backpack)
-            return True
-        except Exception as e:
-            logger.error(f"更新用户数据失败: {str(e)}")
-            return False
-
-    async def handle_single_draw(
-        self, user_id, user_data, user_backpack, five_star_miss, four_star_miss
+    async def weapon_draw(
+        self,
+        event: AiocqhttpMessageEvent,
+        count: int = 1,
+        banner_name: str | None = None,
     ):
-        """处理单次抽卡逻辑，返回抽卡结果和更新后的计数"""
+        """执行武器抽卡主逻辑，未指定卡池时抽常驻卡池"""
         try:
-            # 计算五星概率（64抽后每抽+6.5%）
-            current_five_star_prob = self.five_star_prob
-            if five_star_miss >= 64:
-                current_five_star_prob += (five_star_miss - 63) * 6.5
-                current_five_star_prob = min(current_five_star_prob, 100)
-
-            # 四星保底判定（每10抽必出）
-            is_four_star_guarantee = four_star_miss >= 9
-
-            # 随机判定星级
-            rand_val = random.uniform(0, 100)
-            if rand_val <= current_five_star_prob:
-                weapon_star = "五星武器"
-            elif is_four_star_guarantee or rand_val <= (
-                current_five_star_prob + self.four_star_prob
-            ):
-                weapon_star = "四星武器"
-            else:
-                weapon_star = "三星武器"
-
-            # 随机选择武器
-            target_weapon_id = str(random.choice(self.weapon_all_data[weapon_star]))
-            target_weapon_info = await self.get_weapon_info(target_weapon_id)
-            spouse_name = user_data.get("home", {}).get("spouse_name")
-            message_snippets = ""
-
-            # 更新保底计数和好感度
-            if weapon_star == "五星武器":
-                five_star_miss = 0
-                four_star_miss = 0
-                message_snippets += "🎉 恭喜获得传说武器！\n"
-                if spouse_name not in [0, None, ""]:
-                    user_data["home"]["love"] += 30
-                    message_snippets += (
-                        f"💖 {spouse_name}为你的好运感到高兴！好感度+30\n"
+            error, group_id, banner = self.resolve_draw(event, banner_name)
+            if error:
+                return error, None
+            user_id = str(event.get_sender_id())
+            async with user_store.transaction(user_id):
+                user_data, user_backpack = await get_user_data_and_backpack(user_id)
+                weapon_data = user_backpack["weapon"]
+                entangled_fate = weapon_data["纠缠之缘"]
+                cost = count  # 每次消耗1颗纠缠之缘
+
+                # 检查资源是否充足
+                if entangled_fate < cost:
+                    return (
+                        f"\n需要{cost}颗纠缠之缘，你当前只有{entangled_fate}颗\n"
+                        "💡 可通过[签到]获得更多纠缠之缘",
+                        None,
                     )
-                else:
-                    message_snippets += "💡 你未绑定伴侣，绑定伴侣可提升好感度\n"
-            elif weapon_star == "四星武器":
-                five_star_miss += 1
-                four_star_miss = 0
-                message_snippets += "🎉 恭喜获得稀有武器！\n"
-                if spouse_name not in [0, None, ""]:
-                    user_data["home"]["love"] += 20
-                    message_snippets += (
-                        f"💖 {spouse_name}为你的好运感到高兴！好感度+20\n"
+                user_backpack["weapon"]["纠缠之缘"] -= cost
+
+                # 更新冷却时间
+                self.update_group_cooldown(group_id)
+
+                # 在内存中完成全部抽卡，之后统一保存一次
+                # 各卡池保底计数独立
+                pity = banner_pity(weapon_data, banner.pity_key)
+                pity_before = pity["未出五星计数"]
+                draw_results = banner.engine.draw(
+                    weapon_data, count, rng=rng, pity_state=pity
+                )
+                all_snippets = "".join(
+                    self.describe_draw(result, user_data) for result in draw_results
+                )
+                unlocked = await self.check_weapon_achievements(
+                    user_id, user_data, user_backpack, draw_results
+                )
+                await write_json(self.user_data_path / f"{user_id}.json", user_data)
+                await write_json(self.backpack_path / f"{user_id}.json", user_backpack)
+
+                five_star_miss = pity["未出五星计数"]
+                four_star_miss = pity["未出四星计数"]
+                next_five_star_prob = banner.engine.five_star_prob_at(five_star_miss)
+
+                # 构建最终消息
+                message = f"\n【武器抽卡结果·{banner.name}】：\n"
+                message += all_snippets
+
+                # 分离高星和三星结果
+                high_star = [
+                    r for r in draw_results if r.star in ["五星武器", "四星武器"]
+                ]
+                three_star = [r for r in draw_results if r.star == "三星武器"]
+
+                owned_counts = star_counts(user_backpack["weapon"])
+                # 添加高星结果
+                if high_star:
+                    for res in high_star:
+                        star = res.star
+                        info = res.info
+                        rarity = 5 if star == "五星武器" else 4
+                        total_count = owned_counts[star]
+                        message += (
+                            f"🎉 恭喜获得{'⭐' * rarity} {rarity}星武器！\n"
+                            f"⚔️ 武器名称：{info['name']}\n"
+                            f"📦 累计拥有：第{total_count}把{rarity}星武器\n\n"
+                        )
+
+                # 添加三星结果
+                if three_star:
+                    three_star_names = [res.info["name"] for res in three_star]
+                    total_three_star = owned_counts["三星武器"]
+                    message += (
+                        f"⭐⭐⭐ 获得三星武器共{len(three_star)}把：\n"
+                        f"⚔️ 名称：{', '.join(three_star_names)}\n"
+                        f"📦 累计拥有：{total_three_star}把三星武器\n\n"
                     )
-                else:
-                    message_snippets += "💡 你未绑定伴侣，绑定伴侣可提升好感度\n"
-            else:
-                five_star_miss += 1
-                four_star_miss += 1
-
-            # 更新用户数据
-            user_backpack["weapon"]["未出五星计数"] = five_star_miss
-            user_backpack["weapon"]["未出四星计数"] = four_star_miss
-            await self.update_data(user_id, target_weapon_id, user_data, user_backpack)
-
-            # 添加武器图片
-            weapon_name = target_weapon_info["name"]
-            weapon_image = f"{weapon_name}.png"
-            weapon_image_path = self.image_base_path / weapon_star / weapon_image
-            # 检查文件是否存在
-            if not weapon_image_path.exists():
-                logger.error(f"武器图片不存在：{weapon_image_path}")
-                weapon_image_path = None  # 标记为无效
-            else:
-                weapon_image_path = str(weapon_image_path)
-            return (
-                {
-                    "star": weapon_star,
-                    "info": target_weapon_info,
-                    "message_snippets": message_snippets,
-                },
-                five_star_miss,
-                four_star_miss,
-                current_five_star_prob,
-                weapon_image_path,
-            )
+
+                # 添加保底进度和剩余资源
+                message += (
+                    f"💎 剩余纠缠之缘：{user_backpack['weapon']['纠缠之缘']}\n"
+                    f"🎯 五星保底进度：{five_star_miss}/{banner.engine.five_star_pity}（下一抽概率：{next_five_star_prob:.2f}%）\n"
+                    f"🎯 四星保底进度：{four_star_miss}/{banner.engine.four_star_pity}\n"
+                )
+                message += unlocked
+
+                # if image_path:
+                #     message.append(Comp.Image.fromFileSystem(image_path))  # 从本地文件目录发送图片
+                # if total_luck_bonus > 0:
+                #     lines.append(f"\n🍀 幸运加成：+{total_luck_bonus}%")
+                # if location_desc:
+                #     lines.append(f" ({location_desc})")
+                # if love_bonus > 0:
+                #     lines.append(f" ({wife_name}的祝福)")
+                # if time_desc:
+                #     lines.append(f" ({time_desc})")
+
+                # 更新任务进度
+                await self.task.update_task_progress(
+                    event, user_id, "gacha_count", count
+                )
+
+            # 抽卡记录只追加不回滚，须在事务成功提交后再写入
+            await self.log_pulls(user_id, pity_before, draw_results)
+            # 图片合成为CPU密集操作，在事务外进行，不阻塞该用户的其他命令
+            image_paths = await self.draw_images(draw_results)
+            if count == 1:
+                image_paths = image_paths[0]  # 单抽只返回一张图片
+            return message, image_paths
         except Exception as e:
-            logger.error(f"处理单次抽卡失败: {str(e)}")
-            return None, None, None, None, None
+            logger.error(f"武器抽卡失败: {str(e)}")
+            return "抽武器时发生错误，请稍后再试~", None
 
-    async def weapon_draw(self, event: AiocqhttpMessageEvent, count: int = 1):
-        """执行武器抽卡主逻辑"""
+    async def weapon_bulk_draw(
+        self,
+        event: AiocqhttpMessageEvent,
+        count: int,
+        banner_name: str | None = None,
+    ):
+        """百连/千连等大量抽卡：在内存中连续抽完后保存一次，只输出汇总和一张高星武器图片"""
         try:
-            group_id = event.get_group_id() or None
-            if not group_id:
-                return "请在群聊中使用抽武器功能哦~", None
-            remaining_time = self.check_group_cooldown(group_id)
-            if remaining_time > 0:
+            if not 1 <= count <= self.bulk_draw_max:
                 return (
-                    f"抽卡冷却中，还剩{seconds_to_duration(remaining_time)}",
+                    f"单次最多抽{self.bulk_draw_max}次，请输入1-{self.bulk_draw_max}之间的次数",
                     None,
                 )
+            error, group_id, banner = self.resolve_draw(event, banner_name)
+            if error:
+                return error, None
             user_id = str(event.get_sender_id())
-            user_data, user_backpack = await get_user_data_and_backpack(user_id)
-            weapon_data = user_backpack["weapon"]
-            entangled_fate = weapon_data["纠缠之缘"]
-            cost = count  # 每次消耗1颗纠缠之缘
+            async with user_store.transaction(user_id):
+                user_data, user_backpack = await get_user_data_and_backpack(user_id)
+                weapon_data = user_backpack["weapon"]
+                entangled_fate = weapon_data["纠缠之缘"]
+                if entangled_fate < count:
+                    return (
+                        f"\n需要{count}颗纠缠之缘，你当前只有{entangled_fate}颗\n"
+                        "💡 可通过[签到]获得更多纠缠之缘",
+                        None,
+                    )
+                weapon_data["纠缠之缘"] -= count
+                self.update_group_cooldown(group_id)
 
-            # 检查资源是否充足
-            if entangled_fate < cost:
-                return (
-                    f"\n需要{cost}颗纠缠之缘，你当前只有{entangled_fate}颗\n"
-                    "💡 可通过[签到]获得更多纠缠之缘",
-                    None,
+                pity = banner_pity(weapon_data, banner.pity_key)
+                pity_before = pity["未出五星计数"]
+                draw_results = banner.engine.draw(
+                    weapon_data, count, rng=rng, pity_state=pity
                 )
-            user_backpack["weapon"]["纠缠之缘"] -= cost
-
-            # 初始化保底计数
-            five_star_miss = weapon_data["未出五星计数"]
-            four_star_miss = weapon_data["未出四星计数"]
-            draw_results = []
-            image_paths = []
-            all_snippets = ""
-
-            # 更新冷却时间
-            self.update_group_cooldown(group_id)
-
-            # 处理多次抽卡
-            for _ in range(count):
-                (
-                    result,
-                    five_star_miss,
-                    four_star_miss,
-                    current_five_star_prob,
-                    weapon_image_path,
-                ) = await self.handle_single_draw(
-                    user_id, user_data, user_backpack, five_star_miss, four_star_miss
+
+                # 汇总：五星逐个列出（含第几抽），四星按武器合并计数
+                by_star = {"五星武器": [], "四星武器": [], "三星武器": []}
+                for index, result in enumerate(draw_results, 1):
+                    by_star[result.star].append((index, result))
+                four_star_counts = Counter(r.weapon_id for _, r in by_star["四星武器"])
+                new_ids = {r.weapon_id for r in draw_results if r.first_acquire}
+                love_bonus = sum(STAR_LOVE_BONUS.get(r.star, 0) for r in draw_results)
+                spouse_name = user_data.get("home", {}).get("spouse_name")
+                if love_bonus and spouse_name not in [0, None, ""]:
+                    user_data["home"]["love"] += love_bonus
+                else:
+                    love_bonus = 0
+
+                # 每种高星武器一张卡片（只收集合成所需的数据，合成在事务外进行）
+                high_star = {
+                    r.weapon_id: r
+                    for star in ("五星武器", "四星武器")
+                    for _, r in by_star[star]
+                }
+                items = [
+                    (r.star, r.info["name"], self.assets.path_of(r.weapon_id))
+                    for r in high_star.values()
+                ]
+
+                unlocked = await self.check_weapon_achievements(
+                    user_id, user_data, user_backpack, draw_results
                 )
-                next_five_star_prob = (
-                    int(current_five_star_prob) + 6.5
-                    if five_star_miss >= 64
-                    else self.five_star_prob
+                await write_json(self.user_data_path / f"{user_id}.json", user_data)
+                await write_json(self.backpack_path / f"{user_id}.json", user_backpack)
+
+                def mark(weapon_id):
+                    return "🆕" if weapon_id in new_ids else ""
+
+                label = {100: "百连", 1000: "千连"}.get(count, f"{count}连")
+                five_star = by_star["五星武器"]
+                message = (
+                    f"\n【武器{label}结果·{banner.name}】\n"
+                    f"⭐⭐⭐⭐⭐ 五星武器：{len(five_star)}把"
+                    f"（{len(five_star) / count:.2%}）\n"
                 )
-                draw_results.append(result)
-                all_snippets += result["message_snippets"]
-                image_paths.append(weapon_image_path)
-
-            if count == 1:
-                image_paths = str(image_paths[0])  # 单抽只返回一张图片
-            # 构建最终消息
-            message = "\n【武器抽卡结果】：\n"
-            message += all_snippets
-
-            # 分离高星和三星结果
-            high_star = [
-                r for r in draw_results if r["star"] in ["五星武器", "四星武器"]
-            ]
-            three_star = [r for r in draw_results if r["star"] == "三星武器"]
-
-            # 添加高星结果
-            if high_star:
-                for res in high_star:
-                    star = res["star"]
-                    info = res["info"]
-                    rarity = 5 if star == "五星武器" else 4
-                    total_count = user_backpack["weapon"]["武器详细"][star]["数量"]
+                for index, r in five_star:
+                    new = "🆕" if r.first_acquire else ""
+                    message += f"  第{index}抽：{r.info['name']}{new}\n"
+                message += f"⭐⭐⭐⭐ 四星武器：{len(by_star['四星武器'])}把\n"
+                if four_star_counts:
                     message += (
-                        f"🎉 恭喜获得{'⭐' * rarity} {rarity}星武器！\n"
-                        f"⚔️ 武器名称：{info['name']}\n"
-                        f"📦 累计拥有：第{total_count}把{rarity}星武器\n\n"
+                        "  "
+                        + "、".join(
+                            f"{weapon_catalog.name_of(i)}×{n}{mark(i)}"
+                            for i, n in four_star_counts.most_common()
+                        )
+                        + "\n"
                     )
-
-            # 添加三星结果
-            if three_star:
-                three_star_names = [res["info"]["name"] for res in three_star]
-                total_three_star = user_backpack["weapon"]["武器详细"]["三星武器"][
-                    "数量"
-                ]
+                message += f"⭐⭐⭐ 三星武器：{len(by_star['三星武器'])}把\n"
+                if new_ids:
+                    message += f"🆕 新获得武器：{len(new_ids)}种\n"
+                if love_bonus:
+                    message += (
+                        f"💖 {spouse_name}为你的好运感到高兴！好感度+{love_bonus}\n"
+                    )
+                five_star_miss = pity["未出五星计数"]
                 message += (
-                    f"⭐⭐⭐ 获得三星武器共{len(three_star)}把：\n"
-                    f"⚔️ 名称：{', '.join(three_star_names)}\n"
-                    f"📦 累计拥有：{total_three_star}把三星武器\n\n"
+                    f"💎 剩余纠缠之缘：{weapon_data['纠缠之缘']}\n"
+                    f"🎯 五星保底进度：{five_star_miss}/{banner.engine.five_star_pity}"
+                    f"（下一抽概率：{banner.engine.five_star_prob_at(five_star_miss):.2f}%）\n"
+                    f"🎯 四星保底进度：{pity['未出四星计数']}/{banner.engine.four_star_pity}\n"
                 )
+                message += unlocked
 
-            # 添加保底进度和剩余资源
-            message += (
-                f"💎 剩余纠缠之缘：{user_backpack['weapon']['纠缠之缘']}\n"
-                f"🎯 五星保底进度：{five_star_miss}/80（下一抽概率：{next_five_star_prob:.2f}%）\n"
-                f"🎯 四星保底进度：{four_star_miss}/10\n"
-            )
-
-            # if image_path:
-            #     message.append(Comp.Image.fromFileSystem(image_path))  # 从本地文件目录发送图片
-            # if total_luck_bonus > 0:
-            #     lines.append(f"\n🍀 幸运加成：+{total_luck_bonus}%")
-            # if location_desc:
-            #     lines.append(f" ({location_desc})")
-            # if love_bonus > 0:
-            #     lines.append(f" ({wife_name}的祝福)")
-            # if time_desc:
-            #     lines.append(f" ({time_desc})")
-
-            # 更新任务进度
-            await self.task.update_task_progress(event, user_id, "gacha_count", count)
+                await self.task.update_task_progress(
+                    event, user_id, "gacha_count", count
+                )
 
-            return message, image_paths
+            # 抽卡记录只追加不回滚，须在事务成功提交后再写入
+            await self.log_pulls(user_id, pity_before, draw_results)
+            image = None
+            if self.draw_result_image and items:
+                # 图片合成为CPU密集操作，在事务外进行，不阻塞该用户的其他命令
+                image = await asyncio.to_thread(self.image_renderer.render, items)
+            return message, image
         except Exception as e:
-            logger.error(f"武器抽卡失败: {str(e)}")
+            logger.error(f"武器批量抽卡失败: {str(e)}")
             return "抽武器时发生错误，请稍后再试~", None
 
     async def calculate_sign_rewards(
@@ -368,7 +445,7 @@ class Lottery:
         CN_TIMEZONE = ZoneInfo("Asia/Shanghai")
         last_sign = user_backpack["sign_info"].get("last_sign", "")
         streak_count = user_backpack["sign_info"].get("streak_days", 0)
-        money_reward += 200 + int(random.random() * 300)
+        money_reward += 200 + int(rng.random() * 300)
         money_msg = ""
         # 连续签到逻辑
         if last_sign == (datetime.now(CN_TIMEZONE).date() - timedelta(days=1)).strftime(
@@ -392,9 +469,9 @@ class Lottery:
 
         # 随机道具奖励（10%概率）
         item_reward = None
-        if random.random() < 0.1:
+        if rng.random() < 0.1:
             items = ["爱心巧克力", "幸运符", "金币袋"]
-            item_reward = random.choice(items)
+            item_reward = rng.choice(items)
 
         # 位置加成
         location_bonus = 0
@@ -421,7 +498,7 @@ class Lottery:
             love_bonus = user_data["home"].get("love", 0) // 50
 
         # 幸运奖励（10%概率）
-        lucky_reward = 5 + random.randint(0, 10) if random.random() < 0.1 else 0
+        lucky_reward = 5 + rng.randint(0, 10) if rng.random() < 0.1 else 0
         total_reward = (
             base_reward + location_bonus + house_bonus + love_bonus + streak_bonus
         )
@@ -447,93 +524,96 @@ class Lottery:
             user_id = str(event.get_sender_id())
             CN_TIMEZONE = ZoneInfo("Asia/Shanghai")
             shop_data = await read_json(self.shop_data_file)
-            user_data, user_backpack = await get_user_data_and_backpack(user_id)
-            today = datetime.now(CN_TIMEZONE).date().strftime("%Y-%m-%d")
-
-            # 初始化签到信息
-            judge_new_user = False
-            base_reward = 1
-            money_base_reward = 0
-            if "sign_info" not in user_backpack:
-                user_backpack["sign_info"] = {"last_sign": "", "streak_days": 0}
-                base_reward += 5  # 新用户额外5颗纠缠之缘
-                money_base_reward += 100  # 新用户额外100金币
-                judge_new_user = True
-
-            # 检查是否已签到
-            if user_backpack["sign_info"]["last_sign"] == today:
-                return "你今天已经签到过啦，明天再来吧~\n"
-
-            # 计算奖励
-            reward_data = await self.calculate_sign_rewards(
-                user_data, user_backpack, base_reward, money_base_reward
-            )
-            # 发放物品奖励
-            item_reward = reward_data.get("item_reward")
-            if item_reward:
-                user_backpack[item_reward] = user_backpack.get(item_reward, 0) + 1
-            # 更新签到信息
-            user_backpack["sign_info"]["last_sign"] = today
-            user_backpack["sign_info"]["streak_days"] = reward_data["streak_count"]
-
-            # 更新纠缠之缘数量
-            total_reward = reward_data["total_reward"] + reward_data["lucky_reward"]
-            user_backpack["weapon"]["纠缠之缘"] += total_reward
+            async with user_store.transaction(user_id):
+                user_data, user_backpack = await get_user_data_and_backpack(user_id)
+                today = datetime.now(CN_TIMEZONE).date().strftime("%Y-%m-%d")
+
+                # 初始化签到信息
+                judge_new_user = False
+                base_reward = 1
+                money_base_reward = 0
+                if "sign_info" not in user_backpack:
+                    user_backpack["sign_info"] = {"last_sign": "", "streak_days": 0}
+                    base_reward += 5  # 新用户额外5颗纠缠之缘
+                    money_base_reward += 100  # 新用户额外100金币
+                    judge_new_user = True
+
+                # 检查是否已签到
+                if user_backpack["sign_info"]["last_sign"] == today:
+                    return "你今天已经签到过啦，明天再来吧~\n"
+
+                # 计算奖励
+                reward_data = await self.calculate_sign_rewards(
+                    user_data, user_backpack, base_reward, money_base_reward
+                )
+                # 发放物品奖励
+                item_reward = reward_data.get("item_reward")
+                if item_reward:
+                    user_backpack[item_reward] = user_backpack.get(item_reward, 0) + 1
+                # 更新签到信息
+                user_backpack["sign_info"]["last_sign"] = today
+                user_backpack["sign_info"]["streak_days"] = reward_data["streak_count"]
 
-            # 更新金钱数量
-            user_data["home"]["money"] += reward_data["money_reward"]
+                # 更新纠缠之缘数量
+                total_reward = reward_data["total_reward"] + reward_data["lucky_reward"]
+                user_backpack["weapon"]["纠缠之缘"] += total_reward
 
-            # 构建消息
-            message = ""
+                # 更新金钱数量
+                user_data["home"]["money"] += reward_data["money_reward"]
 
-            # 新用户提示
-            if judge_new_user:
-                message += "🎉 欢迎来到虚空武器抽卡系统！\n💎 注册成功，获得初始纠缠之缘5颗，金钱100\n\n"
+                # 构建消息
+                message = ""
 
-            # 基础奖励消息
-            message += (
-                f"✅ 签到成功！获得{reward_data['total_reward'] - 5 if judge_new_user else reward_data['total_reward']}颗纠缠之缘\n"
-                f"💰 获得{reward_data['money_reward'] - 100 if judge_new_user else reward_data['money_reward']}金币\n"
-                f"💎 当前拥有：{user_backpack['weapon']['纠缠之缘']}颗纠缠之缘\n"
-                f"📅 当前连续签到{reward_data['streak_count']}天\n"
-                f"💡 可以使用[抽武器]来获得强力装备！\n"
-            )
+                # 新用户提示
+                if judge_new_user:
+                    message += "🎉 欢迎来到虚空武器抽卡系统！\n💎 注册成功，获得初始纠缠之缘5颗，金钱100\n\n"
 
-            # 幸运奖励消息
-            money_msg = reward_data.get("money_msg", "")
-            if reward_data["lucky_reward"] > 0:
+                # 基础奖励消息
                 message += (
-                    f"🎁 幸运奖励：额外获得{reward_data['lucky_reward']}颗纠缠之缘！"
+                    f"✅ 签到成功！获得{reward_data['total_reward'] - 5 if judge_new_user else reward_data['total_reward']}颗纠缠之缘\n"
+                    f"💰 获得{reward_data['money_reward'] - 100 if judge_new_user else reward_data['money_reward']}金币\n"
+                    f"💎 当前拥有：{user_backpack['weapon']['纠缠之缘']}颗纠缠之缘\n"
+                    f"📅 当前连续签到{reward_data['streak_count']}天\n"
+                    f"💡 可以使用[抽武器]来获得强力装备！\n"
                 )
-            if item_reward:
-                message += f"\n额外获得:{shop_data['items'][item_reward]['name']} x1！"
-            try:
-                # 加成信息
-                bonus_messages = "\n\n"
-                if reward_data["location_bonus"] != 0:
-                    bonus_messages += f"📍 位置加成：{reward_data['location_desc']} +({reward_data['location_bonus']:+d})\n"
-                if reward_data["house_bonus"] > 0:
-                    bonus_messages += f"🏠 房屋加成：+{reward_data['house_bonus']}\n"
-                if reward_data["love_bonus"] > 0:
-                    bonus_messages += f"💕 {reward_data['spouse_name']}的爱意加成：+{reward_data['love_bonus']}\n"
-                if reward_data["streak_bonus"] > 0:
-                    bonus_messages += f"🔥 连续签到{reward_data['streak_count']}天加成：\n+{reward_data['streak_bonus']}颗纠缠之缘\n"
-                    if money_msg:
-                        bonus_messages += f"{money_msg}\n"
-            except Exception as e:
-                logger.error(f"构建加成信息失败: {str(e)}")
-            if bonus_messages:
-                message += bonus_messages
-
-            # 保存数据
-            await write_json(self.backpack_path / f"{user_id}.json", user_backpack)
-            await write_json(self.user_data_path / f"{user_id}.json", user_data)
-
-            # 更新用户进度
-            await self.task.update_task_progress(
-                event, user_id, "money_earned", reward_data["money_reward"]
-            )
-            return message
+
+                # 幸运奖励消息
+                money_msg = reward_data.get("money_msg", "")
+                if reward_data["lucky_reward"] > 0:
+                    message += f"🎁 幸运奖励：额外获得{reward_data['lucky_reward']}颗纠缠之缘！"
+                if item_reward:
+                    message += (
+                        f"\n额外获得:{shop_data['items'][item_reward]['name']} x1！"
+                    )
+                try:
+                    # 加成信息
+                    bonus_messages = "\n\n"
+                    if reward_data["location_bonus"] != 0:
+                        bonus_messages += f"📍 位置加成：{reward_data['location_desc']} +({reward_data['location_bonus']:+d})\n"
+                    if reward_data["house_bonus"] > 0:
+                        bonus_messages += (
+                            f"🏠 房屋加成：+{reward_data['house_bonus']}\n"
+                        )
+                    if reward_data["love_bonus"] > 0:
+                        bonus_messages += f"💕 {reward_data['spouse_name']}的爱意加成：+{reward_data['love_bonus']}\n"
+                    if reward_data["streak_bonus"] > 0:
+                        bonus_messages += f"🔥 连续签到{reward_data['streak_count']}天加成：\n+{reward_data['streak_bonus']}颗纠缠之缘\n"
+                        if money_msg:
+                            bonus_messages += f"{money_msg}\n"
+                except Exception as e:
+                    logger.error(f"构建加成信息失败: {str(e)}")
+                if bonus_messages:
+                    message += bonus_messages
+
+                # 保存数据
+                await write_json(self.backpack_path / f"{user_id}.json", user_backpack)
+                await write_json(self.user_data_path / f"{user_id}.json", user_data)
+
+                # 更新用户进度
+                await self.task.update_task_progress(
+                    event, user_id, "money_earned", reward_data["money_reward"]
+                )
+                return message
         except Exception as e:
             logger.error(f"签到失败: {str(e)}")
             return "签到时发生错误，请稍后再试~"
@@ -541,16 +621,13 @@ class Lottery:
     async def show_my_weapons(self, event: AiocqhttpMessageEvent):
         """展示个人武器库统计信息"""
         try:
-            user_data, user_backpack = await get_user_data_and_backpack(
-                event.get_sender_id()
-            )
+            user_id = str(event.get_sender_id())
+            user_data, user_backpack = await get_user_data_and_backpack(user_id)
             weapon_data = user_backpack["weapon"]
-            weapon_details = weapon_data["武器详细"]
+            owned_counts = star_counts(weapon_data)
 
             # 总武器数量检查
-            total_weapons = sum(
-                star_data["数量"] for star_data in weapon_details.values()
-            )
+            total_weapons = sum(owned_counts.values())
             if total_weapons == 0:
                 return "你还没有任何武器，快去抽卡吧！\n💡 使用[抽武器]开始你的冒险之旅吧！"
 
@@ -569,38 +646,23 @@ class Lottery:
             rarity = 0
             if favorite_weapon_id:
                 try:
-                    weapon_id_int = int(favorite_weapon_id)
-                    if 500 <= weapon_id_int < 600:
-                        rarity = 5
-                        star_key = "五星武器"
-                    elif 400 <= weapon_id_int < 500:
-                        rarity = 4
-                        star_key = "四星武器"
-                    else:
-                        rarity = 3
-                        star_key = "三星武器"
-
-                    for weapon in weapon_details[star_key]["详细信息"]:
-                        if weapon["id"] == favorite_weapon_id:
-                            favorite_weapon_name = weapon["name"]
-                            break
+                    rarity = {"五星武器": 5, "四星武器": 4}.get(
+                        star_of(favorite_weapon_id), 3
+                    )
+                    favorite_weapon_name = weapon_catalog.name_of(favorite_weapon_id)
                 except Exception as e:
                     logger.error(f"处理最爱武器时出错: {str(e)}")
                     return "处理最爱武器时出错，请稍后再试~"
             # 计算战斗力和成就
-            five_star_count = weapon_details["五星武器"]["数量"]
-            four_star_count = weapon_details["四星武器"]["数量"]
-            three_star_count = weapon_details["三星武器"]["数量"]
-            combat_power = (
-                five_star_count * 500 + four_star_count * 100 + three_star_count * 20
-            )
-            achievements = []
-            if five_star_count >= 10:
-                achievements.append("🏆 五星武器收藏家")
-            if four_star_count >= 50:
-                achievements.append("💎 四星武器大师")
-            if len(weapon_data["武器计数"]) >= 100:
-                achievements.append("🎖️ 武器收集达人")
+            five_star_count = owned_counts["五星武器"]
+            four_star_count = owned_counts["四星武器"]
+            three_star_count = owned_counts["三星武器"]
+            combat_power = weapon_combat_power(weapon_data)
+            await self.achievement.ensure(user_id, user_data)
+            badges = [
+                f"{definition.badge} {definition.name}"
+                for definition, _ in achievements.unlocked(user_data, "weapon")
+            ]
 
             # 战斗力评级
             if combat_power >= 3000:
@@ -628,7 +690,7 @@ class Lottery:
             # 成就展示
             message += "🎖️ 成就徽章\n"
             message += "━━━━━━━━━━━━━━━\n"
-            message += f"{', '.join(achievements) if achievements else '暂无成就'}\n"
+            message += f"{', '.join(badges) if badges else '暂无成就'}\n"
             message += "━━━━━━━━━━━━━━━\n\n"
 
             # 武器统计
@@ -651,17 +713,24 @@ class Lottery:
             star_to_num = {"三": 3, "四": 4, "五": 5}
             for star in ["五星武器", "四星武器", "三星武器"]:
                 stars = "⭐" * int(star_to_num[star[0]])
-                details = weapon_details[star]
-                if details["数量"] > 0:
+                star_ids = owned_ids(weapon_data, star)
+                if star_ids:
+                    # 按获得数量从多到少排列
+                    star_ids.sort(
+                        key=lambda wid: weapon_data["武器计数"].get(wid, 0),
+                        reverse=True,
+                    )
                     message += f"{stars} {star}列表：\n"
-                    for item in details["详细信息"][:5]:  # 显示前5个
-                        count = weapon_data["武器计数"].get(item["id"], 0)
-                        message += f"- {item['name']}（{count}把）\n"
-                    if len(details["详细信息"]) > 5:
-                        message += f"... 还有{len(details['详细信息']) - 5}件未显示\n"
+                    for weapon_id in star_ids[:5]:  # 显示前5个
+                        count = weapon_data["武器计数"].get(weapon_id, 0)
+                        message += (
+                            f"- {weapon_catalog.name_of(weapon_id)}（{count}把）\n"
+                        )
+                    if len(star_ids) > 5:
+                        message += f"... 还有{len(star_ids) - 5}件未显示\n"
 
             # 随机伴侣评论
-            if spouse_name not in [None, ""] and random.random() < 0.1:
+            if spouse_name not in [None, ""] and rng.random() < 0.1:
                 spouse_comments = [
                     f"{spouse_name}想要试试你的武器",
                     f"{spouse_name}觉得你很有安全感",
@@ -669,12 +738,148 @@ class Lottery:
                     f"{spouse_name}想要和你一起战斗",
                     f"你的武器让{spouse_name}也想去冒险了！",
                 ]
-                message += f"\n💬 {random.choice(spouse_comments)}\n"
+                message += f"\n💬 {rng.choice(spouse_comments)}\n"
             return message
         except Exception as e:
             logger.error(f"展示武器库失败: {str(e)}")
             return "获取武器库信息时出错，请稍后再试~"
 
+    @staticmethod
+    def _history_args(event: AiocqhttpMessageEvent, parts: list[str], default: int):
+        """解析抽卡记录命令参数：[条数] [@用户]，返回(用户ID, 条数)"""
+        to_user_ids = get_at_ids(event)
+        user_id = to_user_ids[0] if to_user_ids else str(event.get_sender_id())
+        limit = int(parts[0]) if parts and parts[0].isdigit() else default
+        return user_id, min(max(limit, 1), HISTORY_MAX_LIMIT)
+
+    @staticmethod
+    def _format_pull_time(timestamp: int) -> str:
+        return datetime.fromtimestamp(timestamp, CN_TIMEZONE).strftime("%m-%d %H:%M")
+
+    async def show_pull_history(
+        self, event: AiocqhttpMessageEvent, parts: list[str]
+    ) -> str:
+        """查看最近的抽卡记录，使用方法: /抽卡记录 [条数] [@用户]"""
+        try:
+            user_id, limit = self._history_args(event, parts, 20)
+            records, total = await pull_log.tail(user_id, limit)
+            if not records:
+                return "还没有抽卡记录哦~"
+            message = f"📜 最近{len(records)}次抽卡记录（共{total}抽）：\n"
+            for record in records:
+                rarity = record.star
+                line = (
+                    f"{self._format_pull_time(record.timestamp)} {'⭐' * rarity} "
+                    f"{weapon_catalog.name_of(record.weapon_id)}"
+                )
+                if rarity == 5:
+                    line += f"（保底第{record.pity_before + 1}抽出货）"
+                message += line + "\n"
+            return message.rstrip("\n")
+        except Exception as e:
+            logger.error(f"获取抽卡记录失败: {str(e)}")
+            return "获取抽卡记录时出错，请稍后再试~"
+
+    async def show_five_star_history(
+        self, event: AiocqhttpMessageEvent, parts: list[str]
+    ) -> str:
+        """查看五星出货记录，使用方法: /五星记录 [条数] [@用户]"""
+        try:
+            user_id, limit = self._history_args(event, parts, 10)
+            found, total = await pull_log.five_star(user_id, limit)
+            if not total:
+                return "还没有抽卡记录哦~"
+            if not found:
+                return f"共{total}抽，还没有抽到五星武器哦~"
+            message = f"🌟 最近{len(found)}次五星记录（共{total}抽）：\n"
+            for index, record in found:
+                message += (
+                    f"第{index}抽 {self._format_pull_time(record.timestamp)} "
+                    f"{weapon_catalog.name_of(record.weapon_id)}"
+                    f"（保底第{record.pity_before + 1}抽出货）\n"
+                )
+            return message.rstrip("\n")
+        except Exception as e:
+            logger.error(f"获取五星记录失败: {str(e)}")
+            return "获取五星记录时出错，请稍后再试~"
+
+    def show_banners(self) -> str:
+        """展示全部卡池及其开放时间、UP武器和保底规则"""
+        now = datetime.now(CN_TIMEZONE)
+        message = "🎰 武器卡池一览\n"
+        for banner in self.banners.all():
+            if banner.is_ended(now):
+                continue
+            engine = banner.engine
+            status = "开放中" if banner.is_active(now) else "未开放"
+            message += f"\n【{banner.name}】（{status}）\n"
+            if banner.description:
+                message += f"{banner.description}\n"
+            if banner.start or banner.end:
+                start = banner.start.strftime(TIME_FORMAT) if banner.start else "不限"
+                end = banner.end.strftime(TIME_FORMAT) if banner.end else "不限"
+                message += f"⏰ {start} ~ {end}\n"
+            for star, up_ids in banner.rate_up.items():
+                pool = engine.pools[star]
+                names = "、".join(
+                    f"{weapon_catalog.name_of(weapon_id)}"
+                    f"({pool.probability(weapon_id):.1%})"
+                    for weapon_id in up_ids
+                )
+                message += f"⬆️ {star}UP（星级内占比）：{names}\n"
+            message += (
+                f"🎲 五星{engine.five_star_prob}%/四星{engine.four_star_prob}%，"
+                f"五星{engine.five_star_pity}抽必出，四星{engine.four_star_pity}抽必出\n"
+            )
+        message += "\n💡 使用方法：/抽武器 卡池名称 或 /十连 卡池名称（默认常驻祈愿）"
+        return message
+
+    async def handle_simulate_command(self, parts: list[str]) -> str:
+        """处理抽卡模拟命令，使用方法: /抽卡模拟 [账号数] [每个账号抽数] [卡池]"""
+        banner = (
+            self.banners.find(parts[2]) if len(parts) >= 3 else self.banners.standard
+        )
+        if banner is None:
+            return f"未找到卡池：{parts[2]}"
+        try:
+            accounts = int(parts[0]) if parts else SIMULATE_DEFAULT_ACCOUNTS
+            pulls = int(parts[1]) if len(parts) >= 2 else SIMULATE_DEFAULT_PULLS
+        except ValueError:
+            return "账号数和抽数必须是整数，使用方法:\n/抽卡模拟 [账号数] [每个账号抽数] [卡池]"
+        if accounts <= 0 or pulls <= 0:
+            return "账号数和抽数必须为正整数"
+        if accounts > SIMULATE_MAX_ACCOUNTS:
+            return f"模拟账号数不能超过{SIMULATE_MAX_ACCOUNTS}"
+        if accounts * pulls > SIMULATE_MAX_TOTAL:
+            return f"模拟总抽数不能超过{SIMULATE_MAX_TOTAL}"
+        if self.simulating:
+            return "已有抽卡模拟正在进行，请稍后再试"
+        self.simulating = True
+        try:
+            # 模拟为纯计算，放到线程中执行，避免阻塞事件循环
+            report = await asyncio.to_thread(simulate, banner.engine, accounts, pulls)
+            return f"卡池：{banner.name}\n" + format_report(report)
+        except Exception as e:
+            logger.error(f"抽卡模拟失败: {str(e)}")
+            return f"抽卡模拟失败：{str(e)}"
+        finally:
+            self.simulating = False
+
+    def show_asset_report(self) -> str:
+        """武器图片资源检查：缺少图片的武器及没有对应武器的图片"""
+        self.assets.refresh(force=True)
+        report = self.assets.report()
+        message = f"🖼️ 武器图片资源检查\n已索引图片：{report['images']}张\n"
+        if report["missing"]:
+            names = "、".join(weapon_catalog.name_of(i) for i in report["missing"])
+            message += f"缺少图片的武器（{len(report['missing'])}）：{names}\n"
+        if report["orphans"]:
+            orphans = "、".join(Path(p).name for p in report["orphans"])
+            message += f"没有对应武器的图片（{len(report['orphans'])}）：{orphans}\n"
+        if not report["missing"] and not report["orphans"]:
+            message += "✅ 所有武器图片完整\n"
+        return message.rstrip("\n")
+
     async def handle_cheat_command(
         self, event: AiocqhttpMessageEvent, parts: list[str]
     ):
@@ -714,11 +919,14 @@ class Lottery:
                 to_user_id = str(event.get_sender_id())
             if amount <= 0:
                 return False, "增加的金额必须为正整数"
-            user_backpack = await get_user_data_and_backpack(
-                to_user_id, only_data_or_backpack="user_backpack"
-            )
-            user_backpack["weapon"]["纠缠之缘"] += amount
-            await write_json(self.backpack_path / f"{to_user_id}.json", user_backpack)
+            async with user_store.transaction(to_user_id):
+                user_backpack = await get_user_data_and_backpack(
+                    to_user_id, only_data_or_backpack="user_backpack"
+                )
+                user_backpack["weapon"]["纠缠之缘"] += amount
+                await write_json(
+                    self.backpack_path / f"{to_user_id}.json", user_backpack
+                )
             return (
                 True,
                 f"成功为用户{to_user_id}增加 {amount} 颗纠缠之缘\n"
@@ -0,0 +1,131 @@
+from astrbot.api import logger
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+from ..utils.leaderboard import BOARDS
+from ..utils.utils import group_members, leaderboards
+
+# 排行榜名称及别名 -> 排行榜ID
+BOARD_ALIASES = {
+    "金钱": "money",
+    "金币": "money",
+    "财富": "money",
+    "好感": "love",
+    "好感度": "love",
+    "战斗力": "combat",
+    "战力": "combat",
+    "连签": "streak",
+    "签到": "streak",
+    "连续签到": "streak",
+}
+# 排行榜展示人数
+TOP_LIMIT = 10
+
+
+class Ranking:
+    """排行榜系统（金钱、好感度、战斗力、连续签到）"""
+
+    async def _group_ready(self, event: AiocqhttpMessageEvent, group_id: str) -> bool:
+        """确保群排行榜可用（成员列表过期时重新获取），失败返回False"""
+        if not leaderboards.group_stale(group_id):
+            return True
+        member_ids = await group_members.member_ids(event.bot, group_id)
+        if member_ids is None:
+            return leaderboards.index("money", group_id) is not None
+        leaderboards.set_group_members(group_id, member_ids)
+        return True
+
+    @staticmethod
+    def _format_score(board: str, score: float) -> str:
+        unit = BOARDS[board][1]
+        value = int(score) if float(score).is_integer() else round(score, 2)
+        return f"{value}{unit}"
+
+    async def handle_leaderboard_command(
+        self, event: AiocqhttpMessageEvent, parts: list[str]
+    ) -> str:
+        """查看排行榜，使用方法: /排行榜 [金钱/好感度/战斗力/连签] [全服]"""
+        try:
+            if not leaderboards.ready:
+                return "排行榜正在建立中，请稍后再试~"
+            board = next(
+                (BOARD_ALIASES[p] for p in parts if p in BOARD_ALIASES), "money"
+            )
+            group_id = event.get_group_id() or None
+            scope = "全服"
+            if group_id and "全服" not in parts:
+                if await self._group_ready(event, group_id):
+                    scope = "本群"
+                else:
+                    group_id = None
+            else:
+                group_id = None
+            index = leaderboards.index(board, group_id)
+            name = BOARDS[board][0]
+            if not len(index):
+                return f"{scope}{name}排行榜暂无数据"
+
+            message = f"🏆 {scope}{name}排行榜（共{len(index)}人）\n"
+            medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+            for rank, (user_id, score) in enumerate(index.top(TOP_LIMIT), 1):
+                nickname = leaderboards.names.get(user_id, user_id)
+                message += (
+                    f"{medals.get(rank, f'{rank}.')} {nickname}："
+                    f"{self._format_score(board, score)}\n"
+                )
+            user_id = str(event.get_sender_id())
+            rank = index.rank(user_id)
+            if rank is None:
+                message += "你还没有上榜哦~"
+            else:
+                message += (
+                    f"你的排名：第{rank}名"
+                    f"（{self._format_score(board, index.score(user_id))}）"
+                )
+            return message
+        except Exception as e:
+            logger.error(f"获取排行榜失败: {str(e)}")
+            return "获取排行榜失败，请稍后再试~"
+
+    async def handle_my_rank_command(self, event: AiocqhttpMessageEvent) -> str:
+        """查看自己在各排行榜的名次"""
+        try:
+            if not leaderboards.ready:
+                return "排行榜正在建立中，请稍后再试~"
+            user_id = str(event.get_sender_id())
+            group_id = event.get_group_id() or None
+            if group_id and not await self._group_ready(event, group_id):
+                group_id = None
+            message = "📊 我的排名\n"
+            for board, (name, *_) in BOARDS.items():
+                index = leaderboards.index(board)
+                rank = index.rank(user_id)
+                if rank is None:
+                    message += f"{name}：未上榜\n"
+                    continue
+                message += (
+                    f"{name}：{self._format_score(board, index.score(user_id))}，"
+                    f"全服第{rank}/{len(index)}名"
+                )
+                group_index = leaderboards.index(board, group_id) if group_id else None
+                if group_index is not None and user_id in group_index:
+                    message += (
+                        f"，本群第{group_index.rank(user_id)}/{len(group_index)}名"
+                    )
+                message += "\n"
+            return message.rstrip("\n")
+        except Exception as e:
+            logger.error(f"获取我的排名失败: {str(e)}")
+            return "获取排名失败，请稍后再试~"
+
+    async def rebuild(self) -> str:
+        """全量重建排行榜"""
+        try:
+            users = await leaderboards.rebuild()
+            if users is None:
+                return "排行榜正在重建中，请稍后再试~"
+            return f"✅ 排行榜已重建，共{users}个用户"
+        except Exception as e:
+            logger.error(f"重建排行榜失败: {str(e)}")
+            return "重建排行榜失败，请查看日志~"
@@ -1,5 +1,4 @@
 import json
-import random
 from collections import Counter
 from datetime import datetime
 from pathlib import Path
@@ -15,9 +14,12 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
 
 from ..utils.text_formatter import TextFormatter
 from ..utils.utils import (
+    cooldowns,
     get_at_ids,
     read_json,
     read_json_sync,
+    rng,
+    user_store,
     write_json,
     write_json_sync,
 )
@@ -188,35 +190,44 @@ class Shop:
                 return False, "数量必须为整数，请重新输入"
             if quantity <= 0:
                 return False, "使用数量必须为正整数"
-            file_path = self.backpack_path / f"{user_id}.json"
-            backpack = await self.get_user_backpack(user_id)
-            # 物品存在性与数量校验
-            if item_name not in backpack:
-                return False, "❌ 你没有这个道具"
-            if backpack[item_name] < quantity:
-                return (
-                    False,
-                    f"❌ 您所需{item_name}的数量不足\n当前持有数量：{backpack[item_name]}",
-                )
-
-            # 获取物品效果
-            item = await self.get_item_detail(item_name)
-            if not item:
-                return False, "❌ 道具信息不存在"
-
-            # 更新背包
-            backpack[item_name] -= quantity
-            if backpack[item_name] == 0:
-                del backpack[item_name]
-            await write_json(file_path, backpack)
+            async with user_store.transaction(user_id):
+                file_path = self.backpack_path / f"{user_id}.json"
+                backpack = await self.get_user_backpack(user_id)
+                # 物品存在性与数量校验
+                if item_name not in backpack:
+                    return False, "❌ 你没有这个道具"
+                if backpack[item_name] < quantity:
+                    return (
+                        False,
+                        f"❌ 您所需{item_name}的数量不足\n当前持有数量：{backpack[item_name]}",
+                    )
 
-            # 执行道具效果
-            result = await self.execute_item_effect(
-                event, item, user_id, backpack, quantity
-            )
-            if not result["success"]:
-                return False, f"❌ {result['message']}"
-            return True, result["message"]
+                # 获取物品效果
+                item = await self.get_item_detail(item_name)
+                if not item:
+                    return False, "❌ 道具信息不存在"
+                # 注定无效的使用在扣除道具前拒绝
+                if item["type"] == "consumable" and item["effect"].get(
+                    "reset_cooldown"
+                ):
+                    if quantity > 1:
+                        return False, "❌ 冷却重置卡一次只能使用一张哦~"
+                    if not cooldowns.active(key=user_id):
+                        return False, "⏰ 你当前没有冷却中的技能，道具未消耗"
+
+                # 更新背包
+                backpack[item_name] -= quantity
+                if backpack[item_name] == 0:
+                    del backpack[item_name]
+                await write_json(file_path, backpack)
+
+                # 执行道具效果
+                result = await self.execute_item_effect(
+                    event, item, user_id, backpack, quantity
+                )
+                if not result["success"]:
+                    return False, f"❌ {result['message']}"
+                return True, result["message"]
         except Exception as e:
             logger.error(f"使用物品失败: {str(e)}")
             return False, "使用物品失败，请稍后再试~"
@@ -257,7 +268,7 @@ class Shop:
                 elif "money_min" in item["effect"] and "money_max" in item["effect"]:
                     money = 0
                     for _ in range(quantity):
-                        money += random.randint(
+                        money += rng.randint(
                             item["effect"]["money_min"], item["effect"]["money_max"]
                         )
                     user_data["home"]["money"] = (
@@ -279,16 +290,11 @@ class Shop:
                     "reset_cooldown" in item["effect"]
                     and item["effect"]["reset_cooldown"]
                 ):
-                    if quantity > 1:
-                        return {
-                            "success": False,
-                            "message": "冷却重置卡一次只能使用一张哦~",
-                        }
-                    return {"success": True, "message": "⏰ 冷却重置道具功能暂未实现"}
-                    # keys =
-                    # for key in keys:
-                    #     await self.context.redis.delete(key)
-                    # return {"success": True, "message": "⏰ 所有技能冷却时间已重置！"}
+                    # 只重置以用户为对象的冷却（群抽卡冷却属于整个群，不受影响）
+                    cleared = cooldowns.clear(key=user_id)
+                    if not cleared:
+                        return {"success": True, "message": "⏰ 你当前没有冷却中的技能"}
+                    return {"success": True, "message": "⏰ 所有技能冷却时间已重置！"}
 
                 # 保护符道具
                 elif "protection" in item["effect"] and item["effect"]["protection"]:
@@ -353,7 +359,7 @@ class Shop:
                 # 可用物品名称列表（即映射的键）
                 available_names = list(name_to_detail.keys())
                 # 随机选择指定数量的物品名称
-                selected_names = random.choices(available_names, k=quantity)
+                selected_names = rng.choices(available_names, k=quantity)
                 # 统计每个物品的选中次数
                 item_count = Counter(selected_names)
                 message_parts = []
@@ -396,9 +402,11 @@ class Shop:
             quantity = int(parts[1]) if len(parts) >= 2 else 1
             if quantity <= 0:
                 return False, "购买数量必须为正整数"
-            home_data = await self.user.get_home_data(user_id)
-
-            return await self.buy_item(event, user_id, item_name, home_data, quantity)
+            async with user_store.transaction(user_id):
+                home_data = await self.user.get_home_data(user_id)
+                return await self.buy_item(
+                    event, user_id, item_name, home_data, quantity
+                )
         except ValueError:
             return False, "数量必须是数字"
         except Exception as e:
@@ -515,24 +523,29 @@ class Shop:
         from_user_id = str(event.get_sender_id())
         if from_user_id == to_user_id:
             return False, "不能赠送物品给自己"
-        from_file_path = self.backpack_path / f"{from_user_id}.json"
-        to_file_path = self.backpack_path / f"{to_user_id}.json"
-        from_backpack = await self.get_user_backpack(from_user_id)
-        to_backpack = await self.get_user_backpack(to_user_id)
-
-        # 校验赠送者物品
-        if item_name not in from_backpack or from_backpack[item_name] < amount:
-            return False, "物品不存在或数量不足"
-
-        # 执行赠送逻辑,减少赠送者物品
-        from_backpack[item_name] -= amount
-        if from_backpack[item_name] == 0:
-            del from_backpack[item_name]
-        # 增加接收者物品
-        to_backpack[item_name] = to_backpack.get(item_name, 0) + amount
-
-        await write_json(from_file_path, from_backpack)
-        await write_json(to_file_path, to_backpack)
+        try:
+            async with user_store.transaction(from_user_id, to_user_id):
+                from_file_path = self.backpack_path / f"{from_user_id}.json"
+                to_file_path = self.backpack_path / f"{to_user_id}.json"
+                from_backpack = await self.get_user_backpack(from_user_id)
+                to_backpack = await self.get_user_backpack(to_user_id)
+
+                # 校验赠送者物品
+                if item_name not in from_backpack or from_backpack[item_name] < amount:
+                    return False, "物品不存在或数量不足"
+
+                # 执行赠送逻辑,减少赠送者物品
+                from_backpack[item_name] -= amount
+                if from_backpack[item_name] == 0:
+                    del from_backpack[item_name]
+                # 增加接收者物品
+                to_backpack[item_name] = to_backpack.get(item_name, 0) + amount
+
+                await write_json(from_file_path, from_backpack)
+                await write_json(to_file_path, to_backpack)
+        except Exception as e:
+            logger.error(f"赠送物品失败: {str(e)}")
+            return False, "赠送物品失败，请稍后再试~"
         return True, f"成功给用户{to_user_id}：\n赠送{item_name} x {amount}"
 
     async def format_shop_items(self) -> str:
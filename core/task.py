@@ -13,12 +13,34 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..utils.achievements import UNLOCKED_KEY, task_counters
+from ..utils.epoch import EpochClock, week_of
+from ..utils.progress_bus import ProgressEvent
 from ..utils.utils import (
+    achievements,
+    epoch_clock,
     get_nickname,
     get_user_data_and_backpack,
+    is_user_registered,
+    progress_bus,
     read_json,
+    task_catalog,
+    user_store,
     write_json,
 )
+from .achievement import Achievement
+
+
+# 一键领取的任务类别参数 -> 任务类别
+CLAIM_CATEGORIES = {
+    "每日": "daily",
+    "日常": "daily",
+    "周常": "weekly",
+    "每周": "weekly",
+    "特殊": "special",
+}
+# 任务类别展示名称
+CATEGORY_NAMES = {"daily": "每日", "weekly": "周常", "special": "特殊"}
 
 
 class Task:
@@ -27,14 +49,15 @@ class Task:
         PLUGIN_DATA_DIR = Path(StarTools.get_data_dir("astrbot_plugin_akasha_terminal"))
         self.user_data_path = PLUGIN_DATA_DIR / "user_data"
         self.backpack_path = PLUGIN_DATA_DIR / "user_backpack"
-        self.task_file = Path(__file__).parent.parent / "data" / "task.json"
         # 设置「中国标准时间」
         self.CN_TIMEZONE = ZoneInfo("Asia/Shanghai")
 
         # 确保数据目录存在
         self.user_data_path.mkdir(parents=True, exist_ok=True)
         self.backpack_path.mkdir(parents=True, exist_ok=True)
-        self.task_file.parent.mkdir(parents=True, exist_ok=True)
+        self.achievement = Achievement()
+        # 各处创建的任务系统实例等价，由最后创建的实例应用进度事件
+        progress_bus.set_applier(self.apply_progress)
 
     def format_rewards(self, rewards: Dict[str, Any]) -> str:
         """格式化奖励文本"""
@@ -56,27 +79,39 @@ class Task:
             "✅" if state.get("claimed") else ("🎁" if state.get("completed") else "⏳")
         )
 
-    # 判断记录的数据和今天是否在同一周
-    def is_same_week(self, date_str: str) -> bool:
-        """判断给定日期是否在本周"""
-        date = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=self.CN_TIMEZONE)
-        today = datetime.now(self.CN_TIMEZONE)
-        return (
-            date.isocalendar()[1] == today.isocalendar()[1] and date.year == today.year
-        )
+    @staticmethod
+    def _epoch_of(user_tasks: Dict[str, Any], period: str) -> Optional[int]:
+        """任务数据记录的日序号/周序号（旧数据只有日期字符串，换算后返回）"""
+        epoch = user_tasks.get(f"{period}_epoch")
+        if epoch is not None:
+            return epoch
+        day = EpochClock.day_of(user_tasks.get(f"last_{period}_refresh"))
+        if day is None:
+            return None
+        return day if period == "daily" else week_of(day)
+
+    @staticmethod
+    def reset_period(user_tasks: Dict[str, Any], period: str, epoch: int):
+        """清空每日/周常任务并记录所属的日序号/周序号"""
+        user_tasks[period] = {}
+        user_tasks[f"{period}_epoch"] = epoch
+        user_tasks.pop(f"last_{period}_refresh", None)
+
+    def roll_over(self, user_tasks: Dict[str, Any]):
+        """过期的每日/周常任务视为空：只在内存中清空，随下一次真正的写入落盘"""
+        for period, current in zip(("daily", "weekly"), epoch_clock.epochs()):
+            epoch = self._epoch_of(user_tasks, period)
+            if epoch != current:
+                self.reset_period(user_tasks, period, current)
+            elif f"{period}_epoch" not in user_tasks:
+                user_tasks[f"{period}_epoch"] = epoch
+                user_tasks.pop(f"last_{period}_refresh", None)
 
     def get_refresh_time(self) -> str:
         """获取每日任务刷新剩余时间（到明天零点）"""
-        now = datetime.now(self.CN_TIMEZONE)
-        # 计算明天零点
-        next_reset = datetime(
-            now.year, now.month, now.day, tzinfo=self.CN_TIMEZONE
-        ) + timedelta(days=1)
-        diff = next_reset - now
+        seconds = int(epoch_clock.seconds_to_rollover())
         # 格式化：小时+分钟
-        hours = diff.seconds // 3600
-        minutes = (diff.seconds % 3600) // 60
-        return f"{hours}h {minutes}m"
+        return f"{seconds // 3600}h {(seconds % 3600) // 60}m"
 
     def get_weekly_refresh_time(self) -> str:
         """获取周常任务刷新剩余时间（到下周一零点）"""
@@ -92,28 +127,6 @@ class Task:
         days, hours = diff.days, diff.seconds // 3600
         return f"{days}d {hours}h" if days > 0 else f"{hours}h"
 
-    async def get_task_data(self) -> Dict[str, Any]:
-        """获取任务数据，确保数据完整性"""
-        try:
-            task_data = await read_json(self.task_file)
-            # 检查数据完整性
-            is_data_complete = task_data and task_data["system_initialized"]
-
-            # 如果数据不完整，尝试重新初始化
-            if not is_data_complete:
-                task_data = await read_json(self.task_file)
-                task_data["last_daily_refresh"] = datetime.now(
-                    self.CN_TIMEZONE
-                ).strftime("%Y-%m-%d")
-                task_data["last_weekly_refresh"] = datetime.now(
-                    self.CN_TIMEZONE
-                ).strftime("%Y-%m-%d")
-                task_data["system_initialized"] = True
-                await write_json(self.task_file, task_data)
-            return task_data
-        except Exception as e:
-            logger.error(f"获取任务数据失败: {str(e)}")
-
     async def get_user_tasks(
         self,
         event: AiocqhttpMessageEvent,
@@ -124,55 +137,36 @@ class Task:
         如果is_return_user_data为True，则返回(user_data["task"]、user_data)元组\n
         否则默认仅返回user_data["task"]
         """
-        if not (self.user_data_path / f"{user_id}.json").exists():
+        if not await is_user_registered(user_id):
             await event.send(
                 event.plain_result("你的信息不存在，请先进行一次签到来注册信息~")
             )
             return
-        today = datetime.now(self.CN_TIMEZONE).strftime("%Y-%m-%d")
+        # 先应用该用户待处理的进度事件
+        await progress_bus.flush_user(user_id)
         user_data = await read_json(self.user_data_path / f"{user_id}.json")
-        if (
-            not user_data["task"]["last_daily_refresh"]
-            or not user_data["task"]["last_weekly_refresh"]
-        ):
-            user_data["task"]["last_daily_refresh"] = today
-            user_data["task"]["last_weekly_refresh"] = today
-            await write_json(self.user_data_path / f"{user_id}.json", user_data)
-
-        # 检查是否需要重置
-        new_data = await self.check_task_reset(user_id, user_data, today)
-        if new_data:
-            user_data = new_data
+        # 过期任务在内存中清空，不单独写盘
+        self.roll_over(user_data["task"])
 
         # 返回任务数据
         if is_return_user_data:
             return user_data["task"], user_data
         return user_data["task"]
 
-    async def check_task_reset(
+    async def record_claims(
         self,
         user_id: str,
         user_data: Dict[str, Any],
-        today: str,
-    ) -> Optional[Dict[str, Any]]:
-        """检查并重置过期任务"""
-        reset = False
-        # 重置每日任务
-        if user_data["task"].get("last_daily_refresh") != today:
-            user_data["task"]["daily"] = {}
-            user_data["task"]["last_daily_refresh"] = today
-            reset = True
-
-        # 重置周常任务
-        if not self.is_same_week(user_data["task"].get("last_weekly_refresh")):
-            user_data["task"]["weekly"] = {}
-            user_data["task"]["last_weekly_refresh"] = today
-            reset = True
-        # 保存更新后的任务数据
-        if reset:
-            await write_json(self.user_data_path / f"{user_id}.json", user_data)
-            return user_data
-        return None
+        backpack: Optional[Dict[str, Any]],
+        count: int,
+    ) -> str:
+        """累计领取任务数并检查任务成就，返回新解锁成就的播报文本（须在标记为已领取之前调用）\n
+        每日/周常任务会被重置，任务成就按累计领取数统计"""
+        user_tasks = user_data["task"]
+        user_tasks["claimed_total"] = task_counters(user_tasks)["tasks_claimed"] + count
+        return await self.achievement.check(
+            user_id, user_data, task_counters(user_tasks), backpack
+        )
 
     async def get_completed_tasks(
         self, user_task_data: Dict[str, Any]
@@ -205,59 +199,45 @@ class Task:
         }
 
     async def get_user_achievements(
-        self, user_task_data: Dict[str, Any]
+        self, user_id: str, user_data: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
-        """获取用户成就"""
+        """获取用户任务成就（读取已解锁记录，未解锁的显示当前进度）"""
+        await self.achievement.ensure(user_id, user_data)
+        user_task_data = user_data["task"]
         completed_tasks = await self.get_completed_tasks(user_task_data)
+        unlocked = user_data.get(UNLOCKED_KEY, {})
+        counters = task_counters(user_task_data)
 
         return [
             {
-                "name": "任务新手",
-                "description": "完成第一个任务",
-                "target": 1,
-                "progress": min(1, completed_tasks["total"]),
-                "unlocked": completed_tasks["total"] >= 1,
-                "type": "count",
-            },
-            {
-                "name": "勤劳工作者",
-                "description": "完成10个任务",
-                "target": 10,
-                "progress": min(10, completed_tasks["total"]),
-                "unlocked": completed_tasks["total"] >= 10,
-                "type": "count",
-            },
-            {
-                "name": "任务大师",
-                "description": "完成50个任务",
-                "target": 50,
-                "progress": min(50, completed_tasks["total"]),
-                "unlocked": completed_tasks["total"] >= 50,
+                "name": definition.name,
+                "description": definition.description,
+                "target": definition.threshold,
+                "progress": definition.threshold
+                if definition.id in unlocked
+                else min(counters[definition.counter], definition.threshold),
+                "unlocked": definition.id in unlocked,
                 "type": "count",
-            },
-            {
-                "name": "点数收集者",
-                "description": "累计获得1000任务点数",
-                "target": 1000,
-                "progress": min(1000, user_task_data.get("task_points", 0)),
-                "unlocked": (user_task_data.get("task_points", 0) >= 1000),
-                "type": "count",
-            },
+            }
+            for definition in achievements.definitions.values()
+            if definition.group == "task"
         ], completed_tasks
 
     async def format_user_tasks(self, event: AiocqhttpMessageEvent) -> str:
         """格式化用户任务信息"""
         user_id = str(event.get_sender_id())
         try:
-            user_tasks = await self.get_user_tasks(event, user_id)
-            task_data = await self.get_task_data()
-            achievements, completed_tasks = await self.get_user_achievements(user_tasks)
+            user_tasks, user_data = await self.get_user_tasks(
+                event, user_id, is_return_user_data=True
+            )
+            user_achievements, completed_tasks = await self.get_user_achievements(
+                user_id, user_data
+            )
 
-            # 确保task_data有正确的结构
-            daily_tasks = task_data.get("daily_tasks", {})
-            weekly_tasks = task_data.get("weekly_tasks", {})
-            special_tasks = task_data.get("special_tasks", {})
-            task_shop = task_data.get("task_shop", {})
+            daily_tasks = task_catalog.tasks("daily")
+            weekly_tasks = task_catalog.tasks("weekly")
+            special_tasks = task_catalog.tasks("special")
+            task_shop = task_catalog.shop_items()
 
             # 公共工具（仅在本函数内使用，减少重复逻辑）
             def _progress_of(state: Dict[str, Any], target: int) -> Tuple[int, int]:
@@ -354,7 +334,7 @@ class Task:
                             else 0
                         ),
                     }
-                    for ach in achievements
+                    for ach in user_achievements
                 ]
             except Exception as e:
                 logger.error(f"格式化任务数据失败: {str(e)}")
@@ -430,8 +410,7 @@ class Task:
         user_id = str(event.get_sender_id())
         try:
             user_tasks = await self.get_user_tasks(event, user_id)
-            task_data = await self.get_task_data()
-            daily_tasks = task_data.get("daily_tasks", {})
+            daily_tasks = task_catalog.tasks("daily")
 
             message = "📅 每日任务 📅\n━━━━━━━━━━━━━━━\n"
             for task_id, task in daily_tasks.items():
@@ -469,8 +448,7 @@ class Task:
         user_id = str(event.get_sender_id())
         try:
             user_tasks = await self.get_user_tasks(event, user_id)
-            task_data = await self.get_task_data()
-            weekly_tasks = task_data.get("weekly_tasks", {})
+            weekly_tasks = task_catalog.tasks("weekly")
 
             message = "📆 周常任务 📆\n"
             message += "━━━━━━━━━━━━━━━\n"
@@ -509,8 +487,7 @@ class Task:
         user_id = str(event.get_sender_id())
         try:
             user_tasks = await self.get_user_tasks(event, user_id)
-            task_data = await self.get_task_data()
-            special_tasks = task_data.get("special_tasks", {})
+            special_tasks = task_catalog.tasks("special")
 
             message = "⭐ 特殊任务 ⭐\n"
             message += "━━━━━━━━━━━━━━━\n"
@@ -560,130 +537,217 @@ class Task:
                 )
                 return
             task_name = parts[0]
-            try:
-                user_tasks, user_data = await self.get_user_tasks(
-                    event, user_id, is_return_user_data=True
-                )
-                backpack = await get_user_data_and_backpack(user_id, "user_backpack")
-                task_data = await self.get_task_data()
-
-                # 查找任务
-                task = None
-                task_type = None
-                user_task = None  # 初始化变量为None
-                found = False  # 标志位：是否找到任务
-
-                # 检查所有任务类型
-                task_type_mapping = {
-                    "daily_tasks": "daily",
-                    "weekly_tasks": "weekly",
-                    "special_tasks": "special",
-                }
-                # 检查所有任务类型（使用带_tasks的键访问访问task_data）
-                for task_data_key, task_type in task_type_mapping.items():
-                    # 遍历用户任务（用户任务的键是不带_tasks的，如"weekly"）
-                    for user_task_name, user_task in user_tasks.get(
-                        task_type, {}
-                    ).items():
-                        if user_task_name == task_name:
-                            # 从task_data中获取对应类型的任务定义（用带_tasks的键）
-                            for task_item in task_data.get(task_data_key, {}).values():
-                                if task_item["name"] == task_name:
-                                    task = task_item  # 找到对应任务定义
-                                    found = True  # 标记找到任务
-                                    break  # 跳出内层循环
-                            if found:
-                                break  # 跳出次内层循环
-                    if found:
-                        break  # 找到任务后跳出外层循环
-
-                if not user_task:
-                    await event.send(
-                        event.plain_result(f"你没有名为「{task_name}」的任务！")
+            async with user_store.transaction(user_id):
+                try:
+                    user_tasks, user_data = await self.get_user_tasks(
+                        event, user_id, is_return_user_data=True
                     )
-                    return
-                if user_task["claimed"]:
-                    await event.send(
-                        event.plain_result(f"你已经领取过「{task_name}」的奖励！")
+                    backpack = await get_user_data_and_backpack(
+                        user_id, "user_backpack"
                     )
-                    return
-                if not user_task["completed"]:
-                    await event.send(
-                        event.plain_result(f"任务 {task_name} 尚未完成，无法领取奖励！")
-                    )
-                    return
-            except Exception as e:
-                logger.error(f"查找任务失败: {str(e)}")
-                await event.send(event.plain_result("查找任务失败，请稍后再试"))
-                return
 
-            try:
-                # 处理奖励发放
-                rewards = ""
-                # 金币奖励
-                if "money" in task["rewards"]:
-                    user_data["home"]["money"] = (
-                        user_data["home"].get("money", 0) + task["rewards"]["money"]
-                    )
-                    rewards += f"💰 {task['rewards']['money']} 金币\n"
+                    # 查找任务（不同类别可能有同名任务，取用户已接取的第一个）
+                    task = None
+                    user_task = None
+                    for category, task_item in task_catalog.find_by_name(task_name):
+                        user_task = user_tasks.get(category, {}).get(task_name)
+                        if user_task:
+                            task = task_item
+                            break
+
+                    if not user_task:
+                        await event.send(
+                            event.plain_result(f"你没有名为「{task_name}」的任务！")
+                        )
+                        return
+                    if user_task["claimed"]:
+                        await event.send(
+                            event.plain_result(f"你已经领取过「{task_name}」的奖励！")
+                        )
+                        return
+                    if not user_task["completed"]:
+                        await event.send(
+                            event.plain_result(
+                                f"任务 {task_name} 尚未完成，无法领取奖励！"
+                            )
+                        )
+                        return
+                except Exception as e:
+                    logger.error(f"查找任务失败: {str(e)}")
+                    await event.send(event.plain_result("查找任务失败，请稍后再试"))
+                    return
 
-                # 好感度奖励
-                if "love" in task["rewards"]:
-                    user_data["home"]["love"] = (
-                        user_data["home"].get("love", 0) + task["rewards"]["love"]
-                    )
-                    rewards += f"❤️ {task['rewards']['love']} 好感度\n"
+                try:
+                    # 处理奖励发放
+                    rewards = ""
+                    # 金币奖励
+                    if "money" in task["rewards"]:
+                        user_data["home"]["money"] = (
+                            user_data["home"].get("money", 0) + task["rewards"]["money"]
+                        )
+                        rewards += f"💰 {task['rewards']['money']} 金币\n"
 
-                # 道具奖励
-                if "items" in task["rewards"]:
-                    for item_name, count in task["rewards"]["items"].items():
-                        rewards += f"{item_name} ×{count}\n"
-                        backpack[item_name] = backpack.get(item_name, 0) + count
+                    # 好感度奖励
+                    if "love" in task["rewards"]:
+                        user_data["home"]["love"] = (
+                            user_data["home"].get("love", 0) + task["rewards"]["love"]
+                        )
+                        rewards += f"❤️ {task['rewards']['love']} 好感度\n"
+
+                    # 道具奖励
+                    if "items" in task["rewards"]:
+                        for item_name, count in task["rewards"]["items"].items():
+                            rewards += f"{item_name} ×{count}\n"
+                            backpack[item_name] = backpack.get(item_name, 0) + count
+
+                    # 任务点数奖励
+                    if "task_points" in task["rewards"]:
+                        user_tasks["task_points"] = (
+                            user_tasks.get("task_points", 0)
+                            + task["rewards"]["task_points"]
+                        )
+                        rewards += f"🏆 {task['rewards']['task_points']} 任务点数\n"
 
-                # 任务点数奖励
-                if "task_points" in task["rewards"]:
-                    user_tasks["task_points"] = (
-                        user_tasks.get("task_points", 0)
-                        + task["rewards"]["task_points"]
-                    )
-                    rewards += f"🏆 {task['rewards']['task_points']} 任务点数\n"
-                # 构建奖励消息
+                    # 标记为已领取并检查任务成就
+                    unlocked = await self.record_claims(user_id, user_data, backpack, 1)
+                    user_task["claimed"] = True
 
-                message = [
-                    Comp.At(qq=user_id),
-                    Comp.Plain(
+                    # 构建奖励消息
+                    text = (
                         "：\n🎉 任务完成！\n"
                         f"📋 {task_name}\n"
                         "🎁 获得奖励:\n"
                         f"{rewards}\n"
                         f"💰 当前金币: {user_data.get('money', 0)}\n"
                         f"🏆 任务点数: {user_tasks.get('task_points', 0)}"
-                    ),
-                ]
-                await event.send(event.chain_result(message))
+                    )
+                    if unlocked:
+                        text += "\n" + unlocked.rstrip("\n")
+                    message = [Comp.At(qq=user_id), Comp.Plain(text)]
+                    await event.send(event.chain_result(message))
+
+                    # 保存数据
+                    await write_json(self.user_data_path / f"{user_id}.json", user_data)
+                    await write_json(self.backpack_path / f"{user_id}.json", backpack)
+
+                except Exception as e:
+                    logger.error(f"发放任务奖励失败: {str(e)}")
+                    await event.send(event.plain_result("发放任务奖励失败，请稍后再试"))
+                    return
+        except Exception as e:
+            logger.error(f"领取奖励失败: {str(e)}")
+            await event.send(event.plain_result("领取奖励失败，请稍后再试"))
 
-                # 标记为已领取
-                user_data["task"][task_type][task["name"]]["claimed"] = True
+    async def handle_claim_all(self, event: AiocqhttpMessageEvent, parts: list[str]):
+        """一键领取全部（或某一类别）已完成任务的奖励，使用方法: /一键领取 [每日/周常/特殊]"""
+        user_id = str(event.get_sender_id())
+        try:
+            categories = list(CATEGORY_NAMES)
+            if parts:
+                if parts[0] not in CLAIM_CATEGORIES:
+                    await event.send(
+                        event.plain_result("使用方法: /一键领取 [每日/周常/特殊]")
+                    )
+                    return
+                categories = [CLAIM_CATEGORIES[parts[0]]]
+            async with user_store.transaction(user_id):
+                result = await self.get_user_tasks(
+                    event, user_id, is_return_user_data=True
+                )
+                if not result:
+                    return
+                user_tasks, user_data = result
+
+                # 一次扫描找出全部已完成未领取的任务，汇总奖励
+                claimed: Dict[str, List[str]] = {}
+                states: List[Dict[str, Any]] = []
+                totals: Dict[str, int] = {}
+                items: Dict[str, int] = {}
+                for category in categories:
+                    for task_name, state in user_tasks.get(category, {}).items():
+                        if not state.get("completed") or state.get("claimed"):
+                            continue
+                        task = next(
+                            (
+                                task_item
+                                for task_category, task_item in task_catalog.find_by_name(
+                                    task_name
+                                )
+                                if task_category == category
+                            ),
+                            None,
+                        )
+                        if task is None:
+                            continue
+                        rewards = task.get("rewards", {})
+                        for key in ("money", "love", "task_points"):
+                            if key in rewards:
+                                totals[key] = totals.get(key, 0) + rewards[key]
+                        for item_name, count in rewards.get("items", {}).items():
+                            items[item_name] = items.get(item_name, 0) + count
+                        states.append(state)
+                        claimed.setdefault(category, []).append(task_name)
+
+                if not claimed:
+                    await event.send(
+                        event.plain_result("暂时没有可以领取奖励的任务，继续加油吧~")
+                    )
+                    return
 
-                # 保存数据
+                # 奖励一次性发放，用户数据和背包各写入一次
+                home = user_data["home"]
+                home["money"] = home.get("money", 0) + totals.get("money", 0)
+                home["love"] = home.get("love", 0) + totals.get("love", 0)
+                user_tasks["task_points"] = user_tasks.get(
+                    "task_points", 0
+                ) + totals.get("task_points", 0)
+                # 标记为已领取并检查任务成就
+                unlocked = await self.record_claims(
+                    user_id, user_data, None, len(states)
+                )
+                for state in states:
+                    state["claimed"] = True
                 await write_json(self.user_data_path / f"{user_id}.json", user_data)
-                await write_json(self.backpack_path / f"{user_id}.json", backpack)
-
-            except Exception as e:
-                logger.error(f"发放任务奖励失败: {str(e)}")
-                await event.send(event.plain_result("发放任务奖励失败，请稍后再试"))
-                return
+                if items:
+                    backpack = await get_user_data_and_backpack(
+                        user_id, "user_backpack"
+                    )
+                    for item_name, count in items.items():
+                        backpack[item_name] = backpack.get(item_name, 0) + count
+                    await write_json(self.backpack_path / f"{user_id}.json", backpack)
+
+            count = sum(len(names) for names in claimed.values())
+            message = f"：\n🎉 一键领取成功！共领取{count}个任务的奖励\n"
+            for category, names in claimed.items():
+                message += f"📋 {CATEGORY_NAMES[category]}：{'、'.join(names)}\n"
+            message += "🎁 获得奖励:\n"
+            if totals.get("money"):
+                message += f"💰 {totals['money']} 金币\n"
+            if totals.get("love"):
+                message += f"❤️ {totals['love']} 好感度\n"
+            for item_name, item_count in items.items():
+                message += f"{item_name} ×{item_count}\n"
+            if totals.get("task_points"):
+                message += f"🏆 {totals['task_points']} 任务点数\n"
+            message += (
+                f"\n💰 当前金币: {home['money']}\n"
+                f"🏆 任务点数: {user_tasks['task_points']}"
+            )
+            if unlocked:
+                message += "\n" + unlocked.rstrip("\n")
+            await event.send(
+                event.chain_result([Comp.At(qq=user_id), Comp.Plain(message)])
+            )
         except Exception as e:
-            logger.error(f"领取奖励失败: {str(e)}")
-            await event.send(event.plain_result("领取奖励失败，请稍后再试"))
+            logger.error(f"一键领取奖励失败: {str(e)}")
+            await event.send(event.plain_result("一键领取奖励失败，请稍后再试"))
 
     async def format_task_shop_items(self, event: AiocqhttpMessageEvent):
         """格式化任务商店物品列表"""
         user_id = str(event.get_sender_id())
         try:
             user_tasks = await self.get_user_tasks(event, user_id)
-            task_data = await self.get_task_data()
-            task_shop = task_data.get("task_shop", {})
+            task_shop = task_catalog.shop_items()
             message = [
                 Comp.Plain(
                     "🏪 任务商店 🏪\n"
@@ -739,57 +803,60 @@ class Task:
                     )
                 )
                 return
-            try:
-                user_tasks, user_data = await self.get_user_tasks(
-                    event, user_id, is_return_user_data=True
-                )
-                backpack = await get_user_data_and_backpack(user_id, "user_backpack")
-                task_data = await self.get_task_data()
-                task_shop = task_data.get("task_shop", {})
-                item = task_shop.get(item_name, {})
-
-                if not item:
-                    await event.send(
-                        event.plain_result(f"任务商店中没有名为「{item_name}」的物品！")
+            async with user_store.transaction(user_id):
+                try:
+                    user_tasks, user_data = await self.get_user_tasks(
+                        event, user_id, is_return_user_data=True
                     )
-                    return
+                    backpack = await get_user_data_and_backpack(
+                        user_id, "user_backpack"
+                    )
+                    item = task_catalog.shop_item(item_name)
 
-                price = item.get("task_point_price", 0)
-                if user_tasks.get("task_points", 0) < price * quantity:
-                    await event.send(
-                        event.plain_result(
-                            f"你的任务点数不足！需要 {price * quantity} 点，你只有 {user_tasks['task_points']} 点"
+                    if not item:
+                        await event.send(
+                            event.plain_result(
+                                f"任务商店中没有名为「{item_name}」的物品！"
+                            )
                         )
-                    )
+                        return
+
+                    price = item.get("task_point_price", 0)
+                    if user_tasks.get("task_points", 0) < price * quantity:
+                        await event.send(
+                            event.plain_result(
+                                f"你的任务点数不足！需要 {price * quantity} 点，你只有 {user_tasks['task_points']} 点"
+                            )
+                        )
+                        return
+                except Exception as e:
+                    logger.error(f"查找商店物品失败: {str(e)}")
+                    await event.send(event.plain_result("查找商店物品失败，请稍后再试"))
                     return
-            except Exception as e:
-                logger.error(f"查找商店物品失败: {str(e)}")
-                await event.send(event.plain_result("查找商店物品失败，请稍后再试"))
-                return
-
-            try:
-                # 扣除任务点数
-                user_data["task"]["task_points"] -= price * quantity
-                # 添加物品到背包
-                backpack[item_name] = backpack.get(item_name, 0) + quantity
 
-                message = [
-                    Comp.At(qq=user_id),
-                    Comp.Plain(
-                        f"🛍️ 兑换成功！\n"
-                        f"🎁 你获得了: {item_name} × {quantity}\n"
-                        f"商品描述：{item['description']}\n"
-                        f"💎 消耗: {price} 任务点数\n"
-                        f"🏆 剩余任务点数: {user_tasks.get('task_points', 0)}"
-                    ),
-                ]
-                await write_json(self.user_data_path / f"{user_id}.json", user_data)
-                await write_json(self.backpack_path / f"{user_id}.json", backpack)
-                await event.send(event.chain_result(message))
-            except Exception as e:
-                logger.error(f"处理兑换失败: {str(e)}")
-                await event.send(event.plain_result("处理兑换失败，请稍后再试"))
-                return
+                try:
+                    # 扣除任务点数
+                    user_data["task"]["task_points"] -= price * quantity
+                    # 添加物品到背包
+                    backpack[item_name] = backpack.get(item_name, 0) + quantity
+
+                    message = [
+                        Comp.At(qq=user_id),
+                        Comp.Plain(
+                            f"🛍️ 兑换成功！\n"
+                            f"🎁 你获得了: {item_name} × {quantity}\n"
+                            f"商品描述：{item['description']}\n"
+                            f"💎 消耗: {price} 任务点数\n"
+                            f"🏆 剩余任务点数: {user_tasks.get('task_points', 0)}"
+                        ),
+                    ]
+                    await write_json(self.user_data_path / f"{user_id}.json", user_data)
+                    await write_json(self.backpack_path / f"{user_id}.json", backpack)
+                    await event.send(event.chain_result(message))
+                except Exception as e:
+                    logger.error(f"处理兑换失败: {str(e)}")
+                    await event.send(event.plain_result("处理兑换失败，请稍后再试"))
+                    return
         except Exception as e:
             logger.error(f"兑换物品失败: {str(e)}")
             await event.send(event.plain_result("兑换物品失败，请稍后再试"))
@@ -799,23 +866,22 @@ class Task:
         user_id = str(event.get_sender_id())
         try:
             # 检查刷新冷却时间
-            refresh_cost = 1000
-            user_tasks, user_data = await self.get_user_tasks(
-                event, user_id, is_return_user_data=True
-            )
-            if user_data.get("money", 0) < refresh_cost:
-                await event.send(
-                    event.plain_result(
-                        f"刷新每日任务需要 {refresh_cost} 金币，你的金币不足"
-                    )
+            async with user_store.transaction(user_id):
+                refresh_cost = 1000
+                user_tasks, user_data = await self.get_user_tasks(
+                    event, user_id, is_return_user_data=True
                 )
-                return
-            user_data["money"] -= refresh_cost
-            # 重置每日任务
-            today = datetime.now(self.CN_TIMEZONE).strftime("%Y-%m-%d")
-            user_data["task"]["daily"] = {}
-            user_data["task"]["last_daily_refresh"] = today
-            await write_json(self.user_data_path / f"{user_id}.json", user_data)
+                if user_data.get("money", 0) < refresh_cost:
+                    await event.send(
+                        event.plain_result(
+                            f"刷新每日任务需要 {refresh_cost} 金币，你的金币不足"
+                        )
+                    )
+                    return
+                user_data["money"] -= refresh_cost
+                # 重置每日任务
+                self.reset_period(user_data["task"], "daily", epoch_clock.epochs()[0])
+                await write_json(self.user_data_path / f"{user_id}.json", user_data)
 
             message = [
                 Comp.at(qq=user_id),
@@ -843,60 +909,47 @@ class Task:
         is_direct_set: bool = False,
     ) -> bool:
         """
-        更新任务进度（供其他系统调用）\n
+        更新任务进度（供其他系统调用，只发出进度事件，由事件总线合并后统一应用）\n
         user_id: 用户ID\n
         track_key: 任务追踪键\n
         value: 增量值或设置值，默认1\n
         is_increment: 是否为增量更新，False则为设置最大值，默认True（当is_direct_set为True时此参数无效）\n
-        is_direct_set: 是否直接设置进度值，True则直接将progress设置为value，默认False
+        is_direct_set: 是否直接设置进度值，True则直接将progress设置为value，默认False\n
+        返回是否有任务以该追踪键计算进度
         """
-        try:
-            user_tasks, user_data = await self.get_user_tasks(
-                event, user_id, is_return_user_data=True
-            )
-            task_data = await self.get_task_data()
-
-            # 确保task_data有正确的结构
-            tasks_categories = {
-                "daily": task_data.get("daily_tasks", {}),
-                "weekly": task_data.get("weekly_tasks", {}),
-                "special": task_data.get("special_tasks", {}),
-            }
-            updated = False
-            for task_category, tasks in tasks_categories.items():
-                for task_id, task in tasks.items():
-                    if track_key == task.get("track_key"):
-                        if task_category not in user_tasks:
-                            user_tasks[task_category] = {}
-                        if task["name"] not in user_tasks[task_category]:
-                            user_tasks[task_category][task["name"]] = {
-                                "progress": 0,
-                                "completed": False,
-                                "claimed": False,
-                            }
-
-                        user_task = user_tasks[task_category][task["name"]]
-                        if not user_task.get("completed"):
-                            if is_direct_set:
-                                # 直接设置进度值
-                                user_task["progress"] = value
-                            elif is_increment:
-                                # 增量更新
-                                user_task["progress"] += value
-                            else:
-                                # 设置为最大值（原逻辑）
-                                user_task["progress"] = max(
-                                    tasks[task_id].get("target", 0), value
-                                )
-
-                            if user_task["progress"] >= tasks[task_id].get(
-                                "target", float("inf")
-                            ):
-                                user_task["completed"] = True
-                            updated = True
-            user_data["task"] = user_tasks
-            # 写回用户数据文件
-            await write_json(self.user_data_path / f"{user_id}.json", user_data)
-            return updated
-        except Exception as e:
-            logger.error(f"更新用户 {user_id} 任务进度失败: {str(e)}")
+        if not task_catalog.tasks_for(track_key):
+            return False
+        mode = "set" if is_direct_set else ("add" if is_increment else "max")
+        progress_bus.emit(str(user_id), track_key, value, mode)
+        return True
+
+    async def apply_progress(self, user_id: str, events: List[ProgressEvent]) -> bool:
+        """一次性应用某用户合并后的进度事件（由事件总线在该用户的事务内调用），返回是否有更新"""
+        file_path = self.user_data_path / f"{user_id}.json"
+        user_data = await read_json(file_path)
+        if "task" not in user_data:
+            # 未注册用户的进度不记录
+            return False
+        user_tasks = user_data["task"]
+        self.roll_over(user_tasks)
+        updated = False
+        for track_key, value, mode in events:
+            for task_category, task in task_catalog.tasks_for(track_key):
+                category_tasks = user_tasks.setdefault(task_category, {})
+                user_task = category_tasks.setdefault(
+                    task["name"], {"progress": 0, "completed": False, "claimed": False}
+                )
+                if user_task.get("completed"):
+                    continue
+                if mode == "set":
+                    user_task["progress"] = value
+                elif mode == "add":
+                    user_task["progress"] += value
+                else:
+                    user_task["progress"] = max(user_task["progress"], value)
+                if user_task["progress"] >= task.get("target", float("inf")):
+                    user_task["completed"] = True
+                updated = True
+        if updated:
+            await write_json(file_path, user_data)
+        return updated
@@ -1,3 +1,4 @@
+import re
 import time
 from pathlib import Path
 from typing import Any, Dict, Optional
@@ -9,9 +10,22 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
 )
 
 # 导入工具函数
-from ..utils.utils import get_at_ids, get_nickname, read_json, write_json
+from ..utils.utils import (
+    epoch_clock,
+    get_at_ids,
+    get_nickname,
+    is_user_registered,
+    read_json,
+    user_cache,
+    user_registry,
+    user_store,
+    write_json,
+)
 from .task import Task
 
+# 用户列表每页人数
+USER_LIST_PAGE_SIZE = 20
+
 
 class User:
     def __init__(self):
@@ -61,8 +75,8 @@ class User:
                     "weekly": {},
                     "special": {},
                     "task_points": 0,
-                    "last_daily_refresh": "",
-                    "last_weekly_refresh": "",
+                    "daily_epoch": epoch_clock.epochs()[0],
+                    "weekly_epoch": epoch_clock.epochs()[1],
                 }
             },
         }
@@ -177,8 +191,7 @@ class User:
         try:
             # 删除对应用户id文件
             user_file = self.user_data_path / f"{user_id}.json"
-            if user_file.exists():
-                user_file.unlink()
+            if await user_cache.delete(user_file):
                 logger.info(f"用户 {user_id} 数据已删除")
                 return True
             logger.warning(f"用户 {user_id} 数据文件不存在")
@@ -190,7 +203,7 @@ class User:
     async def get_user_list(self) -> list[str]:
         """获取所有用户ID列表"""
         try:
-            return [f.stem for f in self.user_data_path.glob("*.json") if f.is_file()]
+            return user_cache.list_ids(self.user_data_path)
         except Exception as e:
             logger.error(f"获取用户列表失败: {str(e)}")
             return []
@@ -212,20 +225,24 @@ class User:
                 user_id = str(event.get_sender_id())
             nickname = await get_nickname(event, user_id)
             if user_id != str(event.get_sender_id()):
-                he_data = self.user_data_path / f"{user_id}.json"
-                if not he_data.exists():
+                if not await is_user_registered(user_id):
                     return f"{nickname}还没有注册用户信息哦，请让他先进行一次签到来注册信息~"
-            user_data = await self.get_user(user_id, nickname)
-            battle_data = await self.get_battle_data(user_id)
-            home_data = await self.get_home_data(user_id)
-
-            # 更新任务进度
-            await self.task.update_task_progress(
-                event, user_id, "max_money", home_data["money"], is_direct_set=True
-            )
-            await self.task.update_task_progress(
-                event, user_id, "max_love", home_data["love"], is_direct_set=True
-            )
+            async with user_store.transaction(user_id):
+                user_data = await self.get_user(user_id, nickname)
+                battle_data = await self.get_battle_data(user_id)
+                home_data = await self.get_home_data(user_id)
+
+                # 更新任务进度
+                await self.task.update_task_progress(
+                    event,
+                    user_id,
+                    "max_money",
+                    home_data["money"],
+                    is_direct_set=True,
+                )
+                await self.task.update_task_progress(
+                    event, user_id, "max_love", home_data["love"], is_direct_set=True
+                )
 
             return (
                 f"用户信息:\n"
@@ -277,9 +294,10 @@ class User:
             if amount <= 0:
                 return False, "增加的金额必须为正整数"
 
-            home_data = await self.get_home_data(to_user_id)
-            home_data["money"] = home_data.get("money", 0) + amount
-            await self.update_home_data(to_user_id, home_data)
+            async with user_store.transaction(to_user_id):
+                home_data = await self.get_home_data(to_user_id)
+                home_data["money"] = home_data.get("money", 0) + amount
+                await self.update_home_data(to_user_id, home_data)
             return (
                 True,
                 f"成功为用户{to_user_id}增加 {amount} 金钱\n"
@@ -289,20 +307,52 @@ class User:
             logger.error(f"增加用户金钱失败: {str(e)}")
             return False, "增加用户金钱失败，请稍后再试~"
 
-    async def get_all_users_info(self) -> str:
-        """获取所有用户详细信息列表"""
+    async def get_all_users_info(
+        self, event: AiocqhttpMessageEvent, parts: list[str]
+    ) -> str:
+        """分页获取用户列表，使用方法: /用户列表 [N天] [本群/群号码] [从用户ID]"""
         try:
-            user_list = await self.get_user_list()
-            if not user_list:
-                return "暂无用户数据"
-
-            message = "用户列表:\n"
-            for user_id in user_list:
-                user_data = await self.get_user(user_id)
-                nickname = user_data.get("nickname", "未设置")
-                message += f"- {nickname}：ID({user_id})\n"
-
-            return message
+            if not user_registry.ready:
+                return "用户索引正在建立中，请稍后再试~"
+            active_days = group_id = after = None
+            filters = []
+            for part in parts:
+                if match := re.fullmatch(r"(\d+)天", part):
+                    active_days = int(match.group(1))
+                    filters.append(part)
+                elif part == "本群" and event.get_group_id():
+                    group_id = str(event.get_group_id())
+                    filters.append(f"群{group_id}")
+                elif match := re.fullmatch(r"群(\d+)", part):
+                    group_id = match.group(1)
+                    filters.append(part)
+                elif match := re.fullmatch(r"从(\d+)", part):
+                    after = match.group(1)
+                else:
+                    return "使用方法: /用户列表 [N天] [本群/群号码] [从用户ID]\n如：/用户列表 7天 本群"
+            active_since = (
+                time.time() - active_days * 86400 if active_days is not None else None
+            )
+            entries, next_cursor = user_registry.page(
+                after, USER_LIST_PAGE_SIZE, active_since, group_id
+            )
+            if not entries:
+                return "暂无符合条件的用户" if not after else "没有更多用户了"
+
+            total = user_registry.count(active_since, group_id)
+            message = f"用户列表（共{total}人）:\n"
+            for entry in entries:
+                last_active = (
+                    time.strftime("%m-%d %H:%M", time.localtime(entry.last_active))
+                    if entry.last_active
+                    else "未知"
+                )
+                message += f"- {entry.nickname or '未设置'}：ID({entry.user_id})，最后活跃 {last_active}\n"
+            if next_cursor:
+                message += (
+                    f"下一页：/用户列表 {' '.join(filters + [f'从{next_cursor}'])}"
+                )
+            return message.rstrip("\n")
         except Exception as e:
             logger.error(f"获取所有用户信息失败: {str(e)}")
             return "获取用户列表失败，请稍后再试~"
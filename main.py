@@ -1,3 +1,4 @@
+import asyncio
 import re
 import traceback
 from pathlib import Path
@@ -13,12 +14,28 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from .core.achievement import Achievement
 from .core.battle import Battle
 from .core.lottery import Lottery
+from .core.ranking import Ranking
 from .core.shop import Shop
 from .core.task import Task
 from .core.user import User
-from .utils.utils import get_cmd_info, logo_AATP
+from .utils.utils import (
+    achievements,
+    cooldowns,
+    get_cmd_info,
+    group_members,
+    io_executor,
+    leaderboards,
+    logo_AATP,
+    progress_bus,
+    recover_user_storage,
+    setup_user_storage,
+    shed_load,
+    user_cache,
+    user_registry,
+)
 
 
 @register(
@@ -36,8 +53,64 @@ class AkashaTerminal(Star):
             self.admins_id: list[str] = context.get_config().get("admins_id", [])
         except Exception as e:
             logger.error(f"读取冷却配置失败: {str(e)}")
+        self.configure_storage()
+        self.configure_cooldowns()
         self.initialize_subsystems()
 
+    # 根据配置初始化存储层
+    def configure_storage(self):
+        try:
+            storage_config = self.config.get("storage_system", {})
+            io_executor.configure(
+                workers=storage_config.get("io_workers", 4),
+                max_queue=storage_config.get("io_queue_limit", 256),
+            )
+            user_cache.configure(
+                enabled=storage_config.get("user_cache_enabled", True),
+                memory_budget=storage_config.get("user_cache_memory_mb", 64)
+                * 1024
+                * 1024,
+                flush_interval=storage_config.get("user_cache_flush_interval", 5),
+            )
+            setup_user_storage(storage_config.get("storage_backend", "json"))
+        except Exception as e:
+            logger.error(f"读取存储配置失败: {str(e)}")
+
+    # 根据配置启用预写日志，并重放上次异常退出时未压缩的日志段
+    # 日志段无法读取或隔离时抛出异常中止初始化，避免之后的写入被下次启动的重放覆盖
+    async def recover_storage(self):
+        try:
+            storage_config = self.config.get("storage_system", {})
+            await recover_user_storage(
+                journal_enabled=storage_config.get("journal_enabled", False),
+                journal_commit_window_ms=storage_config.get(
+                    "journal_commit_window_ms", 20
+                ),
+            )
+            if user_cache.journal is not None:
+                # 预写日志模式下定时落盘即日志压缩
+                user_cache.configure(
+                    flush_interval=storage_config.get("journal_compact_interval", 60)
+                )
+        except Exception as e:
+            logger.error(f"恢复预写日志失败: {str(e)}")
+            raise
+
+    # 从配置读取各功能的冷却时长（*_cooldown），并恢复重载前的冷却
+    def configure_cooldowns(self):
+        try:
+            durations = {
+                key[: -len("_cooldown")]: value
+                for section in self.config.values()
+                if isinstance(section, dict)
+                for key, value in section.items()
+                if key.endswith("_cooldown")
+            }
+            cooldowns.configure(durations)
+            cooldowns.load()
+        except Exception as e:
+            logger.error(f"读取冷却配置失败: {str(e)}")
+
     # 初始化各个子系统
     def initialize_subsystems(self):
         try:
@@ -51,6 +124,10 @@ class AkashaTerminal(Star):
             self.lottery = Lottery(self.config)
             # 战斗系统
             self.battle = Battle()
+            # 排行榜系统
+            self.ranking = Ranking()
+            # 成就系统
+            self.achievement = Achievement()
             logger.info("Akasha Terminal插件初始化完成")
         except Exception as e:
             logger.error(f"Akasha Terminal插件初始化失败:{str(e)}")
@@ -59,8 +136,34 @@ class AkashaTerminal(Star):
     async def initialize(self):
         """可选择实现异步的插件初始化方法，当实例化该插件类之后会自动调用该方法。"""
         logo_AATP()
+        # 日志重放须在加载排行榜、用户索引等派生数据之前完成
+        await self.recover_storage()
+        user_cache.start()
+        cooldowns.start_snapshots()
+        # 排行榜在后台加载快照（没有可用快照时全量重建），之后随用户数据写入增量更新
+        self.leaderboard_task = asyncio.get_running_loop().create_task(
+            leaderboards.load()
+        )
+        # 用户索引从索引文件加载，只补读缺少的用户
+        self.user_registry_task = asyncio.get_running_loop().create_task(
+            user_registry.load()
+        )
+        user_registry.start()
+        # 各成就的全服解锁人数在后台加载快照（没有可用快照时全量统计），之后随用户数据写入增量更新
+        self.achievement_task = asyncio.get_running_loop().create_task(
+            achievements.load()
+        )
+
+    @filter.event_message_type(filter.EventMessageType.ALL)
+    async def record_activity(self, event: AiocqhttpMessageEvent):
+        """记录已注册用户的最后活跃时间及所在群，并用消息/通知刷新群成员缓存"""
+        user_registry.touch(event.get_sender_id(), event.get_group_id() or None)
+        raw = getattr(getattr(event, "message_obj", None), "raw_message", None)
+        if isinstance(raw, dict):
+            group_members.observe(raw)
 
     @filter.command("我的信息", alias={"个人信息", "查看信息"})
+    @shed_load
     async def get_user_info(self, event: AiocqhttpMessageEvent):
         """查看个人信息，使用方法: /我的信息 @用户/qq号"""
         parts = await get_cmd_info(event)
@@ -69,6 +172,7 @@ class AkashaTerminal(Star):
 
     @filter.permission_type(filter.PermissionType.ADMIN)
     @filter.command("增加金钱", alias=["添加金钱", "加钱"])
+    @shed_load
     async def add_user_money(self, event: AiocqhttpMessageEvent):
         """增加用户金钱，使用方法: /增加金钱 金额"""
         parts = await get_cmd_info(event)
@@ -77,37 +181,139 @@ class AkashaTerminal(Star):
 
     @filter.permission_type(filter.PermissionType.ADMIN)
     @filter.command("用户列表")
+    @shed_load
     async def list_all_users(self, event: AiocqhttpMessageEvent):
-        """获取所有用户列表"""
-        message = await self.user.get_all_users_info()
+        """分页获取用户列表，使用方法: /用户列表 [N天] [本群/群号码] [从用户ID]"""
+        parts = await get_cmd_info(event)
+        message = await self.user.get_all_users_info(event, parts)
+        yield event.plain_result(message)
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("存储状态", alias={"缓存状态"})
+    async def storage_status(self, event: AiocqhttpMessageEvent):
+        """查看用户数据缓存状态"""
+        stats = user_cache.stats()
+        message = (
+            "🗄️ 用户数据缓存状态\n"
+            f"存储后端：{stats['backend']}\n"
+            f"缓存条目：{stats['entries']}（待落盘：{stats['dirty']}）\n"
+            f"内存占用：{stats['size'] / 1024 / 1024:.2f}/{stats['budget'] / 1024 / 1024:.0f}MB\n"
+            f"命中/未命中：{stats['hits']}/{stats['misses']}（命中率：{stats['hit_rate']:.1%}）\n"
+            f"淘汰次数：{stats['evictions']}\n"
+            f"落盘文件数：{stats['flushed_files']}（失败：{stats['flush_failures']}）"
+        )
+        journal_stats = stats["journal"]
+        if journal_stats:
+            message += (
+                f"\n预写日志：{journal_stats['records']}条记录/"
+                f"{journal_stats['commits']}次fsync，"
+                f"日志段{journal_stats['segments']}个"
+            )
+        cooldown_stats = cooldowns.stats()
+        message += (
+            f"\n冷却记录：{cooldown_stats['entries']}条"
+            f"（已到期清理{cooldown_stats['expired']}条）"
+        )
+        progress_stats = progress_bus.stats()
+        message += (
+            f"\n任务进度事件：收到{progress_stats['emitted']}条，"
+            f"合并后应用{progress_stats['applied']}条，"
+            f"提交{progress_stats['commits']}次（待处理{progress_stats['pending']}条）"
+        )
+        member_stats = group_members.stats()
+        message += (
+            f"\n群成员缓存：{member_stats['groups']}个群/{member_stats['members']}人，"
+            f"命中{member_stats['hits']}次，"
+            f"拉取成员列表{member_stats['list_fetches']}次/"
+            f"单个成员{member_stats['single_fetches']}次"
+        )
+        io_stats = io_executor.stats()
+        message += (
+            f"\nI/O线程池：{io_stats['workers']}线程，"
+            f"排队{io_stats['queued']}/{io_stats['max_queue']}"
+            f"（峰值{io_stats['queued_max']}），"
+            f"繁忙时拒绝命令{io_stats['rejected']}次"
+        )
+        for name, item in io_stats["priorities"].items():
+            message += (
+                f"\n  {name}：完成{item['completed']}，排队{item['queued']}，"
+                f"等待均值{item['wait_avg_ms']:.1f}ms/峰值{item['wait_max_ms']:.1f}ms"
+            )
         yield event.plain_result(message)
 
     async def terminate(self):
         """可选择实现异步的插件销毁方法，当插件被卸载/停用时会调用。"""
+        try:
+            await progress_bus.close()
+        except Exception as e:
+            logger.error(f"任务进度事件应用失败: {str(e)}")
+        flushed = False
+        try:
+            flushed = await user_cache.close()
+        except Exception as e:
+            logger.error(f"用户数据落盘失败: {str(e)}")
+        if flushed:
+            # 用户数据全部落盘后派生索引才与之一致，否则不保存快照，下次启动全量重建
+            try:
+                await leaderboards.save_snapshot()
+            except Exception as e:
+                logger.error(f"排行榜快照保存失败: {str(e)}")
+            try:
+                await achievements.save_snapshot()
+            except Exception as e:
+                logger.error(f"成就快照保存失败: {str(e)}")
+        try:
+            await cooldowns.close()
+        except Exception as e:
+            logger.error(f"冷却快照保存失败: {str(e)}")
+        try:
+            await user_registry.close()
+        except Exception as e:
+            logger.error(f"用户索引保存失败: {str(e)}")
+        io_executor.shutdown()
 
     ########## 任务系统
     @filter.command("每日任务", alias={"日常任务"})
+    @shed_load
     async def show_daily_tasks(self, event: AiocqhttpMessageEvent):
         """查看每日任务"""
         await self.task.format_user_daily_tasks(event)
 
     @filter.command("每周任务", alias={"周常任务"})
+    @shed_load
     async def show_weekly_tasks(self, event: AiocqhttpMessageEvent):
         """查看每周任务"""
         await self.task.format_user_weekly_tasks(event)
 
     @filter.command("特殊任务", alias={"活动任务"})
+    @shed_load
     async def show_special_tasks(self, event: AiocqhttpMessageEvent):
         """查看特殊任务"""
         await self.task.format_user_special_tasks(event)
 
     @filter.command("领取奖励", alias={"完成任务", "领取任务奖励"})
+    @shed_load
     async def claim_reward(self, event: AiocqhttpMessageEvent):
         """领取任务奖励，使用方法: #领取奖励 [任务名称]"""
         parts = await get_cmd_info(event)
         await self.task.handle_claim_reward(event, parts)
 
+    @filter.command("一键领取", alias={"全部领取", "一键领取奖励"})
+    @shed_load
+    async def claim_all_rewards(self, event: AiocqhttpMessageEvent):
+        """一键领取已完成任务的奖励，使用方法: /一键领取 [每日/周常/特殊]"""
+        parts = await get_cmd_info(event)
+        await self.task.handle_claim_all(event, parts)
+
+    @filter.command("我的成就", alias={"成就", "查看成就"})
+    @shed_load
+    async def my_achievements(self, event: AiocqhttpMessageEvent):
+        """查看成就的解锁情况及全服解锁人数"""
+        message = await self.achievement.handle_my_achievements(event)
+        yield event.plain_result(message)
+
     @filter.command("任务商店", alias={"任务兑换"})
+    @shed_load
     async def quest_shop(self, event: AiocqhttpMessageEvent):
         """显示任务商店"""
         await self.task.format_task_shop_items(event)
@@ -115,29 +321,34 @@ class AkashaTerminal(Star):
     @filter.command(
         "虚空兑换", alias={"商店兑换", "商城兑换", "任务商城兑换", "任务商店兑换"}
     )
+    @shed_load
     async def exchange_reward(self, event: AiocqhttpMessageEvent):
         """任务商店购买物品，使用方法: /虚空兑换 [商品名称]"""
         parts = await get_cmd_info(event)
         await self.task.handle_task_shop_purchase(event, parts)
 
     @filter.command("任务列表", alias={"我的任务", "查看任务"})
+    @shed_load
     async def show_tasks(self, event: AiocqhttpMessageEvent):
         """显示所有任务列表"""
         await self.task.format_user_tasks(event)
 
     @filter.command("刷新任务", alias={"重置任务", "刷新每日任务", "重置每日任务"})
+    @shed_load
     async def refresh_tasks(self, event: AiocqhttpMessageEvent):
         """手动重置每日任务"""
         await self.task.handle_reset_tasks(event)
 
     ########## 商店、背包系统
     @filter.command("商店", alias={"虚空商店", "商城", "虚空商城"})
+    @shed_load
     async def show_shop(self, event: AiocqhttpMessageEvent):
         """显示商店物品列表"""
         message = await self.shop.format_shop_items()
         yield event.plain_result(message)
 
     @filter.command("购买道具", alias={"买道具", "购买物品", "买物品"})
+    @shed_load
     async def buy_prop(self, event: AiocqhttpMessageEvent):
         """/购买道具 物品名称 数量"""
         # 提取命令后的参数部分
@@ -146,12 +357,14 @@ class AkashaTerminal(Star):
         yield event.plain_result(message)
 
     @filter.command("背包", alias="查看背包")
+    @shed_load
     async def show_backpack(self, event: AiocqhttpMessageEvent):
         """查看我的背包"""
         message = await self.shop.format_backpack(event)
         yield event.plain_result(message)
 
     @filter.command("使用道具", alias={"用道具", "使用物品", "用物品"})
+    @shed_load
     async def use_item(self, event: AiocqhttpMessageEvent):
         """使用道具，使用方法: /使用道具 物品名称"""
         parts = await get_cmd_info(event)
@@ -159,6 +372,7 @@ class AkashaTerminal(Star):
         yield event.plain_result(message)
 
     @filter.command("赠送道具", alias={"送道具", "赠送物品", "送物品"})
+    @shed_load
     async def gift_item(self, event: AiocqhttpMessageEvent):
         """赠送道具，使用方法: /赠送道具 物品名称 @用户"""
         parts = await get_cmd_info(event)
@@ -166,9 +380,13 @@ class AkashaTerminal(Star):
         yield event.plain_result(message)
 
     @filter.command("抽武器", alias={"单抽武器", "单抽", "抽卡"})
+    @shed_load
     async def draw_weapon(self, event: AiocqhttpMessageEvent):
-        """单抽武器"""
-        message, image_path = await self.lottery.weapon_draw(event, count=1)
+        """单抽武器，使用方法: /抽武器 [卡池名称]"""
+        parts = await get_cmd_info(event)
+        message, image_path = await self.lottery.weapon_draw(
+            event, count=1, banner_name=parts[0] if parts else None
+        )
         if image_path:
             message = [
                 Comp.Plain(message),
@@ -179,25 +397,92 @@ class AkashaTerminal(Star):
             yield event.plain_result(message)
 
     @filter.command("十连抽武器", alias={"十连武器", "武器十连", "十连抽", "十连"})
+    @shed_load
     async def draw_ten_weapons(self, event: AiocqhttpMessageEvent):
-        """十连抽武器"""
-        message, weapon_image_paths = await self.lottery.weapon_draw(event, count=10)
+        """十连抽武器，使用方法: /十连 [卡池名称]"""
+        parts = await get_cmd_info(event)
+        message, weapon_image_paths = await self.lottery.weapon_draw(
+            event, count=10, banner_name=parts[0] if parts else None
+        )
         components = [Comp.Plain(message)]
         # 只在有有效的图片路径列表时才添加图片
         if weapon_image_paths:
-            # 添加所有武器图片
+            # 添加合成图片（PNG数据）或所有武器图片
             for path in weapon_image_paths:
-                if path:
+                if isinstance(path, bytes):
+                    components.append(Comp.Image.fromBytes(path))
+                elif path:
                     components.append(Comp.Image.fromFileSystem(path))
         yield event.chain_result(components)
 
+    @filter.command("百连抽武器", alias={"百连武器", "武器百连", "百连抽", "百连"})
+    @shed_load
+    async def draw_hundred_weapons(self, event: AiocqhttpMessageEvent):
+        """百连抽武器，使用方法: /百连 [卡池名称]"""
+        parts = await get_cmd_info(event)
+        async for result in self.bulk_draw(event, 100, parts):
+            yield result
+
+    @filter.command("千连抽武器", alias={"千连武器", "武器千连", "千连抽", "千连"})
+    @shed_load
+    async def draw_thousand_weapons(self, event: AiocqhttpMessageEvent):
+        """千连抽武器，使用方法: /千连 [卡池名称]"""
+        parts = await get_cmd_info(event)
+        async for result in self.bulk_draw(event, 1000, parts):
+            yield result
+
+    @filter.command("多连抽武器", alias={"多连武器", "多连抽", "多连"})
+    @shed_load
+    async def draw_many_weapons(self, event: AiocqhttpMessageEvent):
+        """指定次数批量抽武器，使用方法: /多连 次数 [卡池名称]"""
+        parts = await get_cmd_info(event)
+        if not parts or not parts[0].isdigit():
+            yield event.plain_result("请指定抽卡次数，使用方法: /多连 次数 [卡池名称]")
+            return
+        async for result in self.bulk_draw(event, int(parts[0]), parts[1:]):
+            yield result
+
+    async def bulk_draw(self, event: AiocqhttpMessageEvent, count: int, parts):
+        """批量抽卡并发送汇总消息和高星武器图片"""
+        message, image = await self.lottery.weapon_bulk_draw(
+            event, count, banner_name=parts[0] if parts else None
+        )
+        if image:
+            yield event.chain_result([Comp.Plain(message), Comp.Image.fromBytes(image)])
+        else:
+            yield event.plain_result(message)
+
+    @filter.command("抽卡记录", alias={"抽卡历史", "祈愿记录"})
+    @shed_load
+    async def pull_history(self, event: AiocqhttpMessageEvent):
+        """查看最近的抽卡记录，使用方法: /抽卡记录 [条数] [@用户]"""
+        parts = await get_cmd_info(event)
+        message = await self.lottery.show_pull_history(event, parts)
+        yield event.plain_result(message)
+
+    @filter.command("五星记录", alias={"出金记录", "五星历史"})
+    @shed_load
+    async def five_star_history(self, event: AiocqhttpMessageEvent):
+        """查看五星出货记录，使用方法: /五星记录 [条数] [@用户]"""
+        parts = await get_cmd_info(event)
+        message = await self.lottery.show_five_star_history(event, parts)
+        yield event.plain_result(message)
+
+    @filter.command("卡池", alias={"查看卡池", "卡池列表"})
+    @shed_load
+    async def show_banners(self, event: AiocqhttpMessageEvent):
+        """查看武器卡池"""
+        yield event.plain_result(self.lottery.show_banners())
+
     @filter.command("签到", alias={"每日签到"})
+    @shed_load
     async def sign_in(self, event: AiocqhttpMessageEvent):
         """进行每日签到"""
         message = await self.lottery.daily_sign_in(event)
         yield event.plain_result(message)
 
     @filter.command("我的武器", alias={"武器库", "查看武器"})
+    @shed_load
     async def my_weapons(self, event: AiocqhttpMessageEvent):
         """展示背包武器的统计信息"""
         message = await self.lottery.show_my_weapons(event)
@@ -205,20 +490,63 @@ class AkashaTerminal(Star):
 
     @filter.permission_type(filter.PermissionType.ADMIN)
     @filter.command("开挂", alias={"增加纠缠之缘", "添加纠缠之缘"})
+    @shed_load
     async def cheat(self, event: AiocqhttpMessageEvent):
         """增添纠缠之缘，使用方法: /开挂 数量"""
         parts = await get_cmd_info(event)
         success, message = await self.lottery.handle_cheat_command(event, parts)
         yield event.plain_result(message)
 
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("抽卡模拟", alias={"抽卡概率报告", "模拟抽卡"})
+    @shed_load
+    async def simulate_gacha(self, event: AiocqhttpMessageEvent):
+        """模拟大量账号抽卡并输出概率报告，使用方法: /抽卡模拟 [账号数] [每个账号抽数] [卡池]"""
+        parts = await get_cmd_info(event)
+        message = await self.lottery.handle_simulate_command(parts)
+        yield event.plain_result(message)
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("资源检查", alias={"图片检查", "武器图片检查"})
+    @shed_load
+    async def check_assets(self, event: AiocqhttpMessageEvent):
+        """检查武器图片资源，列出缺少图片的武器及多余的图片"""
+        message = self.lottery.show_asset_report()
+        yield event.plain_result(message)
+
     @filter.command("刷新商城", alias={"刷新商店", "刷新虚空商店", "刷新虚空商城"})
     @filter.permission_type(filter.PermissionType.ADMIN)
+    @shed_load
     async def refresh_shop(self, event: AiocqhttpMessageEvent):
         """刷新商城物品"""
         message = await self.shop.refresh_shop_manually()
         yield event.plain_result(message)
 
+    @filter.command("排行榜", alias={"排名榜", "排行"})
+    @shed_load
+    async def leaderboard(self, event: AiocqhttpMessageEvent):
+        """查看排行榜，使用方法: /排行榜 [金钱/好感度/战斗力/连签] [全服]"""
+        parts = await get_cmd_info(event)
+        message = await self.ranking.handle_leaderboard_command(event, parts)
+        yield event.plain_result(message)
+
+    @filter.command("我的排名", alias={"查看排名"})
+    @shed_load
+    async def my_rank(self, event: AiocqhttpMessageEvent):
+        """查看自己在各排行榜的名次"""
+        message = await self.ranking.handle_my_rank_command(event)
+        yield event.plain_result(message)
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("重建排行榜", alias={"刷新排行榜"})
+    @shed_load
+    async def rebuild_leaderboard(self, event: AiocqhttpMessageEvent):
+        """全量重建排行榜（数据被外部修改后使用）"""
+        message = await self.ranking.rebuild()
+        yield event.plain_result(message)
+
     @filter.command("道具详情", alias={"道具详细", "物品详情", "物品详细"})
+    @shed_load
     async def item_detail(self, event: AiocqhttpMessageEvent):
         """查看道具详情，使用方法: /道具详情 物品名称"""
         parts = await get_cmd_info(event)
@@ -228,12 +556,14 @@ class AkashaTerminal(Star):
     @filter.command(
         "决斗", alias={"发起决斗", "开始决斗", "和我决斗", "与我决斗", "御前决斗"}
     )
+    @shed_load
     async def duel(self, event: AiocqhttpMessageEvent):
         """发起决斗，使用方法: /决斗 @用户/qq号"""
         parts = await get_cmd_info(event)
         await self.battle.handle_duel_command(event, parts, self.admins_id)
 
     @filter.command("设置战斗力系数", alias={"设置战斗力意义系数"})
+    @shed_load
     async def set_magnification(self, event: AiocqhttpMessageEvent):
         """设置战斗力系数值，使用方法: /设置战斗力系数 数值"""
         parts = await get_cmd_info(event)
@@ -241,6 +571,7 @@ class AkashaTerminal(Star):
 
     @filter.permission_type(filter.PermissionType.ADMIN)
     @filter.command("测试", alias={"测试用例"})
+    @shed_load
     async def abcd(self, event: AiocqhttpMessageEvent):
         """测试用例方法"""
         await self.shop.ceshi_command(event)
@@ -0,0 +1,170 @@
+"""预写日志崩溃恢复测试（python -m pytest tests）\n
+插件的存储单例在导入时绑定数据目录，每个阶段都在独立的子进程中执行（本文件同时作为子进程入口）：
+  write    以预写日志模式反复写入一批用户数据，全部组提交完成（已fsync）后等待被杀（日志压缩之前）
+  recover  按插件初始化的流程重放日志，可指定重放时写入失败的用户，以及恢复后继续写入的轮次
+需要安装AstrBot运行环境。
+"""
+
+import asyncio
+import importlib
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+ROOT = Path(__file__).resolve().parent.parent
+PLUGIN_NAME = "astrbot_plugin_akasha_terminal"
+USERS = [str(10001 + i) for i in range(8)]
+ROUNDS = 12
+# 子进程完成全部提交后输出的标记
+COMMITTED = "committed"
+# 子进程输出结果的前缀（其余输出为日志）
+RESULT = "result:"
+
+
+def load_utils(root: Path):
+    """以root为AstrBot根目录导入插件的utils.utils"""
+    # AstrBot按ASTRBOT_ROOT（旧版本按工作目录）确定data目录，须在导入插件前设置
+    os.environ["ASTRBOT_ROOT"] = str(root)
+    os.chdir(root)
+    sys.path.insert(0, str(ROOT.parent))
+    return importlib.import_module(f"{ROOT.name}.utils.utils")
+
+
+def record(user_id: str, round_index: int) -> dict:
+    """某个用户第round_index轮写入的数据"""
+    return {
+        "user": {"id": user_id, "nickname": f"用户{user_id}"},
+        "round": round_index,
+        "money": round_index * int(user_id),
+    }
+
+
+async def write_until_killed(root: Path, backend: str):
+    """子进程：写入全部轮次后输出标记并等待被杀（不启动定时落盘，日志不会被压缩）"""
+    utils = load_utils(root)
+    user_data_dir = utils.PLUGIN_DATA_DIR / "user_data"
+    user_data_dir.mkdir(parents=True, exist_ok=True)
+    utils.setup_user_storage(backend)
+    await utils.recover_user_storage(journal_enabled=True, journal_commit_window_ms=5)
+    assert utils.user_cache.journal is not None
+    for round_index in range(ROUNDS):
+        results = await asyncio.gather(
+            *(
+                utils.user_cache.write(
+                    user_data_dir / f"{user_id}.json", record(user_id, round_index)
+                )
+                for user_id in USERS
+            )
+        )
+        assert all(results)
+    print(COMMITTED, flush=True)
+    await asyncio.sleep(3600)
+
+
+async def recover(root: Path, backend: str, fail_user: str, next_round: int):
+    """子进程：重放日志（fail_user的写入抛出异常），之后可再写入一轮并正常关闭，输出各用户数据"""
+    utils = load_utils(root)
+    user_data_dir = utils.PLUGIN_DATA_DIR / "user_data"
+    utils.setup_user_storage(backend)
+    store = utils.user_cache.backend
+    save = store.save
+
+    def failing_save(file_path, data, previous=None):
+        if file_path.stem == fail_user:
+            raise OSError("模拟写入失败")
+        return save(file_path, data, previous)
+
+    store.save = failing_save
+    await utils.recover_user_storage(journal_enabled=False)
+    store.save = save
+    if next_round >= 0:
+        for user_id in USERS:
+            await utils.user_cache.write(
+                user_data_dir / f"{user_id}.json", record(user_id, next_round)
+            )
+    await utils.user_cache.close()
+    users = {
+        user_id: store.load(user_data_dir / f"{user_id}.json")[0] for user_id in USERS
+    }
+    print(RESULT + json.dumps(users, ensure_ascii=False), flush=True)
+    utils.io_executor.shutdown()
+
+
+def spawn(*args: str, **kwargs) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, __file__, *args], stdout=subprocess.PIPE, text=True, **kwargs
+    )
+
+
+def crash_after_commit(root: Path, backend: str):
+    """运行写入子进程，全部提交完成后直接杀掉（POSIX上为SIGKILL），再在最新日志段末尾追加半行"""
+    child = spawn("write", str(root), backend)
+    line = child.stdout.readline().strip()
+    child.kill()
+    child.wait()
+    child.stdout.close()
+    assert line == COMMITTED
+    segments = sorted(journal_dir(root).glob("journal.*.log"))
+    assert segments
+    with open(segments[-1], "ab") as f:
+        f.write(b'{"path": "user_data/10001.json", "data": {"round": ')
+
+
+def run_recover(
+    root: Path, backend: str, fail_user: str = "", next_round: int = -1
+) -> dict:
+    child = spawn("recover", str(root), backend, fail_user, str(next_round))
+    output, _ = child.communicate(timeout=60)
+    assert child.returncode == 0
+    lines = [line for line in output.splitlines() if line.startswith(RESULT)]
+    assert lines
+    return json.loads(lines[-1][len(RESULT) :])
+
+
+def journal_dir(root: Path) -> Path:
+    return root / "data" / "plugin_data" / PLUGIN_NAME / "journal"
+
+
+def make_root(tmp_path: Path) -> Path:
+    (tmp_path / "data" / "plugin_data" / PLUGIN_NAME).mkdir(parents=True)
+    return tmp_path
+
+
+def test_replay_after_kill_between_commit_and_compaction(tmp_path):
+    for backend in ("json", "sqlite"):
+        root = make_root(tmp_path / backend)
+        crash_after_commit(root, backend)
+        users = run_recover(root, backend)
+        # 截断的半行被忽略，每个用户都恢复为最后一次提交的版本
+        assert users == {user_id: record(user_id, ROUNDS - 1) for user_id in USERS}
+        assert not list(journal_dir(root).glob("journal.*.log"))
+
+
+def test_failed_replay_is_quarantined_and_not_replayed_on_restart(tmp_path):
+    root = make_root(tmp_path)
+    crash_after_commit(root, "json")
+    failed_user = USERS[0]
+
+    # 第一次启动：一个用户重放失败，日志段被隔离，之后的写入直接落到快照
+    users = run_recover(root, "json", fail_user=failed_user, next_round=ROUNDS)
+    assert users == {user_id: record(user_id, ROUNDS) for user_id in USERS}
+    assert not list(journal_dir(root).glob("journal.*.log"))
+    assert list(journal_dir(root).glob("journal.*.log.failed-*"))
+
+    # 再次启动：隔离的日志段不会被重放，不会用旧数据覆盖之后的写入
+    users = run_recover(root, "json")
+    assert users == {user_id: record(user_id, ROUNDS) for user_id in USERS}
+
+
+if __name__ == "__main__":
+    mode, root_arg, backend_arg = sys.argv[1:4]
+    if mode == "write":
+        asyncio.run(write_until_killed(Path(root_arg), backend_arg))
+    else:
+        asyncio.run(recover(Path(root_arg), backend_arg, sys.argv[4], int(sys.argv[5])))
@@ -0,0 +1,292 @@
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional
+
+from astrbot.api import logger
+
+from .io_executor import PRIORITY_FLUSH, PRIORITY_SCAN, IOExecutor
+from .weapon_bag import star_counts
+
+# 用户数据中记录已解锁成就的字段：{成就ID: 解锁时间戳}
+UNLOCKED_KEY = "achievements"
+
+
+class AchievementDef(NamedTuple):
+    id: str
+    name: str
+    badge: str
+    description: str
+    # 计数器名称及达成阈值（计数器值 >= 阈值即解锁）
+    counter: str
+    threshold: int
+    # 展示分组：task/weapon
+    group: str
+
+
+# 成就定义（新增成就只需在此添加一行，并在对应计数器变化处调用evaluate）
+ACHIEVEMENTS = (
+    AchievementDef(
+        "task_1", "任务新手", "📋", "完成第一个任务", "tasks_claimed", 1, "task"
+    ),
+    AchievementDef(
+        "task_10", "勤劳工作者", "📋", "完成10个任务", "tasks_claimed", 10, "task"
+    ),
+    AchievementDef(
+        "task_50", "任务大师", "📋", "完成50个任务", "tasks_claimed", 50, "task"
+    ),
+    AchievementDef(
+        "points_1000",
+        "点数收集者",
+        "🏆",
+        "拥有1000任务点数",
+        "task_points",
+        1000,
+        "task",
+    ),
+    AchievementDef(
+        "five_star_10",
+        "五星武器收藏家",
+        "🏆",
+        "拥有10种五星武器",
+        "five_star_kinds",
+        10,
+        "weapon",
+    ),
+    AchievementDef(
+        "four_star_50",
+        "四星武器大师",
+        "💎",
+        "拥有50种四星武器",
+        "four_star_kinds",
+        50,
+        "weapon",
+    ),
+    AchievementDef(
+        "weapon_100",
+        "武器收集达人",
+        "🎖️",
+        "获得过100种武器",
+        "weapon_kinds",
+        100,
+        "weapon",
+    ),
+)
+
+
+def task_counters(user_tasks: Dict[str, Any]) -> Dict[str, int]:
+    """任务相关的计数器（旧数据没有累计领取数时按当前已领取的任务计）"""
+    claimed = user_tasks.get("claimed_total")
+    if claimed is None:
+        claimed = sum(
+            1
+            for category in ("daily", "weekly", "special")
+            for state in user_tasks.get(category, {}).values()
+            if state.get("claimed")
+        )
+    return {"tasks_claimed": claimed, "task_points": user_tasks.get("task_points", 0)}
+
+
+def weapon_counters(weapon_data: Dict[str, Any]) -> Dict[str, int]:
+    """武器相关的计数器"""
+    counts = star_counts(weapon_data)
+    return {
+        "five_star_kinds": counts["五星武器"],
+        "four_star_kinds": counts["四星武器"],
+        "weapon_kinds": len(weapon_data.get("武器计数", {})),
+    }
+
+
+class AchievementEngine:
+    """成就系统\n
+    成就按计数器声明阈值，只在计数器变化时由调用方传入新值检查，按阈值有序扫描，
+    新解锁的成就以{成就ID: 解锁时间戳}记录在用户数据中，由evaluate返回一次供调用方播报。
+    查看成就只读取已解锁记录；各成就的全服解锁人数由用户数据写入监听器增量维护，
+    正常关闭时保存各用户已解锁的成就ID快照，启动时加载快照（读取后即删除），快照不可用时才全量统计。
+    """
+
+    def __init__(
+        self,
+        definitions: Iterable[AchievementDef],
+        snapshot_path: Path,
+        loader: Callable[[Path], Dict[str, Any]],
+        saver: Callable[[Path, Dict[str, Any]], bool],
+        executor: IOExecutor,
+        list_ids: Callable[[], Iterable[str]],
+        read: Callable[[str], Awaitable[Dict[str, Any]]],
+    ):
+        self.definitions = {d.id: d for d in definitions}
+        self._by_counter: Dict[str, list[AchievementDef]] = {}
+        for definition in sorted(self.definitions.values(), key=lambda d: d.threshold):
+            self._by_counter.setdefault(definition.counter, []).append(definition)
+        self.snapshot_path = Path(snapshot_path)
+        self._loader = loader
+        self._saver = saver
+        self._executor = executor
+        self._list_ids = list_ids
+        self._read = read
+        self._user_unlocked: Dict[str, frozenset[str]] = {}
+        self._holders: Dict[str, int] = {d: 0 for d in self.definitions}
+        self.ready = False
+        self._rebuilding = False
+        # 统计期间发生过写入的用户，不再用读到的旧数据覆盖
+        self._touched: set[str] = set()
+
+    def evaluate(
+        self, user_data: Dict[str, Any], counters: Dict[str, int]
+    ) -> list[AchievementDef]:
+        """用计数器的新值检查成就，返回本次新解锁的成就（调用方负责保存用户数据）"""
+        unlocked = user_data.setdefault(UNLOCKED_KEY, {})
+        now = int(time.time())
+        new = []
+        for counter, value in counters.items():
+            for definition in self._by_counter.get(counter, ()):
+                if definition.threshold > value:
+                    break
+                if definition.id not in unlocked:
+                    unlocked[definition.id] = now
+                    new.append(definition)
+        return new
+
+    def needs_backfill(self, user_data: Dict[str, Any]) -> bool:
+        """用户数据从未检查过成就（旧数据），需要用全部计数器检查一次"""
+        return UNLOCKED_KEY not in user_data
+
+    def backfill(
+        self, user_data: Dict[str, Any], weapon_data: Dict[str, Any]
+    ) -> list[AchievementDef]:
+        """用全部计数器检查一次成就"""
+        counters = task_counters(user_data.get("task", {}))
+        if weapon_data:
+            counters.update(weapon_counters(weapon_data))
+        return self.evaluate(user_data, counters)
+
+    def unlocked(
+        self, user_data: Dict[str, Any], group: Optional[str] = None
+    ) -> list[tuple[AchievementDef, int]]:
+        """已解锁的成就及解锁时间（按定义顺序）"""
+        records = user_data.get(UNLOCKED_KEY, {})
+        return [
+            (definition, records[definition.id])
+            for definition in self.definitions.values()
+            if definition.id in records and (group is None or definition.group == group)
+        ]
+
+    @staticmethod
+    def announce(new: list[AchievementDef]) -> str:
+        """新解锁成就的播报文本"""
+        if not new:
+            return ""
+        return "🎉 解锁成就：" + "、".join(f"{d.badge} {d.name}" for d in new) + "\n"
+
+    def _track(self, user_id: str, data: Optional[Dict[str, Any]]):
+        ids = frozenset((data or {}).get(UNLOCKED_KEY, {})) & self._holders.keys()
+        old = self._user_unlocked.get(user_id, frozenset())
+        if ids == old:
+            return
+        for achievement_id in ids - old:
+            self._holders[achievement_id] += 1
+        for achievement_id in old - ids:
+            self._holders[achievement_id] -= 1
+        if ids:
+            self._user_unlocked[user_id] = ids
+        else:
+            self._user_unlocked.pop(user_id, None)
+
+    def on_write(self, file_path: Path, data: Optional[Dict[str, Any]]):
+        """用户数据写入监听器"""
+        if file_path.parent.name == "user_data":
+            if self._rebuilding:
+                self._touched.add(file_path.stem)
+            self._track(file_path.stem, data)
+
+    async def rebuild(self) -> Optional[int]:
+        """读取全部用户数据统计各成就的解锁人数，返回用户数（已在统计中时返回None）"""
+        if self._rebuilding:
+            return None
+        self._rebuilding = True
+        self._touched.clear()
+        try:
+            user_ids = list(self._list_ids())
+            for user_id in user_ids:
+                if user_id in self._touched:
+                    continue
+                try:
+                    data = await self._read(user_id)
+                except Exception as e:
+                    logger.error(f"统计成就时读取用户{user_id}失败: {str(e)}")
+                    continue
+                if user_id not in self._touched:
+                    self._track(user_id, data)
+            self.ready = True
+            return len(user_ids)
+        finally:
+            self._rebuilding = False
+            self._touched.clear()
+
+    def _take_snapshot(self) -> Dict[str, Any]:
+        """读取并删除快照文件（快照只对应一次正常关闭，只能加载一次）"""
+        if not self.snapshot_path.exists():
+            return {}
+        snapshot = self._loader(self.snapshot_path)
+        self.snapshot_path.unlink(missing_ok=True)
+        return snapshot
+
+    async def _restore(self) -> Optional[int]:
+        """从快照恢复各用户已解锁的成就，返回用户数，快照不可用时返回None"""
+        self._rebuilding = True
+        self._touched.clear()
+        try:
+            snapshot = await self._executor.run(
+                self._take_snapshot, priority=PRIORITY_SCAN
+            )
+            unlocked = snapshot.get("unlocked")
+            if not isinstance(unlocked, dict):
+                return None
+            listed = set(self._list_ids())
+            # 用户数不同或快照中有已不存在的用户时快照作废
+            if snapshot.get("users") != len(listed) or not set(unlocked) <= listed:
+                logger.warning("成就快照与用户数据不一致，将全量统计")
+                return None
+            for user_id, ids in unlocked.items():
+                if user_id not in self._touched:
+                    self._track(user_id, {UNLOCKED_KEY: dict.fromkeys(ids)})
+            self.ready = True
+            return len(listed)
+        except Exception as e:
+            logger.error(f"读取成就快照 {self.snapshot_path} 失败: {str(e)}")
+            return None
+        finally:
+            self._rebuilding = False
+            self._touched.clear()
+
+    async def load(self) -> Optional[int]:
+        """启动时统计解锁人数：优先加载快照，不可用时全量统计，返回用户数"""
+        if self._rebuilding:
+            return None
+        users = await self._restore()
+        if users is not None:
+            logger.info(f"成就解锁统计已从快照加载（{users}个用户）")
+            return users
+        return await self.rebuild()
+
+    async def save_snapshot(self) -> bool:
+        """保存各用户已解锁的成就ID（须在用户数据全部落盘后调用）"""
+        if not self.ready or self._rebuilding:
+            return False
+        data = {
+            "users": len(set(self._list_ids())),
+            "unlocked": {
+                user_id: sorted(ids) for user_id, ids in self._user_unlocked.items()
+            },
+        }
+        return await self._executor.run(
+            self._saver,
+            self.snapshot_path,
+            data,
+            priority=PRIORITY_FLUSH,
+            key=self.snapshot_path,
+        )
+
+    def holders(self, achievement_id: str) -> int:
+        """全服解锁该成就的人数"""
+        return self._holders.get(achievement_id, 0)
@@ -0,0 +1,104 @@
+import os
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from astrbot.api import logger
+
+from .weapon_bag import STAR_ID_RANGES, star_of
+from .weapon_catalog import WeaponCatalog
+
+# 武器图片扩展名
+IMAGE_SUFFIX = ".png"
+
+
+class WeaponAssetIndex:
+    """武器图片索引（武器ID -> 图片路径）\n
+    启动时扫描一次resources/weapon_image下各星级目录，并报告缺少图片的武器和没有对应武器的图片。
+    之后按check_interval节流检查各目录mtime及武器数据版本，变化时重新扫描；
+    抽卡时查询索引不做任何文件系统调用。
+    """
+
+    def __init__(
+        self, base_path: Path, weapons: WeaponCatalog, check_interval: float = 2.0
+    ):
+        self.base_path = Path(base_path)
+        self.weapons = weapons
+        self.check_interval = check_interval
+        self._paths: Mapping[str, str] = MappingProxyType({})
+        self._missing: tuple[str, ...] = ()
+        self._orphans: tuple[str, ...] = ()
+        self._signature: Optional[tuple] = None
+        self._next_check = 0.0
+
+    def _dir_mtimes(self) -> tuple:
+        mtimes = []
+        for directory in [self.base_path] + [
+            self.base_path / s for s in STAR_ID_RANGES
+        ]:
+            try:
+                mtimes.append(directory.stat().st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _scan(self) -> dict[tuple[str, str], str]:
+        """扫描各星级目录，返回(星级, 武器名称) -> 图片路径"""
+        files = {}
+        for star in STAR_ID_RANGES:
+            try:
+                with os.scandir(self.base_path / star) as entries:
+                    for entry in entries:
+                        if entry.is_file() and entry.name.endswith(IMAGE_SUFFIX):
+                            name = entry.name[: -len(IMAGE_SUFFIX)]
+                            files[(star, name)] = entry.path
+            except OSError as e:
+                logger.error(f"扫描武器图片目录失败: {str(e)}")
+        return files
+
+    def refresh(self, force: bool = False) -> bool:
+        """目录或武器数据有变化时重建索引，返回是否重建"""
+        self.weapons.all()  # 触发武器数据的更新检查
+        signature = (self._dir_mtimes(), self.weapons.version)
+        if not force and signature == self._signature:
+            return False
+        files = self._scan()
+        paths, missing = {}, []
+        for weapon_id, info in self.weapons.all().items():
+            path = files.pop((star_of(weapon_id), info.get("name", "")), None)
+            if path is None:
+                missing.append(weapon_id)
+            else:
+                paths[weapon_id] = path
+        self._paths = MappingProxyType(paths)
+        self._missing = tuple(missing)
+        self._orphans = tuple(sorted(str(Path(p)) for p in files.values()))
+        self._signature = signature
+        logger.info(f"武器图片索引已建立（{len(paths)}张图片）")
+        if missing:
+            names = "、".join(self.weapons.name_of(i) for i in missing)
+            logger.warning(f"以下武器缺少图片：{names}")
+        if self._orphans:
+            logger.warning(f"以下图片没有对应的武器：{', '.join(self._orphans)}")
+        return True
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if self._signature is None or now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.refresh()
+
+    def path_of(self, weapon_id: int | str) -> Optional[str]:
+        """获取武器图片路径，没有图片时返回None"""
+        self._maybe_refresh()
+        return self._paths.get(str(weapon_id))
+
+    def report(self) -> dict:
+        """索引状态：图片数量、缺少图片的武器ID、没有对应武器的图片"""
+        self._maybe_refresh()
+        return {
+            "images": len(self._paths),
+            "missing": self._missing,
+            "orphans": self._orphans,
+        }
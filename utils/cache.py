@@ -0,0 +1,407 @@
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from astrbot.api import logger
+
+from .io_executor import PRIORITY_FLUSH, PRIORITY_READ, PRIORITY_WRITE, IOExecutor
+from .journal import WriteAheadJournal
+
+
+def clone_json(value: Any) -> Any:
+    """快速深拷贝纯JSON结构（dict/list/标量），比copy.deepcopy少了memo开销"""
+    if isinstance(value, dict):
+        return {k: clone_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [clone_json(v) for v in value]
+    return value
+
+
+class _CacheEntry:
+    __slots__ = ("data", "size", "dirty", "version", "persisted")
+
+    def __init__(self, data: Dict[str, Any], size: int, dirty: bool):
+        self.data = data
+        self.size = size
+        self.dirty = dirty
+        self.version = 0
+        # 已知存储后端中的版本（读取或上次落盘成功的数据，未知为None），供后端增量写入比较
+        # 缓存中的数据对象写入后不再原地修改，直接保存引用即可
+        self.persisted: Optional[Dict[str, Any]] = data if not dirty else None
+
+
+class UserStateCache:
+    """用户状态写回缓存\n
+    缓存user_data/user_backpack下的用户文件，读命中时不访问磁盘，
+    写入仅标记为脏数据，由定时任务或插件卸载时统一落盘。\n
+    按文件序列化体积估算内存占用，超过预算时按LRU淘汰干净条目。
+    """
+
+    def __init__(
+        self,
+        backend,
+        executor: IOExecutor,
+        roots: Iterable[Path] = (),
+        memory_budget: int = 64 * 1024 * 1024,
+        flush_interval: float = 5.0,
+    ):
+        self._backend = backend
+        self._executor = executor
+        self._roots = {Path(root) for root in roots}
+        self._entries: "OrderedDict[Path, _CacheEntry]" = OrderedDict()
+        self._total_size = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._journal: Optional[WriteAheadJournal] = None
+        # 写入监听器：fn(文件路径, 新数据)，删除时新数据为None
+        self._listeners: list[Callable[[Path, Optional[Dict[str, Any]]], None]] = []
+        # 尚未通知监听器的最近一次写入/删除（文件路径 -> 标记），只有最近一次操作负责通知
+        self._pending_notify: Dict[Path, object] = {}
+        self.enabled = True
+        self.memory_budget = memory_budget
+        self.flush_interval = flush_interval
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushed_files = 0
+        self.flush_failures = 0
+
+    @property
+    def backend(self):
+        """当前使用的存储后端"""
+        return self._backend
+
+    def set_backend(self, backend):
+        """切换存储后端（仅在插件初始化时调用，此时缓存中不应有待落盘数据）"""
+        if any(entry.dirty for entry in self._entries.values()):
+            raise RuntimeError("缓存中存在未落盘的数据，无法切换存储后端")
+        self._entries.clear()
+        self._total_size = 0
+        old_backend, self._backend = self._backend, backend
+        if old_backend is not backend:
+            old_backend.close()
+
+    @property
+    def journal(self) -> Optional[WriteAheadJournal]:
+        """当前使用的预写日志（未启用时为None）"""
+        return self._journal
+
+    def attach_journal(self, journal: WriteAheadJournal):
+        """启用预写日志模式：写入先追加到日志并组提交，定时落盘改为日志压缩"""
+        journal.open()
+        self._journal = journal
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        memory_budget: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ):
+        """根据插件配置调整缓存参数"""
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if memory_budget is not None and memory_budget > 0:
+            self.memory_budget = int(memory_budget)
+        if flush_interval is not None and flush_interval > 0:
+            self.flush_interval = float(flush_interval)
+
+    def add_listener(self, listener: Callable[[Path, Optional[Dict[str, Any]]], None]):
+        """注册写入监听器（用于维护排行榜等派生索引），监听器须为轻量的同步函数\n
+        写入被接受（进入缓存，或未启用缓存时存储后端保存成功）后才通知，删除在后端删除成功后通知"""
+        self._listeners.append(listener)
+
+    def _claim_notify(self, file_path: Path) -> object:
+        """登记一次待通知的写入/删除，返回其标记"""
+        token = object()
+        self._pending_notify[file_path] = token
+        return token
+
+    def _notify_if_latest(
+        self, file_path: Path, token: object, data: Optional[Dict[str, Any]]
+    ):
+        """该操作仍是此文件最近一次写入/删除时通知监听器，否则由后来的操作负责通知"""
+        if self._pending_notify.get(file_path) is token:
+            del self._pending_notify[file_path]
+            self._notify(file_path, data)
+
+    def _notify(self, file_path: Path, data: Optional[Dict[str, Any]]):
+        for listener in self._listeners:
+            try:
+                listener(file_path, data)
+            except Exception as e:
+                logger.error(f"用户数据写入监听器执行失败: {str(e)}")
+
+    def manages(self, file_path: Path) -> bool:
+        """判断文件是否属于用户数据（由缓存和存储后端接管）"""
+        return file_path.parent in self._roots
+
+    async def read(
+        self, file_path: Path, priority: int = PRIORITY_READ
+    ) -> Dict[str, Any]:
+        """读取用户文件，返回数据副本（后台全量扫描使用PRIORITY_SCAN）"""
+        if not self.enabled:
+            data, _ = await self._executor.run(
+                self._backend.load, file_path, priority=priority
+            )
+            return data
+
+        entry = self._entries.get(file_path)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(file_path)
+            return clone_json(entry.data)
+
+        self.misses += 1
+        data, size = await self._executor.run(
+            self._backend.load, file_path, priority=priority
+        )
+        # 加载期间可能已有新的写入，以缓存中的数据为准
+        entry = self._entries.get(file_path)
+        if entry is None:
+            if not data:
+                # 读取失败或空文件不进入缓存，避免把异常结果固化
+                return data
+            entry = self._insert(file_path, data, size, dirty=False)
+        return clone_json(entry.data)
+
+    async def write(self, file_path: Path, data: Dict[str, Any]) -> bool:
+        """写入用户文件，仅更新缓存并标记为脏数据"""
+        return await self.write_many([(file_path, data)])
+
+    async def write_many(self, items: Iterable[tuple[Path, Dict[str, Any]]]) -> bool:
+        """写入若干用户文件，启用预写日志时这些修改在同一次组提交中持久化"""
+        items = list(items)
+        if not self.enabled:
+            all_ok = True
+            for file_path, data in items:
+                token = self._claim_notify(file_path)
+                ok, _ = await self._executor.run(
+                    self._backend.save,
+                    file_path,
+                    data,
+                    priority=PRIORITY_WRITE,
+                    key=file_path,
+                )
+                if ok:
+                    self._notify_if_latest(file_path, token, data)
+                elif self._pending_notify.get(file_path) is token:
+                    del self._pending_notify[file_path]
+                all_ok = all_ok and ok
+            return all_ok
+
+        # 缓存未命中的文件在线程池中判断是否已存在（新用户需立即落盘）
+        unknown = [path for path, _ in items if path not in self._entries]
+        existing = {
+            path
+            for path in unknown
+            if await self._executor.run(
+                self._backend.exists, path, priority=PRIORITY_WRITE
+            )
+        }
+
+        journaled: list[tuple[Path, Dict[str, Any]]] = []
+        new_paths: list[Path] = []
+        accepted: list[tuple[Path, Dict[str, Any], object]] = []
+        for file_path, data in items:
+            snapshot = clone_json(data)
+            entry = self._entries.get(file_path)
+            if entry is not None:
+                entry.data = snapshot
+                entry.dirty = True
+                entry.version += 1
+                self._entries.move_to_end(file_path)
+                journaled.append((file_path, snapshot))
+            else:
+                if file_path in existing:
+                    journaled.append((file_path, snapshot))
+                else:
+                    # 新用户立即落盘，保证存在性判断和用户列表仍然准确
+                    new_paths.append(file_path)
+                self._insert(file_path, snapshot, 0, dirty=True)
+            accepted.append((file_path, snapshot, self._claim_notify(file_path)))
+
+        all_ok = True
+        if journaled and self._journal is not None:
+            all_ok = await self._journal.append_many(journaled)
+        if new_paths:
+            all_ok = await self._flush_paths(new_paths) and all_ok
+        # 数据已进入缓存（后续读取即返回新数据）且日志提交/新用户落盘完成后再通知监听器
+        for file_path, snapshot, token in accepted:
+            self._notify_if_latest(file_path, token, snapshot)
+        return all_ok
+
+    async def exists(self, file_path: Path) -> bool:
+        """判断用户数据是否存在（优先查询缓存，未命中时在线程池中查询存储后端）"""
+        if file_path in self._entries:
+            return True
+        return await self._executor.run(
+            self._backend.exists, file_path, priority=PRIORITY_READ
+        )
+
+    def list_ids(self, directory: Path) -> list[str]:
+        """列出某类用户数据的全部用户ID"""
+        return self._backend.list_ids(directory)
+
+    def invalidate(self, file_path: Path):
+        """丢弃某个文件的缓存（文件被外部删除或修改时调用）"""
+        entry = self._entries.pop(file_path, None)
+        if entry is not None:
+            self._total_size -= entry.size
+
+    async def delete(self, file_path: Path) -> bool:
+        """删除用户数据（缓存与存储后端），后端删除成功后才通知监听器"""
+        self.invalidate(file_path)
+        token = self._claim_notify(file_path)
+        deleted = await self._executor.run(
+            self._backend.delete, file_path, priority=PRIORITY_WRITE, key=file_path
+        )
+        if deleted:
+            self._notify_if_latest(file_path, token, None)
+        elif self._pending_notify.get(file_path) is token:
+            del self._pending_notify[file_path]
+        return deleted
+
+    def _insert(
+        self, file_path: Path, data: Dict[str, Any], size: int, dirty: bool
+    ) -> _CacheEntry:
+        entry = _CacheEntry(data, size, dirty)
+        self._entries[file_path] = entry
+        self._total_size += size
+        self._evict_if_needed()
+        return entry
+
+    def _evict_if_needed(self):
+        """超出内存预算时淘汰最久未使用的干净条目"""
+        if self._total_size <= self.memory_budget:
+            return
+        for file_path in list(self._entries.keys()):
+            if self._total_size <= self.memory_budget:
+                return
+            entry = self._entries[file_path]
+            if entry.dirty:
+                continue
+            del self._entries[file_path]
+            self._total_size -= entry.size
+            self.evictions += 1
+        # 剩余均为脏数据，尽快落盘以便后续淘汰
+        if self._total_size > self.memory_budget and not self._flush_lock.locked():
+            asyncio.get_running_loop().create_task(self.flush())
+
+    async def _flush_paths(
+        self, paths: Iterable[Path], priority: int = PRIORITY_WRITE
+    ) -> bool:
+        """将指定文件的脏数据写回磁盘"""
+        async with self._flush_lock:
+            return await self._save_paths(paths, priority)
+
+    async def _save_paths(
+        self, paths: Iterable[Path], priority: int = PRIORITY_WRITE
+    ) -> bool:
+        """写回脏数据（调用方需持有_flush_lock）"""
+        all_ok = True
+        for file_path in paths:
+            entry = self._entries.get(file_path)
+            if entry is None or not entry.dirty:
+                continue
+            data, version = entry.data, entry.version
+            entry.dirty = False
+            try:
+                ok, size = await self._executor.run(
+                    self._backend.save,
+                    file_path,
+                    data,
+                    entry.persisted,
+                    priority=priority,
+                    key=file_path,
+                )
+            except Exception as e:
+                logger.error(f"用户数据 {file_path} 落盘失败: {str(e)}")
+                ok, size = False, 0
+            if not ok:
+                all_ok = False
+                self.flush_failures += 1
+                # 写入失败且期间没有新写入，恢复脏标记等待下次重试
+                if self._entries.get(file_path) is entry and entry.version == version:
+                    entry.dirty = True
+                continue
+            self.flushed_files += 1
+            entry.persisted = data
+            if self._entries.get(file_path) is entry:
+                self._total_size += size - entry.size
+                entry.size = size
+        return all_ok
+
+    async def flush(self) -> bool:
+        """将全部脏数据写回磁盘"""
+        if self._journal is not None:
+            return await self._compact()
+        dirty_paths = [path for path, entry in self._entries.items() if entry.dirty]
+        if not dirty_paths:
+            return True
+        ok = await self._flush_paths(dirty_paths, PRIORITY_FLUSH)
+        self._evict_if_needed()
+        return ok
+
+    async def _compact(self) -> bool:
+        """压缩预写日志：切换日志段后把脏数据写回快照，全部成功才删除旧日志段"""
+        async with self._flush_lock:
+            dirty_paths = [path for path, entry in self._entries.items() if entry.dirty]
+            if not dirty_paths and not self._journal.segment_records:
+                return True
+            old_segment = await self._journal.rotate()
+            # 轮转期间可能有新的写入，重新收集脏数据
+            dirty_paths = [path for path, entry in self._entries.items() if entry.dirty]
+            ok = await self._save_paths(dirty_paths, PRIORITY_FLUSH)
+            if ok and old_segment is not None:
+                self._journal.discard_segments(old_segment)
+        self._evict_if_needed()
+        return ok
+
+    async def _run_periodic_flush(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"用户数据定时落盘失败: {str(e)}")
+
+    def start(self):
+        """启动定时落盘任务"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(
+                self._run_periodic_flush()
+            )
+
+    async def close(self) -> bool:
+        """停止定时任务并落盘全部脏数据，返回是否全部落盘成功"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        ok = await self.flush()
+        if self._journal is not None:
+            await self._journal.close()
+        return ok
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "dirty": sum(1 for entry in self._entries.values() if entry.dirty),
+            "size": self._total_size,
+            "budget": self.memory_budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "flushed_files": self.flushed_files,
+            "flush_failures": self.flush_failures,
+            "backend": self._backend.name,
+            "journal": self._journal.stats() if self._journal is not None else None,
+        }
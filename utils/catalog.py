@@ -0,0 +1,76 @@
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Generic, Optional, TypeVar
+
+from astrbot.api import logger
+
+from . import codec
+
+SnapshotT = TypeVar("SnapshotT")
+
+
+def freeze(value: Any) -> Any:
+    """将JSON结构递归转换为只读结构（dict→MappingProxyType，list→tuple）"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class ReloadableCatalog(Generic[SnapshotT]):
+    """基于数据文件的只读目录基类\n
+    首次访问时解析文件并由子类的_build构建快照（含索引），之后按check_interval
+    节流检查文件mtime，变化后整体替换快照；新文件解析失败时继续使用旧版本。
+    """
+
+    # 日志中显示的目录名称
+    label = "数据"
+
+    def __init__(self, file_path: Path, check_interval: float = 2.0):
+        self.file_path = Path(file_path)
+        self.check_interval = check_interval
+        self._snapshot: Optional[SnapshotT] = None
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        # 解析失败的文件版本，文件再次修改前不重试
+        self._failed_mtime: Optional[float] = None
+        self.version = 0
+
+    def _build(self, raw: Any) -> SnapshotT:
+        raise NotImplementedError
+
+    def _describe(self, snapshot: SnapshotT) -> str:
+        return ""
+
+    def _load(self, mtime: float):
+        try:
+            with open(self.file_path, "rb") as f:
+                raw = codec.loads(f.read())
+            snapshot = self._build(raw)
+        except Exception as e:
+            logger.error(f"加载{self.label} {self.file_path} 失败: {str(e)}")
+            self._failed_mtime = mtime
+            if self._snapshot is None:
+                self._snapshot = self._build({})
+                self._mtime = mtime
+            return
+        self._snapshot = snapshot
+        self._mtime = mtime
+        self.version += 1
+        logger.info(f"{self.label}已加载{self._describe(snapshot)}")
+
+    def _current(self) -> SnapshotT:
+        now = time.monotonic()
+        if self._snapshot is None or now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                mtime = self.file_path.stat().st_mtime
+            except OSError:
+                mtime = -1.0
+            if self._snapshot is None or (
+                mtime != self._mtime and mtime != self._failed_mtime
+            ):
+                self._load(mtime)
+        return self._snapshot
@@ -0,0 +1,84 @@
+"""JSON编解码层\n
+安装了orjson或msgspec时自动使用更快的实现，否则回退到标准库json。
+三种实现使用相同的格式：紧凑分隔符、非ASCII字符直接以UTF-8写出（等价于ensure_ascii=False），
+非有限浮点数（NaN/Infinity）一律写为null，因此输出都是合法JSON，解码结果相同。
+输出字节并不保证完全一致：浮点数的写法各实现不同（如1e16，标准库写为1e+16）。
+"""
+
+import json
+import math
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - 可选依赖
+    msgspec = None
+
+
+def _finite(obj: Any) -> Any:
+    """将非有限浮点数替换为None（与orjson/msgspec的输出一致）"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def _std_dumps(obj: Any) -> bytes:
+    try:
+        text = json.dumps(
+            obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+        )
+    except ValueError:
+        # 标准库默认会写出NaN/Infinity（非法JSON，其他实现无法读取），改写为null后重试
+        text = json.dumps(
+            _finite(obj), ensure_ascii=False, separators=(",", ":"), allow_nan=False
+        )
+    return text.encode("utf-8")
+
+
+def _std_loads(data: bytes | str) -> Any:
+    return json.loads(data)
+
+
+def _select_codec() -> tuple[str, Callable[[Any], bytes], Callable[[bytes | str], Any]]:
+    if orjson is not None:
+
+        def _orjson_dumps(obj: Any) -> bytes:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+        return "orjson", _orjson_dumps, orjson.loads
+    if msgspec is not None:
+        encoder = msgspec.json.Encoder()
+        return "msgspec", encoder.encode, msgspec.json.decode
+    return "json", _std_dumps, _std_loads
+
+
+CODEC_NAME, _dumps, _loads = _select_codec()
+
+# 解码失败时可能抛出的异常类型
+DECODE_ERRORS: tuple[type[Exception], ...] = (ValueError,)
+if msgspec is not None:
+    DECODE_ERRORS += (msgspec.DecodeError,)
+
+
+def dumps(obj: Any) -> bytes:
+    """序列化为UTF-8编码的JSON字节串"""
+    return _dumps(obj)
+
+
+def loads(data: bytes | str) -> Any:
+    """反序列化JSON（字节串或字符串）"""
+    return _loads(data)
+
+
+def dumps_str(obj: Any) -> str:
+    """序列化为JSON字符串（用于SQLite等以文本存储的场景）"""
+    return _dumps(obj).decode("utf-8")
@@ -0,0 +1,224 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from astrbot.api import logger
+
+from .io_executor import PRIORITY_FLUSH, IOExecutor
+
+# 冷却条目的键：(冷却类型, 对象ID)，如("duel", 用户ID)、("draw_card", 群号)
+CooldownKey = tuple[str, str]
+
+
+class CooldownService:
+    """统一冷却服务\n
+    所有子系统的冷却都记录在这里：到期时间使用单调时钟，按(冷却类型, 对象ID)存放在一个字典中，
+    并挂在哈希时间轮上——每次访问时推进时间轮，只检查已经转过的槽位，到期条目随之删除，
+    内存占用只与仍在冷却中的条目数有关。\n
+    冷却时长来自配置中的*_cooldown项（去掉后缀即冷却类型），为0表示不冷却。
+    有变化时定时将剩余冷却以墙钟时间保存到快照文件，插件重载后从快照恢复。
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Path,
+        loader: Callable[[Path], Dict[str, Any]],
+        saver: Callable[[Path, Dict[str, Any]], bool],
+        executor: IOExecutor,
+        tick: float = 1.0,
+        slots: int = 512,
+        snapshot_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.snapshot_path = Path(snapshot_path)
+        self._loader = loader
+        self._saver = saver
+        self._executor = executor
+        self.tick = tick
+        self.snapshot_interval = snapshot_interval
+        self._clock = clock
+        self._durations: Dict[str, float] = {}
+        self._deadlines: Dict[CooldownKey, float] = {}
+        self._wheel: list[set[CooldownKey]] = [set() for _ in range(slots)]
+        self._current_tick = int(clock() / tick)
+        self._dirty = False
+        self._snapshot_task: Optional[asyncio.Task] = None
+        # 统计计数
+        self.expired = 0
+        self.snapshots = 0
+
+    def configure(self, durations: Mapping[str, float]):
+        """设置各冷却类型的默认时长（秒）"""
+        for scope, seconds in durations.items():
+            if isinstance(seconds, (int, float)) and not isinstance(seconds, bool):
+                self._durations[scope] = max(float(seconds), 0.0)
+
+    def duration(self, scope: str, default: float = 0) -> float:
+        """获取冷却类型的默认时长"""
+        return self._durations.get(scope, default)
+
+    def _slot_of(self, deadline: float) -> set[CooldownKey]:
+        # 放入到期时间之后的第一个刻度，转到该槽位时条目必然已到期
+        return self._wheel[(int(deadline / self.tick) + 1) % len(self._wheel)]
+
+    def _advance(self, now: float):
+        """推进时间轮，删除已到期的条目"""
+        target = int(now / self.tick)
+        if target <= self._current_tick:
+            return
+        if target - self._current_tick >= len(self._wheel):
+            # 空闲超过一整圈，直接检查全部槽位
+            slots = self._wheel
+        else:
+            slots = [
+                self._wheel[t % len(self._wheel)]
+                for t in range(self._current_tick + 1, target + 1)
+            ]
+        self._current_tick = target
+        for slot in slots:
+            for key in [k for k in slot if self._deadlines.get(k, 0) <= now]:
+                slot.discard(key)
+                if self._deadlines.pop(key, None) is not None:
+                    self.expired += 1
+
+    def remaining(self, scope: str, key: str) -> float:
+        """剩余冷却秒数，0表示不在冷却中"""
+        now = self._clock()
+        self._advance(now)
+        deadline = self._deadlines.get((scope, str(key)))
+        return max(deadline - now, 0.0) if deadline is not None else 0.0
+
+    def set(self, scope: str, key: str, seconds: Optional[float] = None):
+        """开始冷却，未指定时长时使用该冷却类型的配置"""
+        if seconds is None:
+            seconds = self.duration(scope)
+        entry = (scope, str(key))
+        old = self._deadlines.pop(entry, None)
+        if old is not None:
+            self._slot_of(old).discard(entry)
+        if seconds > 0:
+            deadline = self._clock() + seconds
+            self._deadlines[entry] = deadline
+            self._slot_of(deadline).add(entry)
+        self._dirty = self._dirty or old is not None or seconds > 0
+
+    def acquire(self, scope: str, key: str, seconds: Optional[float] = None) -> float:
+        """不在冷却中时立即开始冷却并返回0，否则返回剩余冷却秒数"""
+        remaining = self.remaining(scope, key)
+        if remaining <= 0:
+            self.set(scope, key, seconds)
+        return remaining
+
+    def _matching(
+        self, scope: Optional[str], key: Optional[str], now: float
+    ) -> list[CooldownKey]:
+        """仍在冷却中且符合筛选条件的条目"""
+        self._advance(now)
+        key = None if key is None else str(key)
+        return [
+            entry
+            for entry, deadline in self._deadlines.items()
+            if deadline > now
+            and (scope is None or entry[0] == scope)
+            and (key is None or entry[1] == key)
+        ]
+
+    def active(self, scope: Optional[str] = None, key: Optional[str] = None) -> int:
+        """仍在冷却中的条目数（可按冷却类型和/或对象ID筛选）"""
+        return len(self._matching(scope, key, self._clock()))
+
+    def clear(self, scope: Optional[str] = None, key: Optional[str] = None) -> int:
+        """清除冷却（可按冷却类型和/或对象ID筛选），返回清除的条目数"""
+        entries = self._matching(scope, key, self._clock())
+        for entry in entries:
+            self._slot_of(self._deadlines.pop(entry)).discard(entry)
+        self._dirty = self._dirty or bool(entries)
+        return len(entries)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """将剩余冷却转换为墙钟到期时间：{冷却类型: {对象ID: 到期时间戳}}"""
+        now = self._clock()
+        self._advance(now)
+        offset = time.time() - now
+        data: Dict[str, Dict[str, float]] = {}
+        for (scope, key), deadline in self._deadlines.items():
+            data.setdefault(scope, {})[key] = round(deadline + offset, 3)
+        return {"cooldowns": data}
+
+    def load(self):
+        """从快照文件恢复未到期的冷却（插件初始化时调用）"""
+        try:
+            raw = self._loader(self.snapshot_path)
+            offset = time.time() - self._clock()
+            restored = 0
+            for scope, entries in (raw.get("cooldowns") or {}).items():
+                for key, wall_deadline in (entries or {}).items():
+                    deadline = float(wall_deadline) - offset
+                    if deadline > self._clock():
+                        entry = (str(scope), str(key))
+                        self._deadlines[entry] = deadline
+                        self._slot_of(deadline).add(entry)
+                        restored += 1
+        except Exception as e:
+            logger.error(f"读取冷却快照 {self.snapshot_path} 失败: {str(e)}")
+            return
+        if restored:
+            logger.info(f"已从快照恢复{restored}条冷却记录")
+
+    async def save(self) -> bool:
+        """有变化时写入快照文件"""
+        if not self._dirty:
+            return True
+        self._dirty = False
+        ok = await self._executor.run(
+            self._saver,
+            self.snapshot_path,
+            self.snapshot(),
+            priority=PRIORITY_FLUSH,
+            key=self.snapshot_path,
+        )
+        if ok:
+            self.snapshots += 1
+        else:
+            self._dirty = True
+        return ok
+
+    async def _run_periodic_snapshot(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.save()
+            except Exception as e:
+                logger.error(f"冷却快照保存失败: {str(e)}")
+
+    def start_snapshots(self):
+        """启动定时快照任务"""
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.get_running_loop().create_task(
+                self._run_periodic_snapshot()
+            )
+
+    async def close(self):
+        """停止定时任务并保存快照"""
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self._snapshot_task = None
+        await self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        """冷却统计信息"""
+        self._advance(self._clock())
+        by_scope: Dict[str, int] = {}
+        for scope, _ in self._deadlines:
+            by_scope[scope] = by_scope.get(scope, 0) + 1
+        return {
+            "entries": len(self._deadlines),
+            "by_scope": by_scope,
+            "expired": self.expired,
+            "snapshots": self.snapshots,
+        }
@@ -0,0 +1,60 @@
+import time
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Callable, Optional
+
+# 1970-01-01是星期四，日序号加3后整除7即为以周一为起点的周序号
+_EPOCH_DATE = date(1970, 1, 1)
+_WEEK_OFFSET = 3
+
+
+def week_of(day: int) -> int:
+    """日序号对应的周序号（每周从周一开始）"""
+    return (day + _WEEK_OFFSET) // 7
+
+
+class EpochClock:
+    """按时区把当前时间换算为整数日序号（自1970-01-01起的天数）和周序号\n
+    序号只在跨过当地零点时重新计算一次，其余时候只比较一次时间戳，
+    用于每日/每周数据的过期判断（整数比较，不解析日期字符串）。
+    """
+
+    def __init__(self, tz: tzinfo, clock: Callable[[], float] = time.time):
+        self.tz = tz
+        self._clock = clock
+        self._next_rollover = float("-inf")
+        self._day = 0
+        self._week = 0
+        self._today = ""
+
+    def _refresh(self, now: float):
+        local = datetime.fromtimestamp(now, self.tz)
+        self._day = (local.date() - _EPOCH_DATE).days
+        self._week = week_of(self._day)
+        self._today = local.strftime("%Y-%m-%d")
+        midnight = datetime(local.year, local.month, local.day, tzinfo=self.tz)
+        self._next_rollover = (midnight + timedelta(days=1)).timestamp()
+
+    def epochs(self) -> tuple[int, int]:
+        """当前的(日序号, 周序号)"""
+        now = self._clock()
+        if now >= self._next_rollover:
+            self._refresh(now)
+        return self._day, self._week
+
+    def today(self) -> str:
+        """当前日期字符串（YYYY-MM-DD）"""
+        self.epochs()
+        return self._today
+
+    def seconds_to_rollover(self) -> float:
+        """距下一个当地零点的秒数"""
+        self.epochs()
+        return self._next_rollover - self._clock()
+
+    @staticmethod
+    def day_of(date_str: Optional[str]) -> Optional[int]:
+        """日期字符串（YYYY-MM-DD）对应的日序号，无法解析时返回None"""
+        try:
+            return (datetime.strptime(date_str, "%Y-%m-%d").date() - _EPOCH_DATE).days
+        except (TypeError, ValueError):
+            return None
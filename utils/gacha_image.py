@@ -0,0 +1,182 @@
+import io
+import math
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from astrbot.api import logger
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # pragma: no cover - 可选依赖
+    Image = ImageDraw = ImageFont = None
+
+# 星级背景色及排序（高星在前）
+STAR_COLORS = {
+    "五星武器": (196, 142, 58),
+    "四星武器": (142, 104, 190),
+    "三星武器": (78, 124, 180),
+}
+STAR_ORDER = {"五星武器": 0, "四星武器": 1, "三星武器": 2}
+# 未指定字体时依次尝试的中文字体
+FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/wqy-microhei/wqy-microhei.ttc",
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+    "/System/Library/Fonts/PingFang.ttc",
+)
+BACKGROUND = (32, 34, 44)
+
+# (星级, 武器名称, 武器图片路径)
+DrawItem = tuple[str, str, Optional[str]]
+
+
+class GachaImageRenderer:
+    """抽卡结果合成图渲染器\n
+    武器图片首次使用时解码并缩放为带星级底色和名称的卡片（没有图片时只有底色和名称），之后常驻内存；
+    合成结果按排序后的抽卡结果组合做LRU缓存（同一组合只合成一次），缓存内容为编码好的PNG数据。
+    未安装Pillow时available为False，调用方应回退为逐张发送。
+    """
+
+    def __init__(
+        self,
+        cache_size: int = 64,
+        font_path: str = "",
+        columns: int = 5,
+        tile_size: tuple[int, int] = (96, 308),
+        label_height: int = 28,
+        gap: int = 6,
+    ):
+        self.cache_size = max(0, cache_size)
+        self.font_path = font_path
+        self.columns = columns
+        self.tile_size = tile_size
+        self.label_height = label_height
+        self.gap = gap
+        self._tiles: Dict[DrawItem, "Image.Image"] = {}
+        self._cache: OrderedDict[tuple[DrawItem, ...], bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self._font = None
+        self._font_loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def _load_font(self):
+        if self._font_loaded:
+            return self._font
+        self._font_loaded = True
+        candidates = [self.font_path] if self.font_path else list(FONT_CANDIDATES)
+        for path in candidates:
+            if path and Path(path).exists():
+                try:
+                    self._font = ImageFont.truetype(path, 16)
+                    return self._font
+                except OSError as e:
+                    logger.error(f"加载字体 {path} 失败: {str(e)}")
+        self._font = None
+        logger.warning("未找到可用的中文字体，抽卡结果图片将不绘制武器名称")
+        return None
+
+    def _tile(self, item: DrawItem) -> "Image.Image":
+        """获取武器卡片（首次使用时解码、缩放并绘制底色和名称）"""
+        tile = self._tiles.get(item)
+        if tile is not None:
+            return tile
+        star, name, image_path = item
+        width, height = self.tile_size
+        tile = Image.new("RGBA", (width, height + self.label_height), STAR_COLORS[star])
+        if image_path:
+            try:
+                with Image.open(image_path) as source:
+                    card = source.convert("RGBA")
+                card.thumbnail((width, height), Image.LANCZOS)
+                tile.alpha_composite(
+                    card, ((width - card.width) // 2, (height - card.height) // 2)
+                )
+            except OSError as e:
+                logger.error(f"读取武器图片失败：{image_path} {str(e)}")
+        font = self._load_font()
+        if font is not None:
+            draw = ImageDraw.Draw(tile)
+            left, top, right, bottom = draw.textbbox((0, 0), name, font=font)
+            draw.text(
+                (
+                    (width - (right - left)) // 2 - left,
+                    height + (self.label_height - (bottom - top)) // 2 - top,
+                ),
+                name,
+                font=font,
+                fill=(255, 255, 255),
+            )
+        self._tiles[item] = tile
+        return tile
+
+    def _compose(self, items: Sequence[DrawItem]) -> "Image.Image":
+        width, height = self.tile_size
+        height += self.label_height
+        columns = min(self.columns, len(items))
+        rows = math.ceil(len(items) / columns)
+        canvas = Image.new(
+            "RGB",
+            (
+                columns * width + (columns + 1) * self.gap,
+                rows * height + (rows + 1) * self.gap,
+            ),
+            BACKGROUND,
+        )
+        for index, item in enumerate(items):
+            row, column = divmod(index, columns)
+            tile = self._tile(item)
+            canvas.paste(
+                tile,
+                (
+                    self.gap + column * (width + self.gap),
+                    self.gap + row * (height + self.gap),
+                ),
+                tile,
+            )
+        return canvas
+
+    def render(self, items: Sequence[DrawItem]) -> Optional[bytes]:
+        """合成抽卡结果图片并返回PNG数据，失败或未安装Pillow时返回None（阻塞调用）"""
+        if not self.available or not items:
+            return None
+        key = tuple(sorted(items, key=lambda item: (STAR_ORDER[item[0]], item[1])))
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+            try:
+                buffer = io.BytesIO()
+                self._compose(key).save(buffer, format="PNG")
+                data = buffer.getvalue()
+            except Exception as e:
+                logger.error(f"合成抽卡结果图片失败: {str(e)}")
+                return None
+            if self.cache_size:
+                self._cache[key] = data
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return data
+
+    def stats(self) -> dict:
+        """缓存统计"""
+        return {
+            "tiles": len(self._tiles),
+            "cached": len(self._cache),
+            "cache_size": self.cache_size,
+            "cache_bytes": sum(len(data) for data in self._cache.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
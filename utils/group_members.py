@@ -0,0 +1,196 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+
+from astrbot.api import logger
+
+# 可以禁言他人的群身份
+BAN_ROLES = {"owner", "admin"}
+
+
+class MemberInfo:
+    __slots__ = ("card", "nickname", "role", "fetched_at")
+
+    def __init__(self, card: str, nickname: str, role: str, fetched_at: float):
+        # role为owner/admin/member，接口未返回时为空字符串
+        self.card = card
+        self.nickname = nickname
+        self.role = role
+        self.fetched_at = fetched_at
+
+    @property
+    def display_name(self) -> str:
+        """群昵称，未设置时为QQ名"""
+        return self.card or self.nickname
+
+
+class GroupMemberCache:
+    """群成员信息缓存\n
+    缓存群成员的群昵称、QQ名和群身份，超过ttl后重新获取。未命中时优先用get_group_member_list
+    一次取回整个群，失败或该成员不在列表中再单独调用get_group_member_info；同一个群（或同一成员）
+    的并发未命中只发起一次请求。收到群消息时用消息自带的发送者信息刷新，
+    收到成员变动通知（入群/退群/改群名片/设置管理员）时更新对应条目。
+    """
+
+    def __init__(self, ttl: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._members: Dict[str, Dict[str, MemberInfo]] = {}
+        # 整群成员列表的获取时间及上次获取失败的时间
+        self._list_loaded_at: Dict[str, float] = {}
+        self._list_failed_at: Dict[str, float] = {}
+        self._inflight: Dict[Any, asyncio.Future] = {}
+        # 统计计数
+        self.hits = 0
+        self.list_fetches = 0
+        self.single_fetches = 0
+
+    def _fresh(self, fetched_at: Optional[float]) -> bool:
+        return fetched_at is not None and self._clock() - fetched_at <= self.ttl
+
+    def _store(self, group_id: str, user_id: str, info: Mapping[str, Any]):
+        self._members.setdefault(group_id, {})[user_id] = MemberInfo(
+            info.get("card") or "",
+            info.get("nickname") or "",
+            info.get("role") or "",
+            self._clock(),
+        )
+
+    async def _coalesce(self, key, factory: Callable[[], Awaitable[Any]]):
+        """同一key的并发请求共用一次调用"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _load_group(self, bot, group_id: str) -> bool:
+        async def fetch():
+            self.list_fetches += 1
+            try:
+                members = await bot.get_group_member_list(group_id=int(group_id))
+            except Exception as e:
+                logger.error(f"获取群{group_id}成员列表失败: {str(e)}")
+                self._list_failed_at[group_id] = self._clock()
+                return False
+            self._members[group_id] = {}
+            for member in members:
+                self._store(group_id, str(member["user_id"]), member)
+            self._list_loaded_at[group_id] = self._clock()
+            return True
+
+        return await self._coalesce(("list", group_id), fetch)
+
+    async def _load_member(self, bot, group_id: str, user_id: str) -> bool:
+        async def fetch():
+            self.single_fetches += 1
+            try:
+                info = await bot.get_group_member_info(
+                    group_id=int(group_id), user_id=int(user_id)
+                )
+            except Exception as e:
+                logger.error(f"获取群{group_id}成员{user_id}信息失败: {str(e)}")
+                return False
+            if not info:
+                return False
+            self._store(group_id, user_id, info)
+            return True
+
+        return await self._coalesce(("member", group_id, user_id), fetch)
+
+    def peek(self, group_id, user_id) -> Optional[MemberInfo]:
+        """只查缓存，不发起请求（过期条目也返回）"""
+        return self._members.get(str(group_id), {}).get(str(user_id))
+
+    async def member(self, bot, group_id, user_id) -> Optional[MemberInfo]:
+        """获取群成员信息，获取失败或不在群内返回None"""
+        group_id, user_id = str(group_id), str(user_id)
+        info = self.peek(group_id, user_id)
+        if info is not None and self._fresh(info.fetched_at):
+            self.hits += 1
+            return info
+        if not self._fresh(self._list_loaded_at.get(group_id)) and not self._fresh(
+            self._list_failed_at.get(group_id)
+        ):
+            await self._load_group(bot, group_id)
+            info = self.peek(group_id, user_id)
+            if info is not None and self._fresh(info.fetched_at):
+                return info
+        await self._load_member(bot, group_id, user_id)
+        return self.peek(group_id, user_id)
+
+    async def member_ids(self, bot, group_id) -> Optional[list[str]]:
+        """群成员ID列表（整群成员列表获取失败时返回None）"""
+        group_id = str(group_id)
+        if not self._fresh(self._list_loaded_at.get(group_id)):
+            if not await self._load_group(bot, group_id):
+                return None
+        return list(self._members.get(group_id, {}))
+
+    async def nickname(self, bot, group_id, user_id) -> str:
+        """群昵称或QQ名，获取失败返回空字符串"""
+        info = await self.member(bot, group_id, user_id)
+        return info.display_name if info is not None else ""
+
+    async def can_ban(self, bot, group_id, self_id, user_id) -> bool:
+        """机器人能否禁言该成员：机器人须为群主/管理员，且对方不是群主（管理员只能由群主禁言）\n
+        无法获取机器人身份时不作判断，返回True"""
+        bot_info = await self.member(bot, group_id, self_id)
+        if bot_info is None or not bot_info.role:
+            return True
+        if bot_info.role not in BAN_ROLES:
+            return False
+        target = await self.member(bot, group_id, user_id)
+        if target is None:
+            return True
+        if target.role == "owner":
+            return False
+        return target.role != "admin" or bot_info.role == "owner"
+
+    def invalidate(self, group_id, user_id=None):
+        """使整个群（或单个成员）的缓存失效"""
+        group_id = str(group_id)
+        if user_id is None:
+            self._members.pop(group_id, None)
+        else:
+            self._members.get(group_id, {}).pop(str(user_id), None)
+        self._list_loaded_at.pop(group_id, None)
+        self._list_failed_at.pop(group_id, None)
+
+    def observe(self, raw: Mapping[str, Any]):
+        """处理OneBot原始事件：群消息刷新发送者信息，成员变动通知更新对应条目"""
+        group_id = raw.get("group_id")
+        user_id = raw.get("user_id")
+        if not group_id or not user_id:
+            return
+        group_id, user_id = str(group_id), str(user_id)
+        if raw.get("post_type") == "message":
+            sender = raw.get("sender")
+            if isinstance(sender, Mapping) and sender.get("role"):
+                self._store(group_id, user_id, sender)
+            return
+        if raw.get("post_type") != "notice":
+            return
+        notice_type = raw.get("notice_type")
+        if notice_type in ("group_increase", "group_decrease"):
+            # 成员增减后整群列表不再准确
+            self._members.get(group_id, {}).pop(user_id, None)
+            self._list_loaded_at.pop(group_id, None)
+        elif notice_type == "group_card":
+            info = self.peek(group_id, user_id)
+            if info is not None:
+                info.card = raw.get("card_new") or ""
+        elif notice_type == "group_admin":
+            info = self.peek(group_id, user_id)
+            if info is not None:
+                info.role = "admin" if raw.get("sub_type") == "set" else "member"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "groups": len(self._members),
+            "members": sum(len(members) for members in self._members.values()),
+            "hits": self.hits,
+            "list_fetches": self.list_fetches,
+            "single_fetches": self.single_fetches,
+        }
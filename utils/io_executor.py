@@ -0,0 +1,200 @@
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from astrbot.api import logger
+
+# 任务优先级（数值越小越先执行）
+PRIORITY_READ = 0
+PRIORITY_WRITE = 1
+PRIORITY_FLUSH = 2
+# 排行榜重建等后台全量扫描，排在所有交互任务之后且不计入队列上限
+PRIORITY_SCAN = 3
+PRIORITY_NAMES = {
+    PRIORITY_READ: "读取",
+    PRIORITY_WRITE: "写入",
+    PRIORITY_FLUSH: "后台落盘",
+    PRIORITY_SCAN: "后台扫描",
+}
+# 线程退出信号排在所有任务之后
+_PRIORITY_STOP = 99
+
+
+class IOBusyError(RuntimeError):
+    """I/O队列已满，拒绝新的命令"""
+
+    def __init__(self):
+        super().__init__("存储繁忙，请稍后再试")
+
+
+class _PriorityStats:
+    __slots__ = ("submitted", "completed", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class IOExecutor:
+    """插件专用的有界优先级I/O线程池\n
+    交互读取优先于写入，写入优先于后台落盘，后台扫描最后；同一文件的任务按提交顺序串行执行。
+    已提交的任务始终接受（命令执行中途的读取被拒绝会留下执行到一半的修改），
+    过载时只在命令入口通过admit拒绝新命令，后台扫描不计入队列上限。
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 256):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: "queue.PriorityQueue[tuple[int, int, Any]]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._threads: list[threading.Thread] = []
+        self._stats_lock = threading.Lock()
+        self._stats = {priority: _PriorityStats() for priority in PRIORITY_NAMES}
+        self._queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self._queued_max = 0
+        self.rejected = 0
+        # {key: [锁, 引用计数]}
+        self._key_locks: Dict[Hashable, list] = {}
+
+    def configure(self, workers: Optional[int] = None, max_queue: Optional[int] = None):
+        """根据插件配置调整线程数和队列上限"""
+        if workers is not None and workers > 0:
+            self.workers = int(workers)
+        if max_queue is not None and max_queue > 0:
+            self.max_queue = int(max_queue)
+        if self._threads:
+            self._resize()
+
+    def _resize(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"akasha-io-{len(self._threads)}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        for _ in range(len(self._threads) - self.workers):
+            self._queue.put((_PRIORITY_STOP, next(self._seq), None))
+            self._threads.pop()
+
+    def _worker(self):
+        while True:
+            priority, _, job = self._queue.get()
+            if job is None:
+                return
+            loop, future, func, args, enqueued_at = job
+            wait = time.monotonic() - enqueued_at
+            with self._stats_lock:
+                self._queued[priority] -= 1
+                stats = self._stats[priority]
+                stats.wait_total += wait
+                stats.wait_max = max(stats.wait_max, wait)
+            try:
+                result, error = func(*args), None
+            except BaseException as e:
+                result, error = None, e
+            with self._stats_lock:
+                stats.completed += 1
+            try:
+                loop.call_soon_threadsafe(self._resolve, future, result, error)
+            except RuntimeError:
+                # 事件循环已关闭（插件卸载中）
+                pass
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Any, error: Optional[BaseException]):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _submit(self, priority: int, func: Callable, args: tuple) -> asyncio.Future:
+        if len(self._threads) < self.workers:
+            self._resize()
+        with self._stats_lock:
+            self._stats[priority].submitted += 1
+            self._queued[priority] += 1
+            self._queued_max = max(self._queued_max, self._interactive_queued())
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job = (loop, future, func, args, time.monotonic())
+        self._queue.put((priority, next(self._seq), job))
+        return future
+
+    def _interactive_queued(self) -> int:
+        """计入上限的排队任务数（不含后台扫描，调用方需持有_stats_lock）"""
+        return sum(
+            count
+            for priority, count in self._queued.items()
+            if priority != PRIORITY_SCAN
+        )
+
+    def admit(self):
+        """命令入口的准入检查：排队任务数达到上限时抛出IOBusyError"""
+        with self._stats_lock:
+            if self._interactive_queued() >= self.max_queue:
+                self.rejected += 1
+                raise IOBusyError()
+
+    async def run(
+        self,
+        func: Callable,
+        *args: Any,
+        priority: int = PRIORITY_READ,
+        key: Optional[Hashable] = None,
+    ) -> Any:
+        """在I/O线程池中执行func(*args)\n
+        指定key（通常为文件路径）时，同一key的任务串行执行"""
+        if key is None:
+            return await self._submit(priority, func, args)
+        entry = self._key_locks.get(key)
+        if entry is None:
+            entry = self._key_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await self._submit(priority, func, args)
+        finally:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._key_locks[key]
+
+    def shutdown(self):
+        """通知全部工作线程在处理完已排队任务后退出"""
+        for _ in self._threads:
+            self._queue.put((_PRIORITY_STOP, next(self._seq), None))
+        self._threads = []
+        logger.info("I/O线程池已关闭")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取队列深度与等待时间统计"""
+        with self._stats_lock:
+            per_priority = {}
+            for priority, name in PRIORITY_NAMES.items():
+                stats = self._stats[priority]
+                started = stats.submitted - self._queued[priority]
+                per_priority[name] = {
+                    "queued": self._queued[priority],
+                    "completed": stats.completed,
+                    "wait_avg_ms": stats.wait_total / started * 1000
+                    if started
+                    else 0.0,
+                    "wait_max_ms": stats.wait_max * 1000,
+                }
+            return {
+                "workers": len(self._threads) or self.workers,
+                "max_queue": self.max_queue,
+                "queued": self._interactive_queued(),
+                "queued_max": self._queued_max,
+                "rejected": self.rejected,
+                "priorities": per_priority,
+            }
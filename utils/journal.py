@@ -0,0 +1,185 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Optional
+
+from astrbot.api import logger
+
+from . import codec
+from .io_executor import PRIORITY_WRITE, IOExecutor
+
+
+class WriteAheadJournal:
+    """用户数据预写日志（组提交）\n
+    每条修改以一行JSON追加到日志段文件，同一提交窗口内的所有修改只做一次fsync。
+    日志按段轮转：压缩时先切换到新段，待缓存中的数据全部写回快照后删除旧段；
+    启动时重放尚未删除的日志段，恢复上次异常退出前已提交的修改。
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        base_dir: Path,
+        executor: IOExecutor,
+        commit_window: float = 0.02,
+    ):
+        self.directory = Path(directory)
+        self._executor = executor
+        self.base_dir = Path(base_dir)
+        self.commit_window = commit_window
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._file: Optional[BinaryIO] = None
+        self._segment = max(self._segment_numbers(), default=0) + 1
+        self._buffer: list[bytes] = []
+        self._waiters: list[asyncio.Future] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._committing = False
+        self._rotate_requested = False
+        # 统计计数
+        self.records = 0
+        self.commits = 0
+        # 当前日志段中的记录数
+        self.segment_records = 0
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"journal.{number:08d}.log"
+
+    def _segment_numbers(self) -> list[int]:
+        numbers = []
+        for path in self.directory.glob("journal.*.log"):
+            try:
+                numbers.append(int(path.stem.split(".")[1]))
+            except (IndexError, ValueError):
+                continue
+        return sorted(numbers)
+
+    def _key_of(self, file_path: Path) -> str:
+        return file_path.relative_to(self.base_dir).as_posix()
+
+    def open(self):
+        """打开当前日志段用于追加"""
+        if self._file is None:
+            self._file = open(self._segment_path(self._segment), "ab")
+
+    def replay(self) -> Dict[Path, Dict[str, Any]]:
+        """读取全部日志段，返回每个文件最后一次提交的数据\n
+        段尾被截断的半行（写入中途进程退出）会被忽略"""
+        latest: Dict[Path, Dict[str, Any]] = {}
+        for number in self._segment_numbers():
+            with open(self._segment_path(number), "rb") as f:
+                for line in f:
+                    try:
+                        record = codec.loads(line)
+                    except codec.DECODE_ERRORS:
+                        logger.warning(f"日志段 {number} 尾部记录不完整，已忽略")
+                        break
+                    latest[self.base_dir / record["path"]] = record["data"]
+        return latest
+
+    def discard_segments(self, upto: Optional[int] = None):
+        """删除编号不大于upto的日志段（默认删除当前段之前的全部段）"""
+        limit = self._segment - 1 if upto is None else upto
+        for number in self._segment_numbers():
+            if number <= limit:
+                self._segment_path(number).unlink(missing_ok=True)
+
+    def quarantine_segments(self) -> list[Path]:
+        """将现有日志段改名隔离（重放失败时调用），之后不再自动重放，保留供人工恢复"""
+        stamp = time.strftime("%Y%m%d%H%M%S")
+        moved = []
+        for number in self._segment_numbers():
+            path = self._segment_path(number)
+            target = path.with_name(f"{path.name}.failed-{stamp}")
+            path.rename(target)
+            moved.append(target)
+        return moved
+
+    async def append_many(self, items: Iterable[tuple[Path, Dict[str, Any]]]) -> bool:
+        """追加若干条修改，等待其所在的组提交完成"""
+        loop = asyncio.get_running_loop()
+        for file_path, data in items:
+            record = {"path": self._key_of(file_path), "data": data}
+            self._buffer.append(codec.dumps(record) + b"\n")
+            self.records += 1
+            self.segment_records += 1
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        if self._timer is None and not self._committing:
+            self._timer = loop.call_later(self.commit_window, self._start_commit)
+        return await waiter
+
+    async def sync(self) -> bool:
+        """立即提交缓冲区中的修改并等待完成"""
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        if not self._committing:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._start_commit()
+        return await waiter
+
+    def _start_commit(self):
+        self._timer = None
+        if self._committing or not self._waiters:
+            return
+        self._committing = True
+        payload, waiters = b"".join(self._buffer), self._waiters
+        self._buffer, self._waiters = [], []
+        rotate, self._rotate_requested = self._rotate_requested, False
+        if rotate:
+            # 此后追加的记录写入新日志段
+            self.segment_records = 0
+        asyncio.get_running_loop().create_task(self._commit(payload, waiters, rotate))
+
+    async def _commit(
+        self, payload: bytes, waiters: list[asyncio.Future], rotate: bool
+    ):
+        try:
+            await self._executor.run(
+                self._write_and_sync, payload, rotate, priority=PRIORITY_WRITE
+            )
+            result = True
+        except Exception as e:
+            logger.error(f"写入预写日志失败: {str(e)}")
+            result = False
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+        self._committing = False
+        # 提交期间又有新的修改到达，它们已经等待过一个窗口，直接提交
+        if self._waiters:
+            self._start_commit()
+
+    def _write_and_sync(self, payload: bytes, rotate: bool = False):
+        self.open()
+        if payload:
+            self._file.write(payload)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.commits += 1
+        if rotate:
+            self._file.close()
+            self._file = None
+            self._segment += 1
+
+    async def rotate(self) -> Optional[int]:
+        """提交缓冲区并切换到新的日志段，返回旧段编号（提交失败返回None）"""
+        self._rotate_requested = True
+        if not await self.sync():
+            return None
+        return self._segment - 1
+
+    async def close(self):
+        await self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": self.records,
+            "commits": self.commits,
+            "segments": len(self._segment_numbers()),
+        }
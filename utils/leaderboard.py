@@ -0,0 +1,314 @@
+import time
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from astrbot.api import logger
+
+from .io_executor import PRIORITY_FLUSH, PRIORITY_SCAN, IOExecutor
+from .weapon_bag import combat_power
+
+
+def _money(data: Dict[str, Any]) -> float:
+    return data.get("home", {}).get("money", 0)
+
+
+def _love(data: Dict[str, Any]) -> float:
+    return data.get("home", {}).get("love", 0)
+
+
+def _combat(data: Dict[str, Any]) -> float:
+    return combat_power(data["weapon"]) if "weapon" in data else 0
+
+
+def _streak(data: Dict[str, Any]) -> float:
+    return data.get("sign_info", {}).get("streak_days", 0)
+
+
+# 排行榜：ID -> (名称, 单位, 数据来源目录名, 取值函数)
+BOARDS = {
+    "money": ("金钱", "金币", "user_data", _money),
+    "love": ("好感度", "", "user_data", _love),
+    "combat": ("战斗力", "", "user_backpack", _combat),
+    "streak": ("连续签到", "天", "user_backpack", _streak),
+}
+# 排行榜快照格式版本（BOARDS或取值函数变化时递增，旧快照作废）
+SNAPSHOT_VERSION = 1
+
+
+class SortedIndex:
+    """按分数降序排列的用户索引（分数相同按用户ID排序）\n
+    有序列表保存(-分数, 用户ID)，更新时二分定位后增删，查询前N名为切片，查询名次为二分查找。
+    """
+
+    __slots__ = ("_keys", "_scores")
+
+    def __init__(self):
+        self._keys: list[tuple[float, str]] = []
+        self._scores: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._scores
+
+    def score(self, user_id: str) -> Optional[float]:
+        return self._scores.get(user_id)
+
+    def scores(self) -> Dict[str, float]:
+        """全部用户的分数：{用户ID: 分数}"""
+        return dict(self._scores)
+
+    def update(self, user_id: str, score: float):
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+        self._scores[user_id] = score
+        insort(self._keys, (-score, user_id))
+
+    def remove(self, user_id: str):
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+
+    def top(self, limit: int) -> list[tuple[str, float]]:
+        """前limit名：[(用户ID, 分数)]"""
+        return [(user_id, -score) for score, user_id in self._keys[:limit]]
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """名次（从1开始），不在榜上返回None"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score, user_id)) + 1
+
+
+class Leaderboards:
+    """排行榜\n
+    每个排行榜维护一个全服有序索引，以及已知成员的群各自的有序索引。
+    用户数据写入时（UserStateCache的写入监听器）增量更新相关索引，不扫描文件。
+    正常关闭时把全服索引保存为快照，启动时加载快照；快照读取后即删除，异常退出后没有快照，
+    快照缺失或与用户数据目录不一致时用rebuild全量重建。群成员列表由调用方提供，超过group_ttl后需要刷新。
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Path,
+        loader: Callable[[Path], Dict[str, Any]],
+        saver: Callable[[Path, Dict[str, Any]], bool],
+        executor: IOExecutor,
+        list_ids: Callable[[str], Iterable[str]],
+        read: Callable[[str, str], Awaitable[Dict[str, Any]]],
+        group_ttl: float = 600.0,
+    ):
+        self.snapshot_path = Path(snapshot_path)
+        self._loader = loader
+        self._saver = saver
+        self._executor = executor
+        self._list_ids = list_ids
+        self._read = read
+        self.group_ttl = group_ttl
+        self._global = {board: SortedIndex() for board in BOARDS}
+        self._groups: Dict[str, Dict[str, SortedIndex]] = {}
+        self._group_loaded_at: Dict[str, float] = {}
+        self._member_groups: Dict[str, set[str]] = {}
+        self.names: Dict[str, str] = {}
+        self.ready = False
+        self._rebuilding = False
+        # 重建期间发生过写入的用户，重建时不再用读到的旧数据覆盖
+        self._touched: set[str] = set()
+
+    def _apply(self, user_id: str, kind: str, data: Optional[Dict[str, Any]]):
+        for board, (_, _, source, getter) in BOARDS.items():
+            if source != kind:
+                continue
+            indexes = [self._global[board]] + [
+                self._groups[group_id][board]
+                for group_id in self._member_groups.get(user_id, ())
+            ]
+            if data is None:
+                for index in indexes:
+                    index.remove(user_id)
+                continue
+            try:
+                score = getter(data)
+            except Exception as e:
+                logger.error(f"计算用户{user_id}的{board}排行数据失败: {str(e)}")
+                continue
+            for index in indexes:
+                index.update(user_id, score)
+        if kind == "user_data" and data:
+            nickname = data.get("user", {}).get("nickname")
+            if nickname:
+                self.names[user_id] = nickname
+
+    def on_write(self, file_path: Path, data: Optional[Dict[str, Any]]):
+        """用户数据写入监听器"""
+        kind = file_path.parent.name
+        if kind not in ("user_data", "user_backpack"):
+            return
+        user_id = file_path.stem
+        if self._rebuilding:
+            self._touched.add(user_id)
+        self._apply(user_id, kind, data)
+
+    async def rebuild(self) -> Optional[int]:
+        """全量重建全部排行榜，返回用户数（已在重建中时返回None）"""
+        if self._rebuilding:
+            return None
+        self._rebuilding = True
+        self._touched.clear()
+        start = time.perf_counter()
+        try:
+            seen: Dict[str, set[str]] = {"user_data": set(), "user_backpack": set()}
+            for kind in seen:
+                for user_id in self._list_ids(kind):
+                    seen[kind].add(user_id)
+                    if user_id in self._touched:
+                        continue
+                    try:
+                        data = await self._read(kind, user_id)
+                    except Exception as e:
+                        logger.error(f"重建排行榜时读取{kind}/{user_id}失败: {str(e)}")
+                        continue
+                    if user_id not in self._touched:
+                        self._apply(user_id, kind, data)
+            # 去掉已不存在的用户
+            for board, (_, _, source, _) in BOARDS.items():
+                stale = [
+                    user_id
+                    for user_id, _ in self._global[board].top(len(self._global[board]))
+                    if user_id not in seen[source] and user_id not in self._touched
+                ]
+                for user_id in stale:
+                    self._apply(user_id, source, None)
+            self.ready = True
+            users = len(seen["user_data"] | seen["user_backpack"])
+            logger.info(
+                f"排行榜已重建（{users}个用户，耗时{time.perf_counter() - start:.2f}秒）"
+            )
+            return users
+        finally:
+            self._rebuilding = False
+            self._touched.clear()
+
+    def _take_snapshot(self) -> Dict[str, Any]:
+        """读取并删除快照文件（快照只对应一次正常关闭，只能加载一次）"""
+        if not self.snapshot_path.exists():
+            return {}
+        snapshot = self._loader(self.snapshot_path)
+        self.snapshot_path.unlink(missing_ok=True)
+        return snapshot
+
+    def _valid_boards(
+        self, snapshot: Dict[str, Any]
+    ) -> Optional[Dict[str, Dict[str, float]]]:
+        """校验快照：版本一致，且各排行榜的用户与对应用户数据目录完全一致"""
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return None
+        boards = snapshot.get("boards") or {}
+        if set(boards) != set(BOARDS):
+            return None
+        listed = {
+            kind: set(self._list_ids(kind)) for kind in ("user_data", "user_backpack")
+        }
+        for board, scores in boards.items():
+            if set(scores) != listed[BOARDS[board][2]]:
+                return None
+        return boards
+
+    async def _restore(self) -> Optional[int]:
+        """从快照恢复全服索引，返回用户数，快照不可用时返回None"""
+        self._rebuilding = True
+        self._touched.clear()
+        try:
+            snapshot = await self._executor.run(
+                self._take_snapshot, priority=PRIORITY_SCAN
+            )
+            boards = self._valid_boards(snapshot)
+            if boards is None:
+                if snapshot:
+                    logger.warning("排行榜快照与用户数据不一致，将全量重建")
+                return None
+            for board, scores in boards.items():
+                for user_id, score in scores.items():
+                    # 加载期间发生过写入的用户以监听器更新的值为准
+                    if user_id not in self._touched:
+                        self._global[board].update(user_id, score)
+            for user_id, nickname in (snapshot.get("names") or {}).items():
+                if user_id not in self._touched:
+                    self.names[user_id] = nickname
+            self.ready = True
+            return len(self._global["money"])
+        except Exception as e:
+            logger.error(f"读取排行榜快照 {self.snapshot_path} 失败: {str(e)}")
+            return None
+        finally:
+            self._rebuilding = False
+            self._touched.clear()
+
+    async def load(self) -> Optional[int]:
+        """启动时建立排行榜：优先加载快照，不可用时全量重建，返回用户数"""
+        if self._rebuilding:
+            return None
+        users = await self._restore()
+        if users is not None:
+            logger.info(f"排行榜已从快照加载（{users}个用户）")
+            return users
+        return await self.rebuild()
+
+    async def save_snapshot(self) -> bool:
+        """保存全服索引快照（须在用户数据全部落盘后调用）"""
+        if not self.ready or self._rebuilding:
+            return False
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "boards": {board: index.scores() for board, index in self._global.items()},
+            "names": dict(self.names),
+        }
+        return await self._executor.run(
+            self._saver,
+            self.snapshot_path,
+            data,
+            priority=PRIORITY_FLUSH,
+            key=self.snapshot_path,
+        )
+
+    def group_stale(self, group_id: str) -> bool:
+        """群成员列表是否需要刷新"""
+        loaded_at = self._group_loaded_at.get(group_id)
+        return loaded_at is None or time.monotonic() - loaded_at > self.group_ttl
+
+    def set_group_members(self, group_id: str, member_ids: Iterable[str]):
+        """设置群成员并由全服索引构建该群的排行榜"""
+        members = {str(member_id) for member_id in member_ids}
+        for user_id in set(self._member_groups) - members:
+            self._member_groups[user_id].discard(group_id)
+        indexes = {board: SortedIndex() for board in BOARDS}
+        for user_id in members:
+            for board, index in indexes.items():
+                score = self._global[board].score(user_id)
+                if score is not None:
+                    index.update(user_id, score)
+            self._member_groups.setdefault(user_id, set()).add(group_id)
+        self._groups[group_id] = indexes
+        self._group_loaded_at[group_id] = time.monotonic()
+
+    def index(
+        self, board: str, group_id: Optional[str] = None
+    ) -> Optional[SortedIndex]:
+        """获取排行榜索引（group_id为None时为全服），群未加载时返回None"""
+        if group_id is None:
+            return self._global[board]
+        indexes = self._groups.get(group_id)
+        return indexes[board] if indexes is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "users": len(self._global["money"]),
+            "groups": len(self._groups),
+        }
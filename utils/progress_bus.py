@@ -0,0 +1,140 @@
+import asyncio
+import contextvars
+from typing import (
+    Any,
+    AsyncContextManager,
+    Awaitable,
+    Callable,
+    Dict,
+    NamedTuple,
+    Optional,
+)
+
+from astrbot.api import logger
+
+# 合并方式：add累加，max取最大值，set取最后一次的值
+PROGRESS_MODES = ("add", "max", "set")
+
+
+class ProgressEvent(NamedTuple):
+    track_key: str
+    value: int
+    mode: str
+
+
+class ProgressBus:
+    """任务进度事件总线\n
+    各子系统只发出(用户ID, 追踪键, 数值, 合并方式)事件，不直接读写任务数据。
+    同一用户在窗口期内的事件按(追踪键, 合并方式)合并，到期后每个用户在一个事务内一次性应用并提交；
+    读取任务数据前调用flush_user先应用该用户待处理的事件，保证读到最新进度。
+    待处理事件在持有该用户事务锁后才取出，因此无论由谁应用，应用时都独占该用户的数据。
+    """
+
+    def __init__(
+        self,
+        transaction: Callable[[str], AsyncContextManager[Any]],
+        window: float = 0.2,
+    ):
+        self._transaction = transaction
+        self.window = window
+        self._applier: Optional[
+            Callable[[str, list[ProgressEvent]], Awaitable[Any]]
+        ] = None
+        self._pending: Dict[str, Dict[tuple[str, str], int]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+        # 统计计数
+        self.emitted = 0
+        self.applied = 0
+        self.commits = 0
+
+    def set_applier(
+        self, applier: Callable[[str, list[ProgressEvent]], Awaitable[Any]]
+    ):
+        """设置应用事件的函数：applier(用户ID, 合并后的事件列表)，在该用户的事务内调用，返回是否写入了数据"""
+        self._applier = applier
+
+    def emit(self, user_id: str, track_key: str, value: int = 1, mode: str = "add"):
+        """发出任务进度事件"""
+        if mode not in PROGRESS_MODES:
+            raise ValueError(f"不支持的合并方式: {mode}")
+        self.emitted += 1
+        events = self._pending.setdefault(str(user_id), {})
+        key = (track_key, mode)
+        if key not in events or mode == "set":
+            events[key] = value
+        elif mode == "add":
+            events[key] += value
+        else:
+            events[key] = max(events[key], value)
+        self._schedule()
+
+    def _schedule(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # 事件常在某个事务内发出，定时任务须在空白上下文中运行，
+        # 否则会继承发出者的事务（随后即提交结束），应用时的写入落入已结束的事务而丢失
+        self._flush_task = contextvars.Context().run(
+            loop.create_task, self._run_periodic_flush()
+        )
+
+    async def _run_periodic_flush(self):
+        while self._pending:
+            await asyncio.sleep(self.window)
+            # 应用过程不随定时任务一起取消，避免已取出的事件丢失
+            self._flushing = asyncio.ensure_future(self.flush())
+            await asyncio.shield(self._flushing)
+
+    async def flush_user(self, user_id: str):
+        """应用该用户待处理的事件"""
+        user_id = str(user_id)
+        if user_id not in self._pending:
+            return
+        try:
+            async with self._transaction(user_id):
+                events = self._pending.pop(user_id, None)
+                if not events or self._applier is None:
+                    return
+                updated = await self._applier(
+                    user_id,
+                    [
+                        ProgressEvent(key, value, mode)
+                        for (key, mode), value in events.items()
+                    ],
+                )
+                self.applied += len(events)
+                if updated:
+                    self.commits += 1
+        except Exception as e:
+            # 应用或提交失败都不能中断其他用户的事件
+            logger.error(f"应用用户{user_id}的任务进度事件失败: {str(e)}")
+
+    async def flush(self):
+        """应用全部待处理的事件"""
+        for user_id in list(self._pending):
+            await self.flush_user(user_id)
+
+    async def close(self):
+        """停止定时任务并应用剩余事件"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        if self._flushing is not None and not self._flushing.done():
+            await self._flushing
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": sum(len(events) for events in self._pending.values()),
+            "emitted": self.emitted,
+            "applied": self.applied,
+            "commits": self.commits,
+        }
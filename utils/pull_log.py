@@ -0,0 +1,129 @@
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from .io_executor import PRIORITY_READ, PRIORITY_WRITE, IOExecutor
+
+# 单条抽卡记录：时间戳(u32)、武器ID(u16)、星级(u8)、本抽前未出五星计数(u8)，共8字节
+RECORD = struct.Struct("<IHBB")
+# 星级名称与记录中星级的对应关系
+STAR_CODES = {"五星武器": 5, "四星武器": 4, "三星武器": 3}
+# 从尾部向前扫描时每次读取的记录数
+SCAN_CHUNK = 4096
+
+
+class PullRecord(NamedTuple):
+    timestamp: int
+    weapon_id: int
+    star: int
+    pity_before: int
+
+
+class PullLog:
+    """抽卡记录\n
+    每个用户一个只追加的二进制文件（pull_log/用户ID.bin），每抽一条定长记录；
+    一次抽卡命令的全部记录一次写入。读取时内存映射文件，按记录序号从尾部定位，
+    只解码需要的部分，不读入整个文件。写入不完整的尾部记录在读取时忽略。
+    """
+
+    def __init__(self, directory: Path, executor: IOExecutor):
+        self.directory = Path(directory)
+        self._executor = executor
+
+    def path_of(self, user_id: str) -> Path:
+        return self.directory / f"{user_id}.bin"
+
+    @staticmethod
+    def pack(records: Iterable[PullRecord]) -> bytes:
+        return b"".join(
+            RECORD.pack(
+                r.timestamp & 0xFFFFFFFF,
+                int(r.weapon_id),
+                r.star,
+                min(r.pity_before, 255),
+            )
+            for r in records
+        )
+
+    def _append_sync(self, file_path: Path, payload: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(file_path, "ab") as f:
+            # 截掉上次写入不完整的尾部，保证记录对齐
+            f.truncate(f.tell() - f.tell() % RECORD.size)
+            f.write(payload)
+
+    async def append(self, user_id: str, records: Iterable[PullRecord]):
+        """追加抽卡记录"""
+        payload = self.pack(records)
+        if not payload:
+            return
+        file_path = self.path_of(user_id)
+        await self._executor.run(
+            self._append_sync,
+            file_path,
+            payload,
+            priority=PRIORITY_WRITE,
+            key=file_path,
+        )
+
+    def _read_sync(self, user_id: str, reader):
+        file_path = self.path_of(user_id)
+        try:
+            with open(file_path, "rb") as f:
+                count = f.seek(0, 2) // RECORD.size
+                if count == 0:
+                    return reader(None, 0)
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return reader(mm, count)
+        except FileNotFoundError:
+            return reader(None, 0)
+
+    @staticmethod
+    def _decode(mm, start: int, stop: int) -> list[PullRecord]:
+        data = mm[start * RECORD.size : stop * RECORD.size]
+        return [PullRecord(*fields) for fields in RECORD.iter_unpack(data)]
+
+    def tail_sync(self, user_id: str, limit: int) -> tuple[list[PullRecord], int]:
+        """最近limit条记录（从新到旧）及记录总数"""
+
+        def reader(mm, count):
+            if not count:
+                return [], 0
+            records = self._decode(mm, max(count - limit, 0), count)
+            return records[::-1], count
+
+        return self._read_sync(user_id, reader)
+
+    def five_star_sync(
+        self, user_id: str, limit: int
+    ) -> tuple[list[tuple[int, PullRecord]], int]:
+        """最近limit次五星记录（从新到旧，附带第几抽）及记录总数"""
+
+        def reader(mm, count):
+            found = []
+            stop = count
+            while stop > 0 and len(found) < limit:
+                start = max(stop - SCAN_CHUNK, 0)
+                records = self._decode(mm, start, stop)
+                for offset in range(len(records) - 1, -1, -1):
+                    if records[offset].star == STAR_CODES["五星武器"]:
+                        found.append((start + offset + 1, records[offset]))
+                        if len(found) >= limit:
+                            break
+                stop = start
+            return found, count
+
+        return self._read_sync(user_id, reader)
+
+    async def tail(self, user_id: str, limit: int):
+        """异步获取最近limit条记录（见tail_sync）"""
+        return await self._executor.run(
+            self.tail_sync, user_id, limit, priority=PRIORITY_READ
+        )
+
+    async def five_star(self, user_id: str, limit: int):
+        """异步获取最近limit次五星记录（见five_star_sync）"""
+        return await self._executor.run(
+            self.five_star_sync, user_id, limit, priority=PRIORITY_READ
+        )
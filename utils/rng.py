@@ -0,0 +1,65 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, MutableSequence, Optional, Sequence
+
+
+def derive_seed(*parts: Any) -> int:
+    """由若干部分（如基础种子、命令序号）稳定地派生64位种子，不受PYTHONHASHSEED影响"""
+    digest = hashlib.sha256(repr(parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+class RandomService:
+    """统一随机数服务\n
+    所有游戏逻辑的随机数都从这里取：默认使用进程内共享的random.Random；
+    在scope(seed)内（按asyncio上下文隔离）改用以该种子初始化的独立随机数生成器，
+    用于按事件固定随机结果、回放命令流和比对重构前后的行为。
+    接口与random模块的常用函数一致，也可直接作为GachaEngine的rng参数。
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self._default = random.Random(seed)
+        self._current: ContextVar[Optional[random.Random]] = ContextVar(
+            "akasha_rng", default=None
+        )
+
+    def current(self) -> random.Random:
+        """当前上下文使用的随机数生成器"""
+        return self._current.get() or self._default
+
+    def seed(self, seed: Optional[int] = None):
+        """重新设置默认随机数生成器的种子"""
+        self._default.seed(seed)
+
+    @contextmanager
+    def scope(self, seed: int) -> Iterator[random.Random]:
+        """在当前上下文中使用独立的随机数生成器"""
+        generator = random.Random(seed)
+        token = self._current.set(generator)
+        try:
+            yield generator
+        finally:
+            self._current.reset(token)
+
+    def random(self) -> float:
+        return self.current().random()
+
+    def uniform(self, a: float, b: float) -> float:
+        return self.current().uniform(a, b)
+
+    def randint(self, a: int, b: int) -> int:
+        return self.current().randint(a, b)
+
+    def choice(self, seq: Sequence[Any]) -> Any:
+        return self.current().choice(seq)
+
+    def choices(self, population: Sequence[Any], weights=None, *, k: int = 1) -> list:
+        return self.current().choices(population, weights, k=k)
+
+    def sample(self, population: Sequence[Any], k: int) -> list:
+        return self.current().sample(population, k)
+
+    def shuffle(self, seq: MutableSequence[Any]):
+        self.current().shuffle(seq)
@@ -0,0 +1,264 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    from . import codec
+except ImportError:
+    # 作为命令行脚本直接运行时
+    import codec
+
+# 用户数据类别（目录名即表名）
+RECORD_TABLES = ("user_data", "user_backpack")
+# 空记录的占位行：空字典也是存在的用户数据，只有delete()才会删除用户
+EMPTY_RECORD_KEY = ""
+
+
+class SQLiteUserStore:
+    """基于SQLite（WAL模式）的用户数据存储后端\n
+    每条用户数据按顶层键拆分为多行存储（如home/task/weapon各占一行），
+    写入时只更新内容发生变化的键，不再整体重写：调用方提供上次落盘的版本时与其逐键比较，
+    只序列化变化的键；否则读取库中现有的行逐键比较。\n
+    接口与JsonFileBackend一致，仍以user_data/<id>.json形式的路径定位数据。
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 已知用户各行的序列化体积（与库中的行一一对应），用于增量写入时计算总体积
+        self._row_sizes: Dict[tuple[str, str], Dict[str, int]] = {}
+        # 自动提交模式，事务由各方法显式控制
+        self._conn = sqlite3.connect(
+            str(self.db_path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for table in RECORD_TABLES:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "user_id TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "value TEXT NOT NULL, "
+                "UNIQUE(user_id, key))"
+            )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+
+    @staticmethod
+    def _record_key(file_path: Path) -> tuple[str, str]:
+        """将user_data/<id>.json形式的路径转换为(表名, 用户ID)"""
+        table = file_path.parent.name
+        if table not in RECORD_TABLES:
+            raise ValueError(f"不支持的用户数据路径: {file_path}")
+        return table, file_path.stem
+
+    def load(self, file_path: Path) -> tuple[Dict[str, Any], int]:
+        """读取用户数据，返回(数据, 序列化体积)"""
+        table, user_id = self._record_key(file_path)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, value FROM {table} WHERE user_id = ? ORDER BY rowid",
+                (user_id,),
+            ).fetchall()
+            self._row_sizes[(table, user_id)] = {key: len(value) for key, value in rows}
+        data = {
+            key: codec.loads(value) for key, value in rows if key != EMPTY_RECORD_KEY
+        }
+        return data, sum(len(value) for _, value in rows)
+
+    def save(
+        self,
+        file_path: Path,
+        data: Dict[str, Any],
+        previous: Optional[Dict[str, Any]] = None,
+    ) -> tuple[bool, int]:
+        """写入用户数据，仅更新发生变化的顶层键，返回(是否成功, 序列化体积)\n
+        previous为该用户上次读取/写入成功的数据（调用方保证未被修改），
+        提供时按值比较各键（1与1.0、True与1视为未变化），只序列化变化的键"""
+        table, user_id = self._record_key(file_path)
+        with self._lock:
+            sizes = self._row_sizes.get((table, user_id))
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if previous is None or sizes is None:
+                    sizes, changed, removed = self._diff_rows(table, user_id, data)
+                else:
+                    changed = {
+                        key: codec.dumps_str(value)
+                        for key, value in data.items()
+                        if key not in previous or previous[key] != value
+                    }
+                    removed = [key for key in sizes if key not in data]
+                if not data:
+                    removed = [key for key in removed if key != EMPTY_RECORD_KEY]
+                    if EMPTY_RECORD_KEY not in sizes:
+                        changed[EMPTY_RECORD_KEY] = "{}"
+                if changed:
+                    self._conn.executemany(
+                        f"INSERT INTO {table} (user_id, key, value) VALUES (?, ?, ?) "
+                        "ON CONFLICT(user_id, key) DO UPDATE SET value = excluded.value",
+                        [(user_id, key, value) for key, value in changed.items()],
+                    )
+                if removed:
+                    self._conn.executemany(
+                        f"DELETE FROM {table} WHERE user_id = ? AND key = ?",
+                        [(user_id, key) for key in removed],
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            sizes = {key: size for key, size in sizes.items() if key not in removed}
+            sizes.update((key, len(value)) for key, value in changed.items())
+            self._row_sizes[(table, user_id)] = sizes
+        return True, sum(sizes.values())
+
+    def _diff_rows(
+        self, table: str, user_id: str, data: Dict[str, Any]
+    ) -> tuple[Dict[str, int], Dict[str, str], list[str]]:
+        """读取库中现有的行逐键比较（调用方需持有锁），返回(现有各行体积, 变化的键, 删除的键)"""
+        existing = dict(
+            self._conn.execute(
+                f"SELECT key, value FROM {table} WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        )
+        encoded = {key: codec.dumps_str(value) for key, value in data.items()}
+        changed = {
+            key: value for key, value in encoded.items() if existing.get(key) != value
+        }
+        removed = [key for key in existing if key not in encoded]
+        return {key: len(value) for key, value in existing.items()}, changed, removed
+
+    def exists(self, file_path: Path) -> bool:
+        table, user_id = self._record_key(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM {table} WHERE user_id = ? LIMIT 1", (user_id,)
+            ).fetchone()
+        return row is not None
+
+    def delete(self, file_path: Path) -> bool:
+        table, user_id = self._record_key(file_path)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {table} WHERE user_id = ?", (user_id,)
+            )
+            self._row_sizes.pop((table, user_id), None)
+        return cursor.rowcount > 0
+
+    def list_ids(self, directory: Path) -> list[str]:
+        table = directory.name
+        if table not in RECORD_TABLES:
+            raise ValueError(f"不支持的用户数据目录: {directory}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT user_id FROM {table} ORDER BY user_id"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def import_records(self, table: str, records: Iterable[tuple[str, Dict[str, Any]]]):
+        """批量导入用户数据（整条覆盖），在一个事务内完成"""
+        if table not in RECORD_TABLES:
+            raise ValueError(f"不支持的用户数据类别: {table}")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for user_id, data in records:
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE user_id = ?", (user_id,)
+                    )
+                    rows = [
+                        (user_id, key, codec.dumps_str(value))
+                        for key, value in data.items()
+                    ] or [(user_id, EMPTY_RECORD_KEY, "{}")]
+                    self._conn.executemany(
+                        f"INSERT INTO {table} (user_id, key, value) VALUES (?, ?, ?)",
+                        rows,
+                    )
+                    self._row_sizes.pop((table, user_id), None)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json_tree(
+    data_dir: Path, store: SQLiteUserStore, batch_size: int = 500
+) -> Dict[str, Any]:
+    """将user_data/user_backpack目录下的JSON文件流式导入SQLite\n
+    逐个目录项读取、按批提交，内存占用与用户总数无关；可重复执行（整条覆盖）。
+    """
+    result: Dict[str, Any] = {"failed": []}
+    for table in RECORD_TABLES:
+        directory = Path(data_dir) / table
+        imported = 0
+        batch: list[tuple[str, Dict[str, Any]]] = []
+        if directory.is_dir():
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".json") or not entry.is_file():
+                        continue
+                    try:
+                        with open(entry.path, "rb") as f:
+                            data = codec.loads(f.read())
+                    except (OSError, *codec.DECODE_ERRORS):
+                        result["failed"].append(entry.path)
+                        continue
+                    batch.append((entry.name[: -len(".json")], data))
+                    if len(batch) >= batch_size:
+                        store.import_records(table, batch)
+                        imported += len(batch)
+                        batch.clear()
+        if batch:
+            store.import_records(table, batch)
+            imported += len(batch)
+        result[table] = imported
+    store.set_meta("json_migrated_at", str(time.time()))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="将虚空插件的JSON用户数据迁移到SQLite数据库"
+    )
+    parser.add_argument("data_dir", type=Path, help="插件数据目录（含user_data）")
+    parser.add_argument(
+        "--db", type=Path, default=None, help="数据库路径，默认<data_dir>/akasha.db"
+    )
+    args = parser.parse_args()
+    db_store = SQLiteUserStore(args.db or args.data_dir / "akasha.db")
+    summary = migrate_json_tree(args.data_dir, db_store)
+    db_store.close()
+    print(
+        f"迁移完成：用户数据{summary['user_data']}条，背包数据{summary['user_backpack']}条，"
+        f"失败{len(summary['failed'])}个"
+    )
+    for failed_path in summary["failed"]:
+        print(f"  读取失败: {failed_path}")
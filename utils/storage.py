@@ -0,0 +1,56 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+
+class JsonFileBackend:
+    """按用户分文件的JSON存储后端（默认）\n
+    每个用户在user_data/user_backpack目录下各有一个<user_id>.json文件。
+    """
+
+    name = "json"
+
+    def __init__(
+        self,
+        loader: Callable[[Path], Dict[str, Any]],
+        saver: Callable[[Path, Dict[str, Any]], bool],
+    ):
+        self._loader = loader
+        self._saver = saver
+
+    def load(self, file_path: Path) -> tuple[Dict[str, Any], int]:
+        """读取用户数据，返回(数据, 序列化体积)"""
+        data = self._loader(file_path)
+        try:
+            size = file_path.stat().st_size
+        except OSError:
+            size = 0
+        return data, size
+
+    def save(
+        self,
+        file_path: Path,
+        data: Dict[str, Any],
+        previous: Optional[Dict[str, Any]] = None,
+    ) -> tuple[bool, int]:
+        """写入用户数据，返回(是否成功, 序列化体积)（整个文件重写，不使用previous）"""
+        ok = self._saver(file_path, data)
+        try:
+            size = file_path.stat().st_size if ok else 0
+        except OSError:
+            size = 0
+        return ok, size
+
+    def exists(self, file_path: Path) -> bool:
+        return file_path.exists()
+
+    def delete(self, file_path: Path) -> bool:
+        if not file_path.exists():
+            return False
+        file_path.unlink()
+        return True
+
+    def list_ids(self, directory: Path) -> list[str]:
+        return [f.stem for f in directory.glob("*.json") if f.is_file()]
+
+    def close(self):
+        pass
@@ -0,0 +1,149 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+# 当前协程上下文中正在进行的事务
+_current_transaction: ContextVar[Optional["UserTransaction"]] = ContextVar(
+    "akasha_user_transaction", default=None
+)
+
+
+class UserTransaction:
+    """单个命令内的用户数据工作单元\n
+    事务期间同一用户的数据只加载一次，所有读取共享同一份对象，
+    写入只记录在事务内，退出时统一提交；事务体抛出异常则全部丢弃。
+    """
+
+    def __init__(
+        self,
+        store: "UserStore",
+        user_ids: frozenset[str],
+        parent: Optional["UserTransaction"],
+    ):
+        self.store = store
+        self.user_ids = user_ids
+        self.parent = parent
+        self._records: Dict[Path, Dict[str, Any]] = {}
+        self._dirty: set[Path] = set()
+        # 事务体退出后置为True，之后不能再读写或作为外层事务
+        self.closed = False
+
+    async def read(self, file_path: Path) -> Dict[str, Any]:
+        """读取用户数据（事务内共享同一对象）"""
+        if file_path not in self._records:
+            self._records[file_path] = await self.store._loader(file_path)
+        return self._records[file_path]
+
+    def write(self, file_path: Path, data: Dict[str, Any]) -> bool:
+        """记录写入，提交时统一落地"""
+        self._records[file_path] = data
+        self._dirty.add(file_path)
+        return True
+
+    def exists(self, file_path: Path) -> Optional[bool]:
+        """事务内已知该数据时返回是否存在，未知返回None"""
+        if file_path in self._records:
+            return bool(self._records[file_path])
+        return None
+
+    async def commit(self) -> bool:
+        """提交事务内的全部修改"""
+        items = [(path, self._records[path]) for path in sorted(self._dirty)]
+        self._dirty.clear()
+        if not items:
+            return True
+        # 一次性交给存储层，启用预写日志时整个事务只需一次组提交
+        return await self.store._saver(items)
+
+
+class UserStore:
+    """用户数据事务管理器\n
+    用法：async with user_store.transaction(user_id, other_id): ...\n
+    每个用户一把asyncio锁，多人操作时按用户ID排序加锁，避免死锁；
+    嵌套事务直接复用外层事务，只在最外层提交。嵌套事务不能加入外层未声明的用户
+    （嵌套加锁无法与其他事务统一排序，可能死锁），涉及的全部用户须由最外层事务一次声明。\n
+    提交失败（存储层未能保存）时退出事务会抛出RuntimeError，由调用方按失败处理。
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Path], Awaitable[Dict[str, Any]]],
+        saver: Callable[[list[tuple[Path, Dict[str, Any]]]], Awaitable[bool]],
+        manages: Callable[[Path], bool],
+    ):
+        self._loader = loader
+        self._saver = saver
+        self._manages = manages
+        # {user_id: [锁, 引用计数]}
+        self._locks: Dict[str, list] = {}
+
+    def owner_of(self, file_path: Path) -> Optional[UserTransaction]:
+        """获取当前上下文中持有该用户数据的事务"""
+        transaction = _current_transaction.get()
+        if transaction is None or not self._manages(file_path):
+            return None
+        user_id = file_path.stem
+        while transaction is not None:
+            if user_id in transaction.user_ids:
+                if transaction.closed:
+                    raise RuntimeError(f"用户{user_id}所在的事务已结束")
+                return transaction
+            transaction = transaction.parent
+        return None
+
+    def _lock_for(self, user_id: str) -> asyncio.Lock:
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _release_lock_ref(self, user_id: str):
+        entry = self._locks.get(user_id)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._locks[user_id]
+
+    @asynccontextmanager
+    async def transaction(self, *user_ids: str) -> AsyncIterator[UserTransaction]:
+        """开启涉及若干用户的事务"""
+        parent = _current_transaction.get()
+        if parent is not None and parent.closed:
+            # 在事务内创建的后台任务会继承该事务，须在空白上下文中创建
+            raise RuntimeError("外层事务已结束，不能在其中开启嵌套事务")
+        held: set[str] = set()
+        ancestor = parent
+        while ancestor is not None:
+            held |= ancestor.user_ids
+            ancestor = ancestor.parent
+        own_ids = sorted({str(uid) for uid in user_ids if uid} - held)
+        if parent is not None and own_ids:
+            raise RuntimeError(
+                f"嵌套事务不能加入外层事务未声明的用户: {', '.join(own_ids)}"
+            )
+        transaction = UserTransaction(self, frozenset(own_ids), parent)
+        locks = [self._lock_for(uid) for uid in own_ids]
+        acquired: list[asyncio.Lock] = []
+        try:
+            for lock in locks:
+                await lock.acquire()
+                acquired.append(lock)
+            token = _current_transaction.set(transaction)
+            try:
+                yield transaction
+            finally:
+                _current_transaction.reset(token)
+                transaction.closed = True
+            if not await transaction.commit():
+                raise RuntimeError(
+                    f"用户{', '.join(sorted(transaction.user_ids))}的数据保存失败"
+                )
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+            for uid in own_ids:
+                self._release_lock_ref(uid)
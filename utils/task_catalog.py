@@ -0,0 +1,79 @@
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from .catalog import ReloadableCatalog, freeze
+
+# 任务类别（用户数据中的键）与task.json中对应的键
+TASK_CATEGORIES = {
+    "daily": "daily_tasks",
+    "weekly": "weekly_tasks",
+    "special": "special_tasks",
+}
+
+TaskRef = tuple[str, Mapping[str, Any]]
+
+
+class _TaskSnapshot:
+    """某一版本任务数据的只读视图及索引"""
+
+    __slots__ = ("categories", "by_track_key", "by_name", "by_id", "shop")
+
+    def __init__(self, raw: dict):
+        categories, by_track_key, by_name, by_id = {}, {}, {}, {}
+        for category, data_key in TASK_CATEGORIES.items():
+            tasks = freeze(raw.get(data_key, {}))
+            categories[category] = tasks
+            for task_id, task in tasks.items():
+                ref = (category, task)
+                by_id[task.get("id", task_id)] = ref
+                by_name.setdefault(task["name"], []).append(ref)
+                if task.get("track_key"):
+                    by_track_key.setdefault(task["track_key"], []).append(ref)
+        self.categories = MappingProxyType(categories)
+        self.by_track_key = MappingProxyType(
+            {key: tuple(refs) for key, refs in by_track_key.items()}
+        )
+        self.by_name = MappingProxyType(
+            {name: tuple(refs) for name, refs in by_name.items()}
+        )
+        self.by_id = MappingProxyType(by_id)
+        self.shop = freeze(raw.get("task_shop", {}))
+
+
+class TaskCatalog(ReloadableCatalog[_TaskSnapshot]):
+    """任务数据目录（进程内共享，只读）\n
+    task.json只在首次使用和文件修改后解析一次，并建立索引：
+    track_key → [(类别, 任务)]，任务名 → [(类别, 任务)]（不同类别可能重名），任务ID → (类别, 任务)。
+    """
+
+    label = "任务数据"
+
+    def _build(self, raw: dict) -> _TaskSnapshot:
+        return _TaskSnapshot(raw)
+
+    def _describe(self, snapshot: _TaskSnapshot) -> str:
+        return f"（{len(snapshot.by_id)}个任务）"
+
+    def tasks(self, category: str) -> Mapping[str, Mapping[str, Any]]:
+        """获取某类别（daily/weekly/special）的全部任务定义"""
+        return self._current().categories.get(category, MappingProxyType({}))
+
+    def tasks_for(self, track_key: str) -> tuple[TaskRef, ...]:
+        """获取以track_key追踪进度的全部任务"""
+        return self._current().by_track_key.get(track_key, ())
+
+    def find_by_name(self, name: str) -> tuple[TaskRef, ...]:
+        """按任务名查找任务（按daily/weekly/special顺序）"""
+        return self._current().by_name.get(name, ())
+
+    def get(self, task_id: str) -> Optional[TaskRef]:
+        """按任务ID查找任务"""
+        return self._current().by_id.get(task_id)
+
+    def shop_items(self) -> Mapping[str, Mapping[str, Any]]:
+        """获取任务商店的全部物品"""
+        return self._current().shop
+
+    def shop_item(self, item_name: str) -> Optional[Mapping[str, Any]]:
+        """获取任务商店中的某个物品"""
+        return self._current().shop.get(item_name)
@@ -0,0 +1,268 @@
+import asyncio
+import time
+from bisect import bisect_right, insort
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from astrbot.api import logger
+
+from .io_executor import PRIORITY_FLUSH, IOExecutor
+
+
+class UserEntry:
+    __slots__ = ("user_id", "nickname", "created_at", "last_active", "groups")
+
+    def __init__(
+        self,
+        user_id: str,
+        nickname: str = "",
+        created_at: float = 0.0,
+        last_active: float = 0.0,
+        groups: Iterable[str] = (),
+    ):
+        self.user_id = user_id
+        self.nickname = nickname
+        self.created_at = created_at
+        self.last_active = last_active
+        self.groups = set(groups)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "nickname": self.nickname,
+            "created_at": self.created_at,
+            "last_active": self.last_active,
+            "groups": sorted(self.groups),
+        }
+
+
+class UserRegistry:
+    """用户目录索引\n
+    在内存中维护全部已注册用户的(ID, 昵称, 注册时间, 最后活跃时间, 出现过的群)，
+    按(注册时间, 用户ID)有序排列，用户列表的分页与筛选只查索引，不读取用户数据文件。
+    用户数据写入时（UserStateCache的写入监听器）同步昵称和注册信息，收到消息时记录活跃时间和群；
+    有变化时定时保存到索引文件，启动时加载后只补读索引中缺少的用户。
+    """
+
+    def __init__(
+        self,
+        index_path: Path,
+        loader: Callable[[Path], Dict[str, Any]],
+        saver: Callable[[Path, Dict[str, Any]], bool],
+        executor: IOExecutor,
+        list_ids: Callable[[], Iterable[str]],
+        read: Callable[[str], Awaitable[Dict[str, Any]]],
+        save_interval: float = 60.0,
+    ):
+        self.index_path = Path(index_path)
+        self._loader = loader
+        self._saver = saver
+        self._executor = executor
+        self._list_ids = list_ids
+        self._read = read
+        self.save_interval = save_interval
+        self._entries: Dict[str, UserEntry] = {}
+        self._order: list[tuple[float, str]] = []
+        self._groups: Dict[str, set[str]] = {}
+        self._dirty = False
+        self._save_task: Optional[asyncio.Task] = None
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str) -> Optional[UserEntry]:
+        return self._entries.get(str(user_id))
+
+    def _put(self, entry: UserEntry):
+        old = self._entries.get(entry.user_id)
+        if old is not None:
+            self._discard(old)
+        self._entries[entry.user_id] = entry
+        insort(self._order, (entry.created_at, entry.user_id))
+        for group_id in entry.groups:
+            self._groups.setdefault(group_id, set()).add(entry.user_id)
+        self._dirty = True
+
+    def _discard(self, entry: UserEntry):
+        position = bisect_right(self._order, (entry.created_at, entry.user_id)) - 1
+        if position >= 0 and self._order[position] == (
+            entry.created_at,
+            entry.user_id,
+        ):
+            del self._order[position]
+        for group_id in entry.groups:
+            members = self._groups.get(group_id)
+            if members is not None:
+                members.discard(entry.user_id)
+        del self._entries[entry.user_id]
+
+    def _apply(self, user_id: str, data: Optional[Dict[str, Any]]):
+        entry = self._entries.get(user_id)
+        if data is None:
+            if entry is not None:
+                self._discard(entry)
+                self._dirty = True
+            return
+        info = data.get("user") or {}
+        nickname = info.get("nickname") or ""
+        created_at = float(info.get("created_at") or 0)
+        if entry is None:
+            self._put(UserEntry(user_id, nickname, created_at, created_at))
+        elif entry.created_at != created_at:
+            self._put(
+                UserEntry(
+                    user_id, nickname, created_at, entry.last_active, entry.groups
+                )
+            )
+        elif entry.nickname != nickname:
+            entry.nickname = nickname
+            self._dirty = True
+
+    def on_write(self, file_path: Path, data: Optional[Dict[str, Any]]):
+        """用户数据写入监听器"""
+        if file_path.parent.name == "user_data":
+            self._apply(file_path.stem, data)
+
+    def touch(self, user_id: str, group_id: Optional[str] = None):
+        """记录已注册用户的活跃时间及所在群（未注册用户忽略）"""
+        entry = self._entries.get(str(user_id))
+        if entry is None:
+            return
+        entry.last_active = time.time()
+        if group_id and str(group_id) not in entry.groups:
+            entry.groups.add(str(group_id))
+            self._groups.setdefault(str(group_id), set()).add(entry.user_id)
+        self._dirty = True
+
+    def page(
+        self,
+        after: Optional[str] = None,
+        limit: int = 20,
+        active_since: Optional[float] = None,
+        group_id: Optional[str] = None,
+    ) -> tuple[list[UserEntry], Optional[str]]:
+        """按注册顺序分页：返回after之后符合条件的最多limit个用户及下一页游标（没有下一页为None）"""
+        start = 0
+        cursor = self._entries.get(str(after)) if after else None
+        if cursor is not None:
+            start = bisect_right(self._order, (cursor.created_at, cursor.user_id))
+        members = self._groups.get(str(group_id), set()) if group_id else None
+        found: list[UserEntry] = []
+        for _, user_id in self._order[start:]:
+            if members is not None and user_id not in members:
+                continue
+            entry = self._entries[user_id]
+            if active_since is not None and entry.last_active < active_since:
+                continue
+            if len(found) == limit:
+                return found, found[-1].user_id
+            found.append(entry)
+        return found, None
+
+    def count(
+        self, active_since: Optional[float] = None, group_id: Optional[str] = None
+    ) -> int:
+        """符合条件的用户数"""
+        if group_id:
+            candidates = (
+                self._entries[user_id]
+                for user_id in self._groups.get(str(group_id), ())
+            )
+        elif active_since is None:
+            return len(self._entries)
+        else:
+            candidates = self._entries.values()
+        return sum(
+            1
+            for entry in candidates
+            if active_since is None or entry.last_active >= active_since
+        )
+
+    async def load(self) -> int:
+        """加载索引文件并与用户数据目录核对（补读缺少的用户、删除已不存在的用户），返回用户数"""
+        start = time.perf_counter()
+        try:
+            raw = await self._executor.run(self._loader, self.index_path)
+            for user_id, item in (raw.get("users") or {}).items():
+                if str(user_id) not in self._entries:
+                    self._put(
+                        UserEntry(
+                            str(user_id),
+                            item.get("nickname", ""),
+                            float(item.get("created_at", 0)),
+                            float(item.get("last_active", 0)),
+                            map(str, item.get("groups", ())),
+                        )
+                    )
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"读取用户索引 {self.index_path} 失败: {str(e)}")
+
+        existing = set(self._list_ids())
+        for user_id in set(self._entries) - existing:
+            self._discard(self._entries[user_id])
+            self._dirty = True
+        missing = existing - set(self._entries)
+        for user_id in missing:
+            try:
+                data = await self._read(user_id)
+            except Exception as e:
+                logger.error(f"建立用户索引时读取用户{user_id}失败: {str(e)}")
+                continue
+            # 读取期间可能已由写入监听器加入
+            if user_id not in self._entries:
+                self._apply(user_id, data)
+        self.ready = True
+        logger.info(
+            f"用户索引已加载（{len(self._entries)}个用户，补读{len(missing)}个，"
+            f"耗时{time.perf_counter() - start:.2f}秒）"
+        )
+        await self.save()
+        return len(self._entries)
+
+    async def save(self) -> bool:
+        """有变化时写入索引文件"""
+        if not self._dirty:
+            return True
+        self._dirty = False
+        data = {
+            "users": {
+                user_id: entry.to_dict() for user_id, entry in self._entries.items()
+            }
+        }
+        ok = await self._executor.run(
+            self._saver,
+            self.index_path,
+            data,
+            priority=PRIORITY_FLUSH,
+            key=self.index_path,
+        )
+        if not ok:
+            self._dirty = True
+        return ok
+
+    async def _run_periodic_save(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            try:
+                await self.save()
+            except Exception as e:
+                logger.error(f"用户索引保存失败: {str(e)}")
+
+    def start(self):
+        """启动定时保存任务"""
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.get_running_loop().create_task(
+                self._run_periodic_save()
+            )
+
+    async def close(self):
+        """停止定时任务并保存索引"""
+        if self._save_task is not None:
+            self._save_task.cancel()
+            try:
+                await self._save_task
+            except asyncio.CancelledError:
+                pass
+            self._save_task = None
+        await self.save()
@@ -1,11 +1,12 @@
-import asyncio
-import json
+import functools
+import inspect
 import os
 import sys
 import tempfile
 import time
 from pathlib import Path
 from typing import Any, Dict
+from zoneinfo import ZoneInfo
 
 if sys.platform.startswith("win"):
     import msvcrt
@@ -19,6 +20,33 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from . import codec
+from .cache import UserStateCache
+from .achievements import ACHIEVEMENTS, AchievementEngine
+from .cooldown import CooldownService
+from .epoch import EpochClock
+from .group_members import GroupMemberCache
+from .io_executor import (
+    PRIORITY_FLUSH,
+    PRIORITY_READ,
+    PRIORITY_SCAN,
+    PRIORITY_WRITE,
+    IOBusyError,
+    IOExecutor,
+)
+from .journal import WriteAheadJournal
+from .leaderboard import Leaderboards
+from .progress_bus import ProgressBus
+from .pull_log import PullLog
+from .rng import RandomService
+from .sqlite_store import SQLiteUserStore, migrate_json_tree
+from .storage import JsonFileBackend
+from .store import UserStore
+from .weapon_bag import default_weapon_data, migrate_weapon_data
+from .task_catalog import TaskCatalog
+from .user_registry import UserRegistry
+from .weapon_catalog import WeaponCatalog
+
 # 文件路径
 PLUGIN_DATA_DIR = Path(StarTools.get_data_dir("astrbot_plugin_akasha_terminal"))
 PLUGIN_DIR = Path(__file__).resolve().parent.parent
@@ -103,11 +131,14 @@ def read_json_sync(file_path: Path, encoding_config: str = "utf-8") -> Dict[str,
         return {}
 
     def read_json_atomic() -> Dict[str, Any]:
-        with open(file_path, "r", encoding=encoding_config) as f:
+        with open(file_path, "rb") as f:
             try:
                 # 加共享锁（允许多个读操作同时进行）
                 _lock_file(f.fileno(), exclusive=False)
-                return json.load(f)
+                raw = f.read()
+                if encoding_config.lower().replace("-", "") != "utf8":
+                    raw = raw.decode(encoding_config)
+                return codec.loads(raw)
             finally:
                 # 确保解锁
                 _unlock_file(f.fileno())
@@ -126,14 +157,16 @@ def write_json_sync(
 
     def write_json_atomic() -> None:
         # 生成临时文件
+        payload = codec.dumps(data)
+        if encoding_config.lower().replace("-", "") != "utf8":
+            payload = payload.decode("utf-8").encode(encoding_config)
         with tempfile.NamedTemporaryFile(
-            "w",
+            "wb",
             dir=file_path.parent,
             delete=False,
             suffix=".json",
-            encoding=encoding_config,
         ) as tmp_file:
-            json.dump(data, tmp_file, ensure_ascii=False)
+            tmp_file.write(payload)
             tmp_file.flush()
             os.fsync(tmp_file.fileno())
             temp_name = tmp_file.name
@@ -154,24 +187,217 @@ def write_json_sync(
         return False
 
 
+# 插件专用I/O线程池（文件读写不再占用AstrBot默认线程池）
+io_executor = IOExecutor()
+
+
+# 用户数据写回缓存（进程内共享，接管user_data/user_backpack下的文件）
+user_cache = UserStateCache(
+    backend=JsonFileBackend(read_json_sync, write_json_sync),
+    executor=io_executor,
+    roots=(PLUGIN_DATA_DIR / "user_data", PLUGIN_DATA_DIR / "user_backpack"),
+)
+
+
+# 冷却服务（各子系统共享，定时快照到数据目录，插件重载后恢复）
+cooldowns = CooldownService(
+    PLUGIN_DATA_DIR / "cooldowns.json",
+    loader=read_json_sync,
+    saver=write_json_sync,
+    executor=io_executor,
+)
+
+
+# 日序号/周序号（中国标准时间，每日/周常任务按序号判断是否过期）
+epoch_clock = EpochClock(ZoneInfo("Asia/Shanghai"))
+
+
+# 群成员信息缓存（昵称、群身份，各子系统共享）
+group_members = GroupMemberCache()
+
+
+# 随机数服务（所有游戏逻辑共享，回放/测试时可按命令固定种子）
+rng = RandomService()
+
+
+# 抽卡记录（每个用户一个只追加的二进制文件）
+pull_log = PullLog(PLUGIN_DATA_DIR / "pull_log", io_executor)
+
+
+# 武器数据目录（抽卡与武器库展示共享，文件修改后自动重新加载）
+weapon_catalog = WeaponCatalog(PLUGIN_DIR / "data" / "Weapon.json")
+
+# 任务数据目录（任务进度、领取奖励、任务商店共享，文件修改后自动重新加载）
+task_catalog = TaskCatalog(PLUGIN_DIR / "data" / "task.json")
+
+
+def _list_user_ids(kind: str) -> list[str]:
+    return user_cache.list_ids(PLUGIN_DATA_DIR / kind)
+
+
+async def _read_user_file(kind: str, user_id: str) -> Dict[str, Any]:
+    """后台全量扫描读取用户文件（排在交互任务之后，不计入I/O队列上限）"""
+    return await user_cache.read(
+        PLUGIN_DATA_DIR / kind / f"{user_id}.json", priority=PRIORITY_SCAN
+    )
+
+
+# 排行榜（用户数据写入时增量更新，正常关闭时保存快照，启动时加载快照或全量重建）
+leaderboards = Leaderboards(
+    PLUGIN_DATA_DIR / "leaderboards.json",
+    loader=read_json_sync,
+    saver=write_json_sync,
+    executor=io_executor,
+    list_ids=_list_user_ids,
+    read=_read_user_file,
+)
+user_cache.add_listener(leaderboards.on_write)
+
+
+# 用户目录索引（用户列表分页/筛选，注册和改昵称时随用户数据写入更新）
+user_registry = UserRegistry(
+    PLUGIN_DATA_DIR / "user_index.json",
+    loader=read_json_sync,
+    saver=write_json_sync,
+    executor=io_executor,
+    list_ids=lambda: _list_user_ids("user_data"),
+    read=lambda user_id: _read_user_file("user_data", user_id),
+)
+user_cache.add_listener(user_registry.on_write)
+
+
+# 成就（计数器变化时检查解锁，全服解锁人数随用户数据写入增量维护，正常关闭时保存快照）
+achievements = AchievementEngine(
+    ACHIEVEMENTS,
+    PLUGIN_DATA_DIR / "achievements.json",
+    loader=read_json_sync,
+    saver=write_json_sync,
+    executor=io_executor,
+    list_ids=lambda: _list_user_ids("user_data"),
+    read=lambda user_id: _read_user_file("user_data", user_id),
+)
+user_cache.add_listener(achievements.on_write)
+
+
+# 用户数据事务管理器：async with user_store.transaction(user_id, ...)
+user_store = UserStore(
+    loader=user_cache.read, saver=user_cache.write_many, manages=user_cache.manages
+)
+
+
+# 任务进度事件总线（同一用户的进度事件合并后在一个事务内应用）
+progress_bus = ProgressBus(user_store.transaction)
+
+
+def setup_user_storage(backend_name: str = "json") -> None:
+    """根据配置选择用户数据存储后端（json/sqlite）
+
+    首次切换到sqlite时自动将现有JSON用户数据迁移进数据库"""
+    if backend_name == "sqlite":
+        store = SQLiteUserStore(PLUGIN_DATA_DIR / "akasha.db")
+        if store.get_meta("json_migrated_at") is None:
+            result = migrate_json_tree(PLUGIN_DATA_DIR, store)
+            logger.info(
+                f"用户数据已迁移至SQLite：用户数据{result['user_data']}条，"
+                f"背包数据{result['user_backpack']}条"
+            )
+            for failed_path in result["failed"]:
+                logger.warning(f"迁移时读取失败，已跳过: {failed_path}")
+        user_cache.set_backend(store)
+
+
+def _replay_journal(journal: WriteAheadJournal) -> tuple[list[Path], list[Path]]:
+    """把日志段中的修改写入存储后端（在I/O线程池中执行），返回(重放的文件, 写入失败的文件)"""
+    replayed = journal.replay()
+    failed = []
+    for file_path, data in replayed.items():
+        try:
+            ok = user_cache.backend.save(file_path, data)[0]
+        except Exception as e:
+            logger.error(f"重放预写日志写入 {file_path} 失败: {str(e)}")
+            ok = False
+        if not ok:
+            failed.append(file_path)
+    return list(replayed), failed
+
+
+async def recover_user_storage(
+    journal_enabled: bool = False, journal_commit_window_ms: int = 20
+) -> None:
+    """根据配置决定是否启用预写日志（插件初始化时、使用用户数据之前调用）
+
+    若存在未压缩的日志段（上次异常退出），先在I/O线程池中重放到存储后端再继续；
+    有文件重放失败时将日志段改名隔离，无法读取或隔离日志段时抛出异常（插件不应继续运行）"""
+    journal_dir = PLUGIN_DATA_DIR / "journal"
+    if not journal_enabled and not journal_dir.is_dir():
+        return
+    if journal_enabled and not user_cache.enabled:
+        logger.warning("预写日志依赖用户缓存，缓存未启用，已忽略预写日志配置")
+        journal_enabled = False
+    journal = WriteAheadJournal(
+        journal_dir,
+        PLUGIN_DATA_DIR,
+        io_executor,
+        max(journal_commit_window_ms, 1) / 1000,
+    )
+    replayed, failed = await io_executor.run(
+        _replay_journal, journal, priority=PRIORITY_FLUSH
+    )
+    # 缓存中可能已有重放前读取的旧数据
+    for file_path in replayed:
+        user_cache.invalidate(file_path)
+    if failed:
+        # 未应用的日志段若留在原处，之后的写入直接落到快照，下次启动重放时会用旧数据覆盖新数据；
+        # 改名隔离后不再自动重放，保留供人工恢复
+        quarantined = await io_executor.run(
+            journal.quarantine_segments, priority=PRIORITY_FLUSH
+        )
+        logger.error(
+            f"重放预写日志时有{len(failed)}个用户数据写入失败"
+            f"（{', '.join(path.relative_to(PLUGIN_DATA_DIR).as_posix() for path in failed)}），"
+            f"日志段已隔离为: {', '.join(str(path) for path in quarantined)}"
+        )
+    else:
+        if replayed:
+            logger.info(f"已从预写日志恢复{len(replayed)}个用户数据")
+        await io_executor.run(journal.discard_segments, priority=PRIORITY_FLUSH)
+    if journal_enabled:
+        user_cache.attach_journal(journal)
+
+
 async def read_json(file_path: Path, encoding_config: str = "utf-8") -> Dict[str, Any]:
     """异步原子读取JSON文件（无.lock文件）"""
+    transaction = user_store.owner_of(file_path)
+    if transaction is not None:
+        return await transaction.read(file_path)
+    if user_cache.manages(file_path):
+        return await user_cache.read(file_path)
     if not file_path.exists():
         return {}
 
-    loop = asyncio.get_running_loop()
-    # 复用同步读取逻辑（通过线程池执行）
-    return await loop.run_in_executor(None, read_json_sync, file_path, encoding_config)
+    # 复用同步读取逻辑（通过插件I/O线程池执行）
+    return await io_executor.run(
+        read_json_sync, file_path, encoding_config, priority=PRIORITY_READ
+    )
 
 
 async def write_json(
     file_path: Path, data: Dict[str, Any], encoding_config: str = "utf-8"
 ) -> bool:
     """异步原子写入JSON文件（无.lock文件）"""
-    loop = asyncio.get_running_loop()
-    # 复用同步写入逻辑（通过线程池执行）
-    return await loop.run_in_executor(
-        None, write_json_sync, file_path, data, encoding_config
+    transaction = user_store.owner_of(file_path)
+    if transaction is not None:
+        return transaction.write(file_path, data)
+    if user_cache.manages(file_path):
+        return await user_cache.write(file_path, data)
+    # 复用同步写入逻辑（通过插件I/O线程池执行，同一文件的写入串行）
+    return await io_executor.run(
+        write_json_sync,
+        file_path,
+        data,
+        encoding_config,
+        priority=PRIORITY_WRITE,
+        key=file_path,
     )
 
 
@@ -211,9 +437,21 @@ def seconds_to_duration(seconds) -> str:
     return "".join(parts) if parts else "0秒"
 
 
+async def is_user_registered(user_id: str) -> bool:
+    """判断用户是否已注册（存在用户数据）"""
+    file_path = PLUGIN_DATA_DIR / "user_data" / f"{user_id}.json"
+    transaction = user_store.owner_of(file_path)
+    if transaction is not None:
+        known = transaction.exists(file_path)
+        if known is not None:
+            return known
+    return await user_cache.exists(file_path)
+
+
 async def create_user_data(user_id: str, user_data_path: Path) -> bool:
     """创建user系统初始数据"""
     try:
+        day, week = epoch_clock.epochs()
         default_user_data = {
             "user": {
                 "id": user_id,
@@ -246,8 +484,8 @@ async def create_user_data(user_id: str, user_data_path: Path) -> bool:
                 "weekly": {},
                 "special": {},
                 "task_points": 0,
-                "last_daily_refresh": "",
-                "last_weekly_refresh": "",
+                "daily_epoch": day,
+                "weekly_epoch": week,
             },
         }
 
@@ -272,25 +510,17 @@ async def get_user_data_and_backpack(
     user_backpack = None
     if only_data_or_backpack in (None, "user_data"):
         user_data_file = user_data_path / f"{user_id}.json"
-        if not user_data_file.exists():
+        if not await is_user_registered(user_id):
             await create_user_data(user_id, user_data_path)
         user_data = await read_json(user_data_file)
 
     if only_data_or_backpack in (None, "user_backpack"):
         user_backpack = await read_json(backpack_path / f"{user_id}.json") or {}
         if "weapon" not in user_backpack:
-            user_backpack["weapon"] = {
-                "纠缠之缘": 0,
-                "总抽卡次数": 0,
-                "武器计数": {},
-                "武器详细": {
-                    "三星武器": {"数量": 0, "详细信息": []},
-                    "四星武器": {"数量": 0, "详细信息": []},
-                    "五星武器": {"数量": 0, "详细信息": []},
-                },
-                "未出五星计数": 0,
-                "未出四星计数": 0,
-            }
+            user_backpack["weapon"] = default_weapon_data()
+        else:
+            # 旧版背包在读取时转换为武器位图，随下次写入落盘
+            migrate_weapon_data(user_backpack["weapon"])
     if only_data_or_backpack == "user_data":
         return user_data
     elif only_data_or_backpack == "user_backpack":
@@ -306,13 +536,40 @@ async def get_referenced_msg_id(event: AiocqhttpMessageEvent) -> str | None:
 
 
 async def get_nickname(event: AiocqhttpMessageEvent, user_id) -> str:
-    """获取群用户的群昵称或QQ名"""
-    client = event.bot
+    """获取群用户的群昵称或QQ名（经群成员缓存，获取失败返回空字符串）"""
     group_id = event.get_group_id()
-    all_info = await client.get_group_member_info(
-        group_id=int(group_id), user_id=int(user_id)
-    )
-    return all_info.get("card") or all_info.get("nickname")
+    if not group_id:
+        return ""
+    return await group_members.nickname(event.bot, group_id, user_id)
+
+
+def shed_load(handler):
+    """命令处理函数装饰器：I/O队列已满时在命令开始前拒绝执行并回复存储繁忙\n
+    只在入口拒绝，已开始执行的命令不会因队列已满而中途失败"""
+    if inspect.isasyncgenfunction(handler):
+
+        @functools.wraps(handler)
+        async def wrapper(self, event, *args, **kwargs):
+            try:
+                io_executor.admit()
+            except IOBusyError as e:
+                yield event.plain_result(str(e))
+                return
+            async for result in handler(self, event, *args, **kwargs):
+                yield result
+
+        return wrapper
+
+    @functools.wraps(handler)
+    async def wrapper(self, event, *args, **kwargs):
+        try:
+            io_executor.admit()
+        except IOBusyError as e:
+            await event.send(event.plain_result(str(e)))
+            return
+        return await handler(self, event, *args, **kwargs)
+
+    return wrapper
 
 
 async def get_cmd_info(event: AiocqhttpMessageEvent) -> list[str]:
@@ -0,0 +1,114 @@
+from typing import Any, Dict, Optional
+
+# 武器星级与ID范围（300-399:三星, 400-499:四星, 500-599:五星）
+STAR_ID_RANGES = {
+    "三星武器": range(300, 400),
+    "四星武器": range(400, 500),
+    "五星武器": range(500, 600),
+}
+# 各星级在位图中的掩码
+_STAR_MASKS = {
+    star: ((1 << (id_range.stop - id_range.start)) - 1) << id_range.start
+    for star, id_range in STAR_ID_RANGES.items()
+}
+# 背包中记录已拥有武器的字段（十六进制位图，第n位为1表示拥有ID为n的武器）
+OWNED_KEY = "已拥有"
+# 背包中记录各限定卡池保底计数的字段（常驻卡池使用顶层计数）
+BANNER_PITY_KEY = "卡池保底"
+# 每种已拥有武器提供的战斗力
+COMBAT_POWER = {"五星武器": 500, "四星武器": 100, "三星武器": 20}
+
+
+def default_weapon_data() -> Dict[str, Any]:
+    """新背包的武器数据"""
+    return {
+        "纠缠之缘": 0,
+        "总抽卡次数": 0,
+        "武器计数": {},
+        OWNED_KEY: "0",
+        "未出五星计数": 0,
+        "未出四星计数": 0,
+    }
+
+
+def star_of(weapon_id: int | str) -> Optional[str]:
+    """根据武器ID判断星级"""
+    try:
+        weapon_id = int(weapon_id)
+    except (TypeError, ValueError):
+        return None
+    for star, id_range in STAR_ID_RANGES.items():
+        if weapon_id in id_range:
+            return star
+    return None
+
+
+def migrate_weapon_data(weapon_data: Dict[str, Any]) -> bool:
+    """将旧版"武器详细"列表转换为位图，返回是否发生了转换\n
+    旧数据中每件首次获得的武器都复制了一份完整武器信息，这里只保留ID"""
+    if OWNED_KEY in weapon_data and "武器详细" not in weapon_data:
+        return False
+    bits = int(weapon_data.get(OWNED_KEY, "0"), 16)
+    owned_ids = set(weapon_data.get("武器计数", {}).keys())
+    for star_data in weapon_data.pop("武器详细", {}).values():
+        owned_ids.update(item.get("id") for item in star_data.get("详细信息", []))
+    for weapon_id in owned_ids:
+        if star_of(weapon_id) is not None:
+            bits |= 1 << int(weapon_id)
+    weapon_data[OWNED_KEY] = format(bits, "x")
+    return True
+
+
+def _owned_bits(weapon_data: Dict[str, Any]) -> int:
+    migrate_weapon_data(weapon_data)
+    return int(weapon_data[OWNED_KEY], 16)
+
+
+def has_weapon(weapon_data: Dict[str, Any], weapon_id: int | str) -> bool:
+    """判断是否已拥有某武器"""
+    return bool(_owned_bits(weapon_data) >> int(weapon_id) & 1)
+
+
+def add_weapon(weapon_data: Dict[str, Any], weapon_id: int | str) -> bool:
+    """记录获得某武器，首次获得时返回True"""
+    bits = _owned_bits(weapon_data)
+    mask = 1 << int(weapon_id)
+    if bits & mask:
+        return False
+    weapon_data[OWNED_KEY] = format(bits | mask, "x")
+    return True
+
+
+def owned_ids(weapon_data: Dict[str, Any], star: Optional[str] = None) -> list[str]:
+    """列出已拥有的武器ID（可按星级过滤），按ID升序"""
+    bits = _owned_bits(weapon_data)
+    ranges = [STAR_ID_RANGES[star]] if star else STAR_ID_RANGES.values()
+    return [
+        str(weapon_id)
+        for id_range in ranges
+        for weapon_id in id_range
+        if bits >> weapon_id & 1
+    ]
+
+
+def star_counts(weapon_data: Dict[str, Any]) -> Dict[str, int]:
+    """各星级已拥有的武器种类数"""
+    bits = _owned_bits(weapon_data)
+    return {star: bin(bits & mask).count("1") for star, mask in _STAR_MASKS.items()}
+
+
+def combat_power(weapon_data: Dict[str, Any]) -> int:
+    """武器战斗力：按已拥有的各星级武器种类数计算"""
+    counts = star_counts(weapon_data)
+    return sum(COMBAT_POWER[star] * count for star, count in counts.items())
+
+
+def banner_pity(
+    weapon_data: Dict[str, Any], banner_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """获取卡池的保底计数，banner_id为None时返回常驻卡池（顶层）计数"""
+    if banner_id is None:
+        return weapon_data
+    return weapon_data.setdefault(BANNER_PITY_KEY, {}).setdefault(
+        banner_id, {"未出五星计数": 0, "未出四星计数": 0}
+    )
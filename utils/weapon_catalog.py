@@ -0,0 +1,91 @@
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from astrbot.api import logger
+
+from .catalog import ReloadableCatalog
+from .weapon_bag import STAR_ID_RANGES, star_of
+
+# 武器数据中保持为字符串的字段，其余字段解析为数值
+_TEXT_FIELDS = ("id", "name", "class")
+
+
+def _parse_number(value: Any) -> Any:
+    """将"454"、"0.042"这类字符串属性解析为int/float，无法解析的原样返回"""
+    if not isinstance(value, str):
+        return value
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() and "." not in value else number
+
+
+class _CatalogSnapshot:
+    """某一版本武器数据的只读视图及索引"""
+
+    __slots__ = ("by_id", "by_name", "by_star")
+
+    def __init__(self, raw: dict):
+        by_id, by_name = {}, {}
+        by_star = {star: [] for star in STAR_ID_RANGES}
+        for weapon_key, info in raw.items():
+            star = star_of(weapon_key)
+            if star is None:
+                logger.warning(f"忽略ID不在300-599范围内的武器: {weapon_key}")
+                continue
+            entry = {
+                key: value if key in _TEXT_FIELDS else _parse_number(value)
+                for key, value in info.items()
+            }
+            entry["id"] = str(weapon_key)
+            entry.setdefault("class", star)
+            entry = MappingProxyType(entry)
+            by_id[entry["id"]] = entry
+            by_star[star].append(entry["id"])
+            if "name" in entry:
+                by_name[entry["name"]] = entry
+        self.by_id = MappingProxyType(by_id)
+        self.by_name = MappingProxyType(by_name)
+        self.by_star = MappingProxyType(
+            {star: tuple(sorted(ids, key=int)) for star, ids in by_star.items()}
+        )
+
+
+class WeaponCatalog(ReloadableCatalog[_CatalogSnapshot]):
+    """武器数据目录（进程内共享，只读）\n
+    Weapon.json只在首次使用和文件修改后解析一次，数值属性解析为int/float，
+    并建立按ID、星级、名称的索引。条目为只读映射，调用方不可修改。
+    """
+
+    label = "武器数据"
+
+    def _build(self, raw: dict) -> _CatalogSnapshot:
+        return _CatalogSnapshot(raw)
+
+    def _describe(self, snapshot: _CatalogSnapshot) -> str:
+        return f"（{len(snapshot.by_id)}件武器）"
+
+    def get(self, weapon_id: int | str) -> Optional[Mapping[str, Any]]:
+        """根据武器ID获取武器信息"""
+        return self._current().by_id.get(str(weapon_id))
+
+    def find_by_name(self, name: str) -> Optional[Mapping[str, Any]]:
+        """根据武器名称获取武器信息"""
+        return self._current().by_name.get(name)
+
+    def name_of(self, weapon_id: int | str) -> str:
+        """获取武器名称，未知武器返回ID本身"""
+        entry = self.get(weapon_id)
+        return entry["name"] if entry else str(weapon_id)
+
+    def ids_of_star(self, star: str) -> tuple[str, ...]:
+        """获取某星级的全部武器ID"""
+        return self._current().by_star.get(star, ())
+
+    def all(self) -> Mapping[str, Mapping[str, Any]]:
+        """获取全部武器（ID -> 武器信息）"""
+        return self._current().by_id
+
+    def __len__(self) -> int:
+        return len(self._current().by_id)